@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bulk import write_export
+from db import Database
+
+logger = logging.getLogger(__name__)
+
+PendingWrite = Tuple[Callable[..., Any], tuple, 'asyncio.Future[Any]']
+
+
+class AsyncDatabase:
+    """Database metodlarini event loop'ni bloklamasdan chaqirish.
+
+    Yozishlar bitta maxsus DB thread'ida bajariladi va navbatga yig'iladi:
+    DB thread band bo'lgan paytda kelgan yozishlar keyingi bitta
+    tranzaksiyada birga commit qilinadi. Har bir yozish o'z SAVEPOINT'ida
+    bajariladi, shuning uchun bittasining xatosi boshqalarini bekor
+    qilmaydi. O'qishlar alohida thread va ulanishda bajariladi: WAL
+    rejimida ular yozish lock'ini kutmaydi.
+    """
+
+    def __init__(self, db: Database, max_batch: int = 200):
+        self.db = db
+        self.reader = (
+            Database(db.db_file, channel_cache=db.channel_cache) if db.db_file != ":memory:" else db
+        )
+        self.max_batch = max_batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-read")
+        self._pending: List[PendingWrite] = []
+        self._flushing = False
+        self.batches = 0
+        self.batched_writes = 0
+
+    async def _read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, fn, *args)
+
+    async def _write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((fn, args, future))
+        if not self._flushing:
+            self._flushing = True
+            # Shu loop iteratsiyasidagi boshqa yozishlar ham partiyaga qo'shilsin
+            loop.call_soon(self._submit_batch, loop)
+        return await future
+
+    def _submit_batch(self, loop: asyncio.AbstractEventLoop):
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+        task = loop.run_in_executor(self._executor, self._run_batch, batch)
+        task.add_done_callback(lambda f: self._batch_done(loop, batch, f))
+
+    def _run_batch(self, batch: List[PendingWrite]) -> List[Tuple[Any, Optional[BaseException]]]:
+        """DB thread'ida: butun partiyani bitta tranzaksiyada bajarish"""
+        results: List[Tuple[Any, Optional[BaseException]]] = []
+        # IMMEDIATE: partiya faqat yozadi; lock boshidanoq olinadi (busy_timeout bilan
+        # kutiladi), aks holda o'qishdan yozishga o'tishda SQLITE_BUSY partiya o'rtasida chiqadi.
+        # Ichkaridagi transaction(immediate=True) bloklari ham shu lock ostida ishlaydi
+        with self.db.transaction(immediate=True):
+            for fn, args, _ in batch:
+                try:
+                    with self.db.transaction():
+                        results.append((fn(*args), None))
+                except Exception as e:
+                    results.append((None, e))
+        return results
+
+    def _batch_done(self, loop: asyncio.AbstractEventLoop, batch: List[PendingWrite], task: 'asyncio.Future'):
+        error = task.exception()
+        results = task.result() if error is None else [(None, error)] * len(batch)
+        for (_, _, future), (result, exc) in zip(batch, results):
+            if future.done():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+        self.batches += 1
+        self.batched_writes += len(batch)
+        if self._pending:
+            self._submit_batch(loop)
+        else:
+            self._flushing = False
+
+    async def close(self):
+        """Qolgan yozishlarni kutib, DB thread'ini yopish"""
+        while self._pending or self._flushing:
+            await asyncio.sleep(0.01)
+        self._executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+        if self.reader is not self.db:
+            self.reader.close()
+
+    # O'qish
+    async def get_user_channels(self, user_id: int) -> List[Tuple[str, str]]:
+        return await self._read(self.reader.get_user_channels, user_id)
+
+    async def get_user_schedules(self, user_id: int) -> List[Tuple]:
+        return await self._read(self.reader.get_user_schedules, user_id)
+
+    async def get_user_schedules_page(self, user_id: int, before_id: Optional[int] = None,
+                                      after_id: Optional[int] = None, limit: int = 5):
+        return await self._read(self.reader.get_user_schedules_page, user_id, before_id, after_id, limit)
+
+    async def get_schedule_by_id(self, schedule_id: int) -> Optional[Tuple]:
+        return await self._read(self.reader.get_schedule_by_id, schedule_id)
+
+    async def export_schedules(self, out: IO[bytes], fmt: str, user_id: Optional[int] = None) -> int:
+        """Rejalarni ``out`` ga oqim bilan yozish (o'qish thread'ida)"""
+        return await self._read(lambda: write_export(self.reader.iter_schedules(user_id=user_id), fmt, out))
+
+    async def load_user_data(self) -> List[Tuple[int, str]]:
+        return await self._read(self.reader.load_user_data)
+
+    async def load_conversations(self, name: str) -> List[Tuple[str, str]]:
+        return await self._read(self.reader.load_conversations, name)
+
+    # Yozish
+    async def add_user(self, user_id: int, username: Optional[str] = None):
+        return await self._write(self.db.add_user, user_id, username)
+
+    async def add_channel(self, user_id: int, channel_id: str, channel_name: str):
+        return await self._write(self.db.add_channel, user_id, channel_id, channel_name)
+
+    async def add_schedule(self, user_id: int, channel_id: str, message: Optional[str],
+                           time: str, with_date: bool, start_date: Optional[str],
+                           end_date: Optional[str] = None, merge_sends: bool = True,
+                           media_type: str = "", media: str = "") -> int:
+        return await self._write(
+            self.db.add_schedule, user_id, channel_id, message, time, with_date, start_date, end_date,
+            merge_sends, media_type, media
+        )
+
+    async def add_schedules(self, user_id: int,
+                            rows: Iterable[Tuple[str, str, str, bool, str, str, bool, str, str]]) -> List[int]:
+        return await self._write(self.db.add_schedules, user_id, list(rows))
+
+    async def get_schedule_rows(self, schedule_ids: Iterable[int]) -> List[Tuple]:
+        return await self._read(self.reader.get_schedule_rows, list(schedule_ids))
+
+    async def set_merge_sends(self, schedule_id: int, user_id: int, merge_sends: bool) -> bool:
+        return await self._write(self.db.set_merge_sends, schedule_id, user_id, merge_sends)
+
+    async def delete_schedule(self, schedule_id: int):
+        return await self._write(self.db.delete_schedule, schedule_id)
+
+    async def delete_channel(self, user_id: int, channel_id: str) -> List[int]:
+        return await self._write(self.db.delete_channel, user_id, channel_id)
+
+    async def resume_channel(self, channel_id: str) -> Tuple[List[Tuple[int, str, int]], List[int]]:
+        return await self._write(self.db.resume_channel, channel_id)
+
+    async def save_persistence(self, user_data: Dict[int, Optional[str]],
+                               conversations: Dict[Tuple[str, str], Optional[str]]):
+        return await self._write(self.db.save_persistence, user_data, conversations)
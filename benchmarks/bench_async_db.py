@@ -0,0 +1,124 @@
+"""Baza band bo'lganda handler kechikishi: sinxron va AsyncDatabase.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_async_db --users 200 --seconds 5
+
+Fon thread'i alohida ulanish orqali katta yozish tranzaksiyalarini
+bajarib, bazani band qilib turadi. Shu paytda ko'plab "handler"lar
+(kanal ro'yxatini o'qish yoki foydalanuvchini yozish) va bazaga
+tegmaydigan handler'lar ishlaydi. Sinxron rejimda har bir so'rov event
+loop'ni bloklaydi, shuning uchun bazaga tegmaydigan handler'lar ham kutadi.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from async_db import AsyncDatabase
+from db import Database
+from benchmarks.common import percentile, print_table
+
+
+def busy_writer(db_file: str, stop: threading.Event, hold: float):
+    """Bazani band qilib turuvchi fon yozuvchisi"""
+    db = Database(db_file)
+    i = 0
+    while not stop.is_set():
+        with db.transaction() as cursor:
+            cursor.executemany(
+                'INSERT INTO failed_deliveries (schedule_id, chat_id, text, error) VALUES (?, ?, ?, ?)',
+                [(i + n, "-100", "x" * 200, "busy") for n in range(2000)]
+            )
+            time.sleep(hold)
+        i += 2000
+        time.sleep(0.005)
+    db.close()
+
+
+async def run_mode(mode: str, db_file: str, users: int, seconds: float, hold: float, interval: float):
+    db = Database(db_file)
+    adb = AsyncDatabase(db)
+    for uid in range(users):
+        db.add_channel(uid, str(-1001000000000 - uid), f"Kanal {uid}")
+
+    read_lat, write_lat, ping_lat = [], [], []
+    deadline = time.perf_counter() + seconds
+
+    async def handler(uid: int):
+        # Juft foydalanuvchilar /kanallarim (o'qish), toqlari /start (yozish) yuboradi.
+        # Kechikish rejalashtirilgan kelish vaqtidan hisoblanadi: loop bloklanib
+        # turgan vaqt ham handler kechikishiga kiradi
+        latencies = read_lat if uid % 2 == 0 else write_lat
+        start = time.perf_counter() + random.uniform(0, interval)
+        await asyncio.sleep(max(0.0, start - time.perf_counter()))
+        while time.perf_counter() < deadline:
+            if mode == "sync":
+                if uid % 2 == 0:
+                    db.get_user_channels(uid)
+                else:
+                    db.add_user(uid, f"user{uid}")
+            else:
+                if uid % 2 == 0:
+                    await adb.get_user_channels(uid)
+                else:
+                    await adb.add_user(uid, f"user{uid}")
+            latencies.append(time.perf_counter() - start)
+            start += interval
+            await asyncio.sleep(max(0.0, start - time.perf_counter()))
+
+    async def ping():
+        # Bazaga tegmaydigan handler: faqat event loop kechikishini o'lchaydi
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            ping_lat.append(time.perf_counter() - start - 0.01)
+
+    stop = threading.Event()
+    writer = threading.Thread(target=busy_writer, args=(db_file, stop, hold), daemon=True)
+    writer.start()
+    try:
+        await asyncio.gather(*(handler(uid) for uid in range(users)), *(ping() for _ in range(20)))
+    finally:
+        stop.set()
+        writer.join()
+        await adb.close()
+        db.close()
+
+    ms = lambda v: f"{v * 1000:.1f}ms"
+    return [
+        mode,
+        ms(statistics.median(read_lat)), ms(percentile(read_lat, 99)),
+        ms(statistics.median(write_lat)), ms(percentile(write_lat, 99)),
+        ms(percentile(ping_lat, 99)),
+        f"{adb.batched_writes / adb.batches:.1f}" if adb.batches else "-",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--interval', type=float, default=1.0, help="Har bir foydalanuvchi so'rovlari orasidagi vaqt")
+    parser.add_argument('--hold', type=float, default=0.05, help="Fon tranzaksiyasi lock'ni ushlab turadigan vaqt")
+    args = parser.parse_args()
+
+    rows = []
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "load.db")
+            rows.append(asyncio.run(run_mode(
+                mode, db_file, args.users, args.seconds, args.hold, args.interval
+            )))
+    print_table(
+        ["mode", "read p50", "read p99", "write p50", "write p99", "no-db p99", "writes/batch"],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""/kanal_ulash va /send suhbatlari uchun yuklama generatori.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_conversations --users 2000 --latency 0.05 --concurrency 64
+
+Har bir sun'iy foydalanuvchi ``/start``, ``/kanal_ulash`` (kanal yuborish)
+va ``/send`` suhbatining barcha holatlarini (CHOOSING_CHANNEL dan
+ENTERING_END_DATE gacha) o'tadi. Update'lar haqiqiy ``ChallengeBot``
+``Application`` ining ``update_queue`` siga qo'yiladi, ya'ni
+``CONCURRENT_UPDATES`` limiti, ``ConversationHandler`` va handler'lar
+ishlaydi; Bot API o'rnida tarmoqsiz ``FakeRequest`` (``--latency``).
+
+Kechikish — update navbatga qo'yilgandan uning handler'i tugaguncha,
+holat bo'yicha p50/p99. SQLite bo'yicha ``AsyncDatabase`` partiyalari va
+``db_call_seconds`` dan metod vaqtlari chiqariladi; ``--busy-writer`` fon
+thread'ida bazani band qilib turadi (masalan, scheduler yozishlari bilan
+raqobat). Foydalanuvchilarning hammasi suhbatni oxiriga yetkazmasa (reja
+yozilmasa) skript 1 bilan chiqadi.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.common import percentile, print_table
+from benchmarks.fake_telegram import FakeRequest, channel_id_for, make_callback_update, make_update
+
+# Update'ni to'liq qayta ishlangach signal beradigan handler guruhi (bot handler'laridan keyin)
+DONE_GROUP = 100
+DB_METHODS = ('add_user', 'add_channel', 'get_user_channels', 'add_schedule')
+
+
+class ErrorCounter(logging.Handler):
+    """Handler'lardagi xatolik loglarini sanash (masalan, ``database is locked``)"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        self.count += 1
+
+
+class Driver:
+    """Update'larni ``update_queue`` ga qo'yib, har birining tugashini kutadi"""
+
+    def __init__(self, application):
+        self.application = application
+        self.waiting: Dict[int, asyncio.Future] = {}
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self._update_id = 0
+
+    async def done(self, update, context):
+        future = self.waiting.pop(update.update_id, None)
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+
+    async def step(self, label: str, data_factory, user_id: int, payload: str):
+        from telegram import Update
+
+        self._update_id += 1
+        update = Update.de_json(data_factory(self._update_id, user_id, payload), self.application.bot)
+        assert update is not None
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[update.update_id] = future
+        started = time.perf_counter()
+        await self.application.update_queue.put(update)
+        self.latencies[label].append(await future - started)
+
+
+def user_flow(user_id: int, rng: random.Random) -> List[tuple]:
+    """Bitta foydalanuvchining qadamlari: (holat, update yasovchi, matn/data)"""
+    channel = f"@kanal_{user_id}"
+    end_date = (datetime.now() + timedelta(days=rng.randint(30, 365))).strftime('%d.%m.%Y')
+    return [
+        ("/start", make_update, "/start"),
+        ("/kanal_ulash", make_update, "/kanal_ulash"),
+        ("kanal_ulash: CHOOSING_CHANNEL", make_update, channel),
+        ("/send", make_update, "/send"),
+        ("CHOOSING_CHANNEL", make_callback_update, f"channel_{channel_id_for(channel)}"),
+        ("ENTERING_MESSAGE", make_update, "Challenge {kun}-kun, {qoldi} kun qoldi"),
+        ("ENTERING_TIME", make_update, f"{rng.randrange(24):02d}:{rng.randrange(60):02d}"),
+        ("CONFIRMING_DATE", make_callback_update, "date_yes"),
+        ("ENTERING_CHALLENGE_DAY", make_update, str(rng.randint(1, 30))),
+        ("ENTERING_END_DATE", make_update, end_date),
+    ]
+
+
+async def simulate_user(driver: Driver, user_id: int, think: float, seed: int, steps: slice = slice(None)):
+    # Har bir foydalanuvchining qadamlari seed bo'yicha barqaror (restart'dan keyin davom ettirish uchun)
+    rng = random.Random(f"{seed}-{user_id}")
+    for label, factory, payload in user_flow(user_id, rng)[steps]:
+        if think:
+            await asyncio.sleep(rng.uniform(0, think))
+        await driver.step(label, factory, user_id, payload)
+
+
+def attach_driver(application) -> Driver:
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    driver = Driver(application)
+    application.add_handler(TypeHandler(Update, driver.done), group=DONE_GROUP)
+    return driver
+
+
+async def run_users(driver: Driver, users: int, think: float, seed: int, steps: slice = slice(None)) -> float:
+    """Barcha foydalanuvchilarni bir vaqtda yurgizish; sarflangan vaqt (sekund)"""
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        simulate_user(driver, 1000 + i, think, seed, steps) for i in range(users)
+    ))
+    return time.perf_counter() - started
+
+
+def print_latencies(latencies: Dict[str, List[float]]):
+    print_table(["state", "updates", "p50", "p99", "max"], [
+        [label, f"{len(values):,}", f"{statistics.median(values) * 1000:.1f}ms",
+         f"{percentile(values, 99) * 1000:.1f}ms", f"{max(values) * 1000:.1f}ms"]
+        for label, values in latencies.items()
+    ])
+
+
+def histogram_quantile(child, q: float) -> float:
+    """Bucket'lardan kvantilning yuqori chegarasi"""
+    total = sum(child.counts)
+    if not total:
+        return 0.0
+    cumulative = 0
+    for bound, count in zip(child.bounds + (float('inf'),), child.counts):
+        cumulative += count
+        if cumulative >= q * total:
+            return bound
+    return float('inf')
+
+
+async def run(args) -> int:
+    from bot import ChallengeBot
+    from db import Database
+    from benchmarks.bench_async_db import busy_writer
+    from metrics import DB_SECONDS
+
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "conversations.db")
+        db = Database(db_file)
+        stop = threading.Event()
+        writer = None
+        if args.busy_writer:
+            writer = threading.Thread(target=busy_writer, args=(db_file, stop, args.busy_writer), daemon=True)
+            writer.start()
+        request = FakeRequest(args.latency)
+        bot = ChallengeBot(db=db, request=request)
+        application = bot.application
+        driver = attach_driver(application)
+
+        await application.initialize()
+        await application.start()
+        elapsed = await run_users(driver, args.users, args.think, args.seed)
+        stop.set()
+        if writer:
+            writer.join()
+        await application.stop()
+        await application.shutdown()
+        await bot.adb.close()
+
+        counts = {
+            table: db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('users', 'channels', 'schedules')
+        }
+        db.close()
+
+    steps = sum(len(v) for v in driver.latencies.values())
+    print(f"{args.users:,} foydalanuvchi, {steps:,} update, {elapsed:.2f}s: "
+          f"{steps / elapsed:,.0f} update/s, {counts['schedules'] / elapsed:,.1f} to'liq /send suhbati/s "
+          f"(concurrent_updates={application.concurrent_updates}, latency={args.latency * 1000:.0f}ms, "
+          f"busy_writer={args.busy_writer}s)")
+    print()
+    print_latencies(driver.latencies)
+    print()
+    rows = []
+    for method in DB_METHODS:
+        child = DB_SECONDS.labels(method)
+        calls = sum(child.counts)
+        mean = child.sum / calls if calls else 0.0
+        rows.append([method, f"{calls:,}", f"{mean * 1000:.2f}ms", f"<= {histogram_quantile(child, 0.99) * 1000:g}ms"])
+    print_table(["db method", "calls", "mean", "p99"], rows)
+    print()
+    batches = bot.adb.batches
+    print(f"SQLite yozishlari: {bot.adb.batched_writes:,} ta, {batches:,} tranzaksiyada "
+          f"(o'rtacha partiya {bot.adb.batched_writes / max(1, batches):.1f}); "
+          f"xatolik loglari: {errors.count}; users/channels/schedules: "
+          f"{counts['users']}/{counts['channels']}/{counts['schedules']}")
+
+    if counts['schedules'] != args.users or counts['channels'] != args.users:
+        print("FAIL: hamma suhbat oxiriga yetmadi")
+        return 1
+    if bot.send_conversations:
+        print(f"FAIL: tugagan suhbatlardan {len(bot.send_conversations)} tasi faol deb hisoblanmoqda")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--users', type=int, default=1000, help="Bir vaqtda suhbat boshlaydigan foydalanuvchilar")
+    parser.add_argument('--latency', type=float, default=0.05, help="Bot API javob kechikishi (sekund)")
+    parser.add_argument('--concurrency', type=int, default=64, help="CONCURRENT_UPDATES qiymati")
+    parser.add_argument('--think', type=float, default=0.0, help="Qadamlar orasidagi tasodifiy pauza (0..N sekund)")
+    parser.add_argument('--busy-writer', type=float, default=0.0,
+                        help="Fon yozuvchisi tranzaksiyani necha sekund ushlab turadi; 0 — o'chirilgan")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # config import paytida o'qiydi; scheduler o'lchovga kirmaydi
+    os.environ['CONCURRENT_UPDATES'] = str(args.concurrency)
+    os.environ['RUN_SCHEDULER'] = '0'
+    logging.basicConfig(level=logging.ERROR)
+    # per_message=False haqidagi PTB ogohlantirishi bot.py'ga tegishli, o'lchovga emas
+    warnings.filterwarnings('ignore', message=".*per_message.*")
+    logging.getLogger().setLevel(logging.ERROR)
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
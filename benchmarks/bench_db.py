@@ -0,0 +1,98 @@
+"""Database metodlari uchun micro-benchmark: ops/sec oldin va keyin.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_db --ops 2000 --dir /tmp
+
+"oldin" har bir chaqiruvda yangi ``sqlite3.connect`` ochib commit qiladi
+(rollback journal, synchronous=FULL). "keyin" esa Database'ning doimiy
+WAL ulanishi va keshlangan statementlari.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from cache import LRUCache
+from db import Database, RUN_AT_FORMAT
+from benchmarks.common import print_table, timed
+
+
+class ConnectPerCallDatabase(Database):
+    """Eski xatti-harakat: har bir chaqiruvda yangi ulanish va commit"""
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(":memory:")
+
+    @contextmanager
+    def transaction(self):
+        with sqlite3.connect(self.db_file) as conn:
+            yield conn.cursor()
+            conn.commit()
+
+    def _fetchall(self, sql, params=()):
+        with sqlite3.connect(self.db_file) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql, params=()):
+        with sqlite3.connect(self.db_file) as conn:
+            return conn.execute(sql, params).fetchone()
+
+
+def workload(ops: int):
+    """(metod nomi, i -> chaqiruv) juftliklari; tartib muhim"""
+    channel = lambda i: str(-1001000000000 - i)
+    return [
+        ("add_user", lambda db, i: db.add_user(i, f"user{i}")),
+        ("add_channel", lambda db, i: db.add_channel(i % 100, channel(i), f"Kanal {i}")),
+        ("get_user_channels", lambda db, i: db.get_user_channels(i % 100)),
+        ("add_schedule", lambda db, i: db.add_schedule(
+            i % 100, channel(i), f"Xabar {i}", f"{i % 24:02d}:{i % 60:02d}", True, "2025-01-01", "")),
+        ("get_user_schedules", lambda db, i: db.get_user_schedules(i % 100)),
+        ("get_schedule_by_id", lambda db, i: db.get_schedule_by_id(i % ops + 1)),
+        # Har bir tick'dagi slot band qilish; slot har chaqiruvda oldinga siljiydi
+        ("claim_runs", lambda db, i: db.claim_runs(
+            (datetime(2030, 1, 1) + timedelta(minutes=i)).strftime(RUN_AT_FORMAT), [i % ops + 1])),
+        ("add_failed_delivery", lambda db, i: db.add_failed_delivery(i, i % 100, channel(i), "x", "err", 1)),
+        ("get_failed_deliveries", lambda db, i: db.get_failed_deliveries(100)),
+        ("delete_schedule", lambda db, i: db.delete_schedule(i + 1)),
+        ("delete_channel", lambda db, i: db.delete_channel(i % 100, channel(i))),
+    ]
+
+
+def measure(db: Database, ops: int):
+    results = {}
+    for name, call in workload(ops):
+        with timed() as t:
+            for i in range(ops):
+                call(db, i)
+        results[name] = ops / t['elapsed']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--ops', type=int, default=2000, help="Har bir metod uchun chaqiruvlar soni")
+    parser.add_argument('--dir', default=None, help="Baza fayllari uchun papka (disk turi natijaga ta'sir qiladi)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        # Eski xatti-harakatda kanal keshi ham yo'q edi
+        before = measure(
+            ConnectPerCallDatabase(os.path.join(tmp, "before.db"), channel_cache=LRUCache(0)), args.ops
+        )
+        db = Database(os.path.join(tmp, "after.db"))
+        after = measure(db, args.ops)
+        db.close()
+
+    rows = [
+        [name, f"{before[name]:,.0f}", f"{after[name]:,.0f}", f"{after[name] / before[name]:.1f}x"]
+        for name in before
+    ]
+    print_table(["method", "before ops/s", "after ops/s", "speedup"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Har reja uchun alohida cron job va daqiqalik slot dispatcher'ini solishtirish.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_dispatch --sizes 10k,100k,1M
+
+Eski yondashuv APScheduler'ning MemoryJobStore'iga har bir reja uchun
+CronTrigger'li Job qo'shadi va bir daqiqalik slot uchun APScheduler
+bajaradigan ishni (due joblarni topish, keyingi vaqtni hisoblash,
+jobstore'ni yangilash) takrorlaydi. Yangi yondashuv MinuteDispatcher.
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Tuple
+
+import pytz
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from config import TIMEZONE
+from dispatcher import MinuteDispatcher
+from benchmarks.common import (
+    fmt_bytes, parse_sizes, print_table, synthetic_entries, timed, traced_memory
+)
+
+TZ = pytz.timezone(TIMEZONE)
+SLOT = "09:00"
+
+
+def _noop(*args):
+    pass
+
+
+def build_per_job(count: int):
+    scheduler = BackgroundScheduler(timezone=TZ)
+    store = MemoryJobStore()
+    # Slotdan biroz oldingi barqaror holat: har bir job keyingi ishga tushish vaqtiga ega
+    now = TZ.localize(datetime(2025, 1, 1, 8, 59, 30))
+    for entry in synthetic_entries(count):
+        hour, minute = map(int, entry.time.split(':'))
+        trigger = CronTrigger(hour=hour, minute=minute, timezone=TZ)
+        job = Job(
+            scheduler, id=f"{entry.user_id}_{entry.channel_id}_{entry.schedule_id}",
+            func=_noop, trigger=trigger, executor='default',
+            args=tuple(entry), kwargs={}, name='send_scheduled_message',
+            misfire_grace_time=1, coalesce=False, max_instances=1,
+            next_run_time=trigger.get_next_fire_time(None, now)
+        )
+        store.add_job(job)
+    return store
+
+
+def dispatch_per_job(store: MemoryJobStore) -> int:
+    """APScheduler'ning _process_jobs bir slot uchun qiladigan ishi"""
+    hour, minute = map(int, SLOT.split(':'))
+    now = TZ.localize(datetime(2025, 1, 1, hour, minute))
+    fired = 0
+    for job in store.get_due_jobs(now):
+        run_times = job._get_run_times(now)
+        fired += len(run_times[-1:])
+        next_run = job.trigger.get_next_fire_time(run_times[-1], now + timedelta(seconds=1))
+        job._modify(next_run_time=next_run)
+        store.update_job(job)
+    return fired
+
+
+def build_bucketed(count: int) -> MinuteDispatcher:
+    dispatcher = MinuteDispatcher()
+    for entry in synthetic_entries(count):
+        dispatcher.add(entry)
+    return dispatcher
+
+
+def dispatch_bucketed(dispatcher: MinuteDispatcher) -> int:
+    return len(dispatcher.due(SLOT))
+
+
+def run(count: int, skip_per_job: bool):
+    rows = []
+    approaches: List[Tuple[str, Callable[[int], Any], Callable[[Any], int]]] = [
+        ("bucketed", build_bucketed, dispatch_bucketed)
+    ]
+    if not skip_per_job:
+        approaches.insert(0, ("per-job", build_per_job, dispatch_per_job))
+    for name, build, dispatch in approaches:
+        with traced_memory() as mem:
+            state = build(count)
+        with timed() as build_time:
+            state = build(count)
+        with timed() as tick:
+            fired = dispatch(state)
+        rows.append([
+            f"{count:,}", name, fmt_bytes(mem['current']),
+            f"{build_time['elapsed']:.2f}s", f"{tick['elapsed'] * 1000:.3f}ms", str(fired)
+        ])
+        del state
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--sizes', default='10k,100k,1M')
+    parser.add_argument(
+        '--per-job-max', type=int, default=1_000_000,
+        help="Eski yondashuvni faqat shu songacha o'lchash (MemoryJobStore O(n^2) quriladi)"
+    )
+    args = parser.parse_args()
+    rows = []
+    for count in parse_sizes(args.sizes):
+        rows.extend(run(count, skip_per_job=count > args.per_job_max))
+    print_table(["schedules", "approach", "memory", "build", f"tick {SLOT}", "fired"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Kanal holati tekshiruvi: bot kira olmaydigan kanallar rejalari to'xtatiladi va keyin davom etadi.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_health --channels 2000 --schedules 10000 --revoked 0.1
+
+Vaqtinchalik bazaga kanallar va rejalar yoziladi; ``--revoked`` ulushdagi
+kanallarda ``FakeBot`` bot'ni chiqarilgan (``Forbidden``) yoki adminlikdan
+olingan deb ko'rsatadi. So'ng:
+
+1. bir kunlik dispatch — yopiq kanallarga ketgan (behuda) chaqiruvlar;
+2. ``ChannelHealthChecker.run_pass`` — tekshiruv vaqti va ``get_chat_member`` soni;
+3. yana bir kun — yopiq kanallarga birorta ham chaqiruv bo'lmasligi kerak;
+4. takroriy aylanish — egalarga ikkinchi marta xabar ketmasligi kerak;
+5. huquq qaytariladi — barcha rejalar dispatcher'ga qaytishi kerak.
+
+Biror shart buzilsa skript 1 bilan chiqadi.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import cast
+
+import pytz
+from telegram import Bot
+
+from benchmarks.common import print_table, random_time
+from config import TIMEZONE
+from db import Database
+
+FIRST_DAY = (2030, 1, 1)
+UNLIMITED_RATE = 100_000_000
+
+
+def seed(db: Database, args) -> list:
+    rng = random.Random(args.seed)
+    channels = [str(-1001000000000 - i) for i in range(args.channels)]
+    for i, channel_id in enumerate(channels):
+        user_id = 1 + i % max(1, args.channels // 3)
+        db.add_channel(user_id, channel_id, f"Kanal {i}")
+    owners = {channel_id: 1 + i % max(1, args.channels // 3) for i, channel_id in enumerate(channels)}
+    by_user = {}
+    for n in range(args.schedules):
+        channel_id = rng.choice(channels)
+        by_user.setdefault(owners[channel_id], []).append(
+            (channel_id, f"Challenge #{n}", random_time(rng, args.skew), False, "2025-01-01", "", False, "", "")
+        )
+    for user_id, rows in by_user.items():
+        db.add_schedules(user_id, rows)
+    return channels
+
+
+async def dispatch_day(scheduler, day: int) -> float:
+    tz = pytz.timezone(TIMEZONE)
+    year, month, first = FIRST_DAY
+    started = time.perf_counter()
+    for slot in sorted(scheduler.dispatcher.slot_sizes()):
+        hour, minute = map(int, slot.split(':'))
+        await scheduler.dispatch_slot(tz.localize(datetime(year, month, first + day, hour, minute)))
+        await scheduler.send_queue.join()
+    return time.perf_counter() - started
+
+
+async def run(db: Database, channels: list, args) -> tuple:
+    from scheduler import MessageScheduler
+    from benchmarks.fake_telegram import FakeBot
+
+    rng = random.Random(args.seed)
+    revoked = rng.sample(channels, int(len(channels) * args.revoked))
+    bot = FakeBot(latency=args.latency)
+    bot.kicked = set(revoked[::2])
+    bot.demoted = set(revoked[1::2])
+
+    scheduler = MessageScheduler(cast(Bot, bot), db)
+    scheduler.shards.owned = frozenset(range(scheduler.shards.shards))
+    scheduler.send_queue.set_global_rate(UNLIMITED_RATE)
+    scheduler.send_queue.chat_rate = UNLIMITED_RATE
+    scheduler.send_queue.max_attempts = 1
+    scheduler.send_queue.start()
+    scheduler.load_schedules(db.iter_schedules())
+    scheduler._event_id = db.last_schedule_event_id()
+    health = scheduler.health
+    health.batch_delay = args.batch_delay
+    loaded = len(scheduler.dispatcher)
+    revoked_set = bot.kicked | bot.demoted
+    # Har bir (ega, yopiq kanal) juftiga bittadan xabar
+    notices = sum(1 for _, channel_id in db._fetchall('SELECT user_id, channel_id FROM channels')
+                  if channel_id in revoked_set)
+    results, problems = [], []
+
+    def stage(name: str, elapsed: float, wasted: int):
+        results.append([name, f"{elapsed:.2f}s", len(scheduler.dispatcher), f"{wasted:,}",
+                        bot.member_calls, health.paused, health.resumed])
+
+    rejected = bot.rejected
+    elapsed = await dispatch_day(scheduler, 0)
+    stage("1-kun (tekshiruvsiz)", elapsed, bot.rejected - rejected)
+
+    started = time.perf_counter()
+    await health.run_pass()
+    await scheduler.send_queue.join()
+    stage("run_pass", time.perf_counter() - started, 0)
+    if health.paused != notices:
+        problems.append(f"{health.paused} ta to'xtatish xabari, {notices} kutilgan")
+
+    rejected = bot.rejected
+    elapsed = await dispatch_day(scheduler, 1)
+    stage("2-kun (to'xtatilgan)", elapsed, bot.rejected - rejected)
+    if bot.rejected != rejected:
+        problems.append(f"yopiq kanallarga {bot.rejected - rejected} ta chaqiruv")
+
+    paused = health.paused
+    started = time.perf_counter()
+    await health.run_pass()
+    stage("takroriy run_pass", time.perf_counter() - started, 0)
+    if health.paused != paused:
+        problems.append("egalarga ikkinchi marta xabar ketdi")
+
+    bot.kicked.clear()
+    bot.demoted.clear()
+    started = time.perf_counter()
+    await health.run_pass()
+    stage("huquq qaytdi", time.perf_counter() - started, 0)
+    if len(scheduler.dispatcher) != loaded:
+        problems.append(f"dispatcher'da {len(scheduler.dispatcher)} ta reja, {loaded} kutilgan")
+    if health.resumed != notices:
+        problems.append(f"{health.resumed} ta davom xabari, {notices} kutilgan")
+
+    await scheduler.stop()
+    return results, problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--channels', type=int, default=2_000)
+    parser.add_argument('--schedules', type=int, default=10_000)
+    parser.add_argument('--revoked', type=float, default=0.1, help="Bot kira olmaydigan kanallar ulushi")
+    parser.add_argument('--latency', type=float, default=0.0, help="Bot API kechikishi (sekund)")
+    parser.add_argument('--batch-delay', type=float, default=0.0, help="Bo'laklar orasidagi pauza (sekund)")
+    parser.add_argument('--skew', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "health.db"))
+        channels = seed(db, args)
+        results, problems = asyncio.run(run(db, channels, args))
+        db.close()
+
+    print_table(["bosqich", "vaqt", "rejalar", "behuda chaqiruv", "get_chat_member", "to'xtatildi", "davom etdi"],
+                results)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Ommaviy import/eksport: tekshirish, bitta tranzaksiyada yozish va oqimli eksport.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_import --rows 50000
+
+Sun'iy CSV va JSON fayllar yasaladi, so'ng:
+
+1. ``parse_import`` — butun faylni tekshirish vaqti;
+2. ``Database.add_schedules`` (bitta tranzaksiya, executemany) va taqqoslash
+   uchun ``--per-row`` ta qatorni ``add_schedule`` bilan birma-bir yozish;
+3. ``MessageScheduler.add_schedule_jobs`` — dispatcher'ga partiyada qo'shish;
+4. ``write_export`` — oqim bilan eksport vaqti va xotira cho'qqisi, hamda
+   eksport -> import aylanishi (qatorlar bir xil bo'lmasa skript 1 bilan chiqadi).
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import List, cast
+
+from telegram import Bot
+
+from benchmarks.common import fmt_bytes, print_table, synthetic_entries, timed, traced_memory
+from bulk import FIELDS, ImportRow, ImportValidationError, parse_import, write_export
+from db import Database
+
+USER_ID = 1
+
+
+def make_records(count: int, seed: int, skew: float) -> list:
+    return [
+        {
+            'channel_id': e.channel_id, 'message': e.message, 'time': e.time,
+            'with_date': int(e.with_date), 'start_date': e.start_date, 'end_date': e.end_date,
+        }
+        for e in synthetic_entries(count, seed, skew)
+    ]
+
+
+def to_csv(records: list) -> bytes:
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(records)
+    return text.getvalue().encode('utf-8')
+
+
+def to_json(records: list) -> bytes:
+    return json.dumps(records, ensure_ascii=False).encode('utf-8')
+
+
+async def register(db: Database, rows) -> int:
+    from scheduler import MessageScheduler
+    from benchmarks.fake_telegram import FakeBot
+
+    scheduler = MessageScheduler(cast(Bot, FakeBot()), db)
+    scheduler.shards.owned = frozenset(range(scheduler.shards.shards))
+    return scheduler.add_schedule_jobs(rows)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--per-row', type=int, default=2_000,
+                        help="Taqqoslash uchun add_schedule bilan birma-bir yoziladigan qatorlar")
+    parser.add_argument('--skew', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    records = make_records(args.rows, args.seed, args.skew)
+    files = {'rejalar.csv': to_csv(records), 'rejalar.json': to_json(records)}
+    allowed = {r['channel_id'] for r in records}
+    results = []
+    ok = True
+
+    parsed: List[ImportRow] = []
+    for filename, data in files.items():
+        with timed() as t:
+            parsed = parse_import(data, filename, allowed, max_rows=args.rows)
+        label = f"parse_import ({os.path.splitext(filename)[1][1:]}, {fmt_bytes(len(data))})"
+        results.append([label, f"{len(parsed):,}", f"{t['elapsed']:.2f}s", f"{len(parsed) / t['elapsed']:,.0f}"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "import.db"))
+        with timed() as t:
+            ids = db.add_schedules(USER_ID, parsed)
+        results.append(["add_schedules (1 tranzaksiya)", f"{len(ids):,}", f"{t['elapsed']:.2f}s",
+                        f"{len(ids) / t['elapsed']:,.0f}"])
+
+        sample = parsed[:args.per_row]
+        with timed() as t:
+            for row in sample:
+                db.add_schedule(USER_ID + 1, **row._asdict())
+        results.append(["add_schedule (qatorma-qator)", f"{len(sample):,}", f"{t['elapsed']:.2f}s",
+                        f"{len(sample) / t['elapsed']:,.0f}"])
+
+        rows = db.get_schedule_rows(ids)
+        with timed() as t:
+            registered = asyncio.run(register(db, rows))
+        results.append(["add_schedule_jobs", f"{registered:,}", f"{t['elapsed']:.2f}s",
+                        f"{registered / t['elapsed']:,.0f}"])
+
+        exported = {}
+        for fmt in ('csv', 'json'):
+            path = os.path.join(tmp, f"export.{fmt}")
+            with open(path, 'wb') as out, traced_memory() as mem, timed() as t:
+                count = write_export(db.iter_schedules(user_id=USER_ID), fmt, out)
+            results.append([f"write_export ({fmt}, cho'qqi {fmt_bytes(mem['peak'])})", f"{count:,}",
+                            f"{t['elapsed']:.2f}s", f"{count / t['elapsed']:,.0f}"])
+            with open(path, 'rb') as f:
+                exported[fmt] = parse_import(f.read(), path, max_rows=args.rows)
+        db.close()
+
+    print_table(["bosqich", "qatorlar", "vaqt", "qator/s"], results)
+    for fmt, rows in exported.items():
+        if rows != parsed:
+            print(f"FAIL: {fmt} eksport -> import aylanishida qatorlar farq qildi")
+            ok = False
+    # Chegara: aynan max_rows qabul qilinadi, bittasi ortiqcha bo'lsa rad etiladi
+    for filename, convert in (('chegara.csv', to_csv), ('chegara.json', to_json)):
+        limit = 3
+        if len(parse_import(convert(records[:limit]), filename, max_rows=limit)) != limit:
+            print(f"FAIL: {filename}: {limit} ta qator qabul qilinmadi")
+            ok = False
+        try:
+            parse_import(convert(records[:limit + 1]), filename, max_rows=limit)
+        except ImportValidationError:
+            pass
+        else:
+            print(f"FAIL: {filename}: {limit + 1} ta qator max_rows={limit} bilan qabul qilindi")
+            ok = False
+    if len(ids) != args.rows or registered != args.rows:
+        print("FAIL: hamma qator yozilmadi yoki ro'yxatga olinmadi")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
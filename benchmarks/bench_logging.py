@@ -0,0 +1,106 @@
+"""Gavjum slotda loglar event loop'ni qancha to'xtatishi: sinxron handler va ``logs.setup_logging``.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_logging --records 20000 --write-latency 0.0002
+
+Bitta slotdagi ``--records`` ta "Xabar yuborildi" yozuvi event loop
+ichidan, ``SendQueue._send`` dagidek chaqiriladi. Chiqish oqimi sekin
+(``--write-latency`` — har bir ``write`` kechikishi, masalan to'lgan pipe
+yoki journald). O'lchanadi: logger chaqiruvining o'zi (p50/p99/max),
+loop'dagi umumiy vaqt va oqimga yozilgan qatorlar.
+
+* sync — eski holat: ``basicConfig`` dagi ``StreamHandler`` va f-string;
+* queue/text, queue/json — ``setup_logging``: navbat, kechiktirilgan
+  formatlash va ``LOG_SAMPLE_PER_SECOND`` cheklovi;
+* queue/all — cheklovsiz (``sample`` belgisiz): navbat to'lsa yozuvlar
+  tashlanadi (``dropped``), loop baribir kutmaydi.
+"""
+import argparse
+import asyncio
+import io
+import logging
+import sys
+import time
+
+from benchmarks.common import percentile, print_table
+from logs import TEXT_FORMAT, setup_logging, stop_logging
+
+logger = logging.getLogger("send_queue")
+
+
+class SlowStream(io.StringIO):
+    """Har bir yozish ``latency`` sekund davom etadigan oqim (matn saqlanmaydi)"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+async def emit(records: int, structured: bool, sample: bool) -> list:
+    durations = []
+    for i in range(records):
+        chat_id, schedule_id = f"-100{i % 500}", i
+        started = time.perf_counter()
+        if structured:
+            logger.info(
+                "Xabar yuborildi: %s - %s", chat_id, schedule_id,
+                extra={'schedule_id': schedule_id, 'channel_id': chat_id, 'lag': 0.01, 'sample': sample}
+            )
+        else:
+            logger.info(f"Xabar yuborildi: {chat_id} - {schedule_id}")
+        durations.append(time.perf_counter() - started)
+        if i % 100 == 0:
+            # Navbat worker'lari kabi loop'ga qaytish
+            await asyncio.sleep(0)
+    return durations
+
+
+def run(mode: str, args) -> list:
+    stream = SlowStream(args.write_latency)
+    root = logging.getLogger()
+    if mode == "sync":
+        for old in list(root.handlers):
+            root.removeHandler(old)
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        setup_logging(logging.INFO, "json" if mode == "queue/json" else "text", stream=stream)
+
+    started = time.perf_counter()
+    durations = asyncio.run(emit(args.records, structured=mode != "sync", sample=mode != "queue/all"))
+    loop_time = time.perf_counter() - started
+    dropped = sum(getattr(handler, 'dropped', 0) for handler in root.handlers)
+    stop_logging()
+    return [
+        mode, f"{args.records:,}", f"{loop_time:.2f}s",
+        f"{percentile(durations, 50) * 1e6:.0f}us", f"{percentile(durations, 99) * 1e6:.0f}us",
+        f"{max(durations) * 1000:.1f}ms", f"{stream.lines:,}", f"{dropped:,}",
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--records', type=int, default=20_000)
+    parser.add_argument('--write-latency', type=float, default=0.0002, help="Oqimga bitta yozish (sekund)")
+    args = parser.parse_args()
+
+    rows = [run(mode, args) for mode in ("sync", "queue/text", "queue/json", "queue/all")]
+    print_table(["handler", "records", "loop time", "call p50", "call p99", "call max", "lines written", "dropped"],
+                rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
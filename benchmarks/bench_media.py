@@ -0,0 +1,124 @@
+"""Media rejalar: manba bir marta yuklanadi, keyingi kunlarda faqat ``file_id`` yuboriladi.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_media --schedules 2000 --sources 20 --days 3
+
+Vaqtinchalik katalogda ``--sources`` ta fayl (``--file-size`` bayt) yasaladi,
+yarim rejalar ularga ``file://`` yo'l bilan, qolgani ``https://`` URL bilan
+bog'lanadi. Har bir kun uchun barcha band slotlar ``dispatch_slot`` orqali
+yuboriladi; ikkinchi kundan oldin ``MessageScheduler`` qayta yaratiladi
+(restart: kesh ``media_files`` jadvalidan yuklanadi).
+
+Kesh bo'lmasa har bir yuborish faylni qayta yuklardi. Yuklashlar soni
+manbalar sonidan oshsa yoki biror reja yuborilmasa skript 1 bilan chiqadi.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pytz
+
+from benchmarks.common import fmt_bytes, print_table, random_time
+from config import TIMEZONE
+from db import Database
+
+# Kelajakdagi kunlar: claim_runs har bir slotni bo'sh ``last_run_at`` ustiga yozadi
+FIRST_DAY = (2030, 1, 1)
+UNLIMITED_RATE = 100_000_000
+USER_ID = 1
+
+
+def make_rows(tmp: str, args) -> list:
+    rng = random.Random(args.seed)
+    sources = []
+    for i in range(args.sources):
+        if i % 2:
+            sources.append(f"https://example.com/media/{i}.jpg")
+            continue
+        path = os.path.join(tmp, f"media_{i}.bin")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(args.file_size))
+        sources.append(f"file://{path}")
+    media_types = ('photo', 'video', 'document')
+    rows = []
+    for n in range(args.schedules):
+        source = sources[n % len(sources)]
+        channel_id = str(-1000000000000 - rng.randrange(max(2, args.schedules // 5)))
+        rows.append((channel_id, f"Challenge #{n}", random_time(rng, args.skew), False, "2025-01-01", "", True,
+                     media_types[n % len(sources) % len(media_types)], source))
+    return rows
+
+
+async def run_day(db: Database, bot, day: int) -> float:
+    from scheduler import MessageScheduler
+
+    tz = pytz.timezone(TIMEZONE)
+    scheduler = MessageScheduler(bot, db)
+    scheduler.shards.owned = frozenset(range(scheduler.shards.shards))
+    scheduler.send_queue.set_global_rate(UNLIMITED_RATE)
+    scheduler.send_queue.chat_rate = UNLIMITED_RATE
+    scheduler.media.load()
+    scheduler.send_queue.start()
+    scheduler.load_schedules(db.iter_schedules())
+    started = time.perf_counter()
+    year, month, first = FIRST_DAY
+    for slot in sorted(scheduler.dispatcher.slot_sizes()):
+        hour, minute = map(int, slot.split(':'))
+        await scheduler.dispatch_slot(tz.localize(datetime(year, month, first + day, hour, minute)))
+        await scheduler.send_queue.join()
+    elapsed = time.perf_counter() - started
+    await scheduler.stop()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--schedules', type=int, default=2_000)
+    parser.add_argument('--sources', type=int, default=20, help="Turli media manbalari soni")
+    parser.add_argument('--file-size', type=int, default=256 * 1024, help="Lokal fayl hajmi (bayt)")
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--skew', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from benchmarks.fake_telegram import FakeBot
+
+    bot = FakeBot()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = make_rows(tmp, args)
+        db = Database(os.path.join(tmp, "media.db"))
+        db.add_schedules(USER_ID, rows)
+        for day in range(args.days):
+            sent, uploads, uploaded = len(bot.sent), bot.uploads, bot.uploaded_bytes
+            elapsed = asyncio.run(run_day(db, bot, day))
+            results.append([
+                day + 1, f"{len(bot.sent) - sent:,}", bot.uploads - uploads,
+                fmt_bytes(bot.uploaded_bytes - uploaded), f"{elapsed:.2f}s",
+            ])
+        cached = len(db.get_media_files())
+        db.close()
+
+    print_table(["kun", "yuborildi", "yuklashlar", "yuklangan hajm", "vaqt"], results)
+    naive = args.schedules * args.days
+    print(f"Yuklashlar: {bot.uploads} (keshsiz {naive:,} bo'lardi), keshda {cached} ta file_id")
+    ok = True
+    if bot.uploads > args.sources or cached != min(args.sources, args.schedules):
+        print(f"FAIL: {bot.uploads} ta yuklash, {args.sources} ta manba")
+        ok = False
+    if len(bot.sent) != naive:
+        print(f"FAIL: {len(bot.sent)} ta yuborildi, {naive} kutilgan")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Suhbat persistence'i: handler kechikishi (o'chirilgan/yoqilgan) va restart'dan keyin davom etish.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_persistence --users 1000 --interval 1
+
+1. ``bench_conversations`` yuklamasi persistence o'chirilgan va yoqilgan
+   ``ChallengeBot`` bilan: update/s, handler p50/p99 hamda persistence
+   nechta qatorni nechta tranzaksiyada yozgani.
+2. Restart: foydalanuvchilar ``/send`` ning o'rtasigacha (``--split``
+   qadam) boradi, bot to'xtatiladi, xuddi shu bazada yangi ``ChallengeBot``
+   ochiladi va suhbatlar qolgan joyidan davom etadi. Har bir foydalanuvchi
+   uchun reja yozilmasa skript 1 bilan chiqadi.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import warnings
+
+from benchmarks.bench_conversations import attach_driver, run_users
+from benchmarks.common import percentile, print_table
+from benchmarks.fake_telegram import FakeRequest
+
+
+async def start_bot(db_file: str, args, persistence: bool):
+    from bot import ChallengeBot
+    from db import Database
+
+    bot = ChallengeBot(db=Database(db_file), request=FakeRequest(args.latency), persistence=persistence)
+    driver = attach_driver(bot.application)
+    await bot.application.initialize()
+    await bot.application.start()
+    return bot, driver
+
+
+async def stop_bot(bot):
+    """Jarayon to'xtashi: Application.stop() persistence'ni oxirgi marta yozadi"""
+    await bot.application.stop()
+    await bot.application.shutdown()
+    await bot.adb.close()
+    bot.db.close()
+
+
+async def measure(args, persistence: bool) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        bot, driver = await start_bot(os.path.join(tmp, "persistence.db"), args, persistence)
+        elapsed = await run_users(driver, args.users, args.think, args.seed)
+        await stop_bot(bot)
+    values = [v for values in driver.latencies.values() for v in values]
+    flushes = bot.persistence.flushes if bot.persistence else 0
+    rows = bot.persistence.flushed_rows if bot.persistence else 0
+    return [
+        "on" if persistence else "off", f"{len(values) / elapsed:,.0f}",
+        f"{statistics.median(values) * 1000:.1f}ms", f"{percentile(values, 99) * 1000:.1f}ms",
+        f"{max(values) * 1000:.1f}ms", f"{rows:,}", flushes,
+    ]
+
+
+async def restart(args) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "restart.db")
+        bot, driver = await start_bot(db_file, args, True)
+        await run_users(driver, args.users, args.think, args.seed, slice(None, args.split))
+        await stop_bot(bot)
+
+        bot, driver = await start_bot(db_file, args, True)
+        await run_users(driver, args.users, args.think, args.seed, slice(args.split, None))
+        await stop_bot(bot)
+
+        from db import Database
+        db = Database(db_file)
+        schedules = db.conn.execute("SELECT COUNT(*) FROM schedules").fetchone()[0]
+        leftover = db.conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        db.close()
+    print(f"Restart ({args.split}-qadamdan keyin): {schedules}/{args.users} suhbat davom etib reja yozildi, "
+          f"bazada qolgan ochiq suhbatlar: {leftover}")
+    return schedules == args.users and leftover == 0
+
+
+async def main_async(args) -> int:
+    rows = [await measure(args, persistence) for persistence in (False, True)]
+    print_table(["persistence", "updates/s", "p50", "p99", "max", "rows written", "transactions"], rows)
+    print()
+    return 0 if await restart(args) else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Bot API javob kechikishi (sekund)")
+    parser.add_argument('--concurrency', type=int, default=64, help="CONCURRENT_UPDATES qiymati")
+    parser.add_argument('--interval', type=float, default=1.0, help="Persistence yozish oralig'i (sekund)")
+    parser.add_argument('--think', type=float, default=0.0, help="Qadamlar orasidagi tasodifiy pauza (0..N sekund)")
+    parser.add_argument('--split', type=int, default=6, help="Restart shu qadamdan oldin (6 — ENTERING_TIME)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # config import paytida o'qiydi; scheduler o'lchovga kirmaydi
+    os.environ['CONCURRENT_UPDATES'] = str(args.concurrency)
+    os.environ['RUN_SCHEDULER'] = '0'
+    os.environ['PERSISTENCE_INTERVAL'] = str(args.interval)
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', message=".*per_message.*")
+    return asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
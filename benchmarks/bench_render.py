@@ -0,0 +1,80 @@
+"""Xabar matnini yig'ish: eski har safar hisoblash va kompilyatsiya qilingan shablon.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_render --renders 100000
+"""
+import argparse
+from datetime import datetime
+
+import pytz
+
+from config import TIMEZONE
+from templates import CompiledTemplate, day_context
+from benchmarks.common import print_table, timed
+
+MESSAGE = "Bugungi vazifa: 30 daqiqa kitob o'qish. Kun {kun}, {qoldi} kun qoldi!"
+PLAIN_MESSAGE = "Bugungi vazifa: 30 daqiqa kitob o'qish."
+START_DATE = "2025-01-01"
+END_DATE = "2030-01-01"
+
+
+def legacy_render(message: str, with_date: bool, start_date: str, end_date: str) -> str:
+    """Avvalgi send_scheduled_message ichidagi kod (o'zgarishsiz)"""
+    msg = message
+    if with_date:
+        today_dt = datetime.now(pytz.timezone(TIMEZONE))
+        oylar = ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul', 'avgust', 'sentyabr', 'oktyabr', 'noyabr', 'dekabr']
+        kunlar = ['dushanba', 'seshanba', 'chorshanba', 'payshanba', 'juma', 'shanba', 'yakshanba']
+        oy = oylar[today_dt.month - 1]
+        hafta_kuni = kunlar[today_dt.weekday()]
+        sana_str = f"{today_dt.day}-{oy}, {hafta_kuni}  [ {today_dt.strftime('%d.%m.%Y')} ]"
+        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+        challenge_kuni = (today_dt.date() - start_dt.date()).days + 1
+        msg = f"Bugun: {sana_str}\nkun: {challenge_kuni}\n"
+        if end_date and end_date.strip():
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+            remaining_days = (end_dt.date() - today_dt.date()).days
+            if remaining_days > 0:
+                msg += f"Maqsadingizga erishish uchun {remaining_days} kun qoldi\n"
+            else:
+                msg += "✅ Challenge tugagan!\n"
+        msg += f"\n{message}"
+    return msg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--renders', type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.renders
+
+    rows = []
+    for name, message, with_date in (
+        ("with_date", MESSAGE, True),
+        ("with_date, no vars", PLAIN_MESSAGE, True),
+        ("plain", PLAIN_MESSAGE, False),
+    ):
+        with timed() as legacy:
+            for _ in range(n):
+                legacy_render(message, with_date, START_DATE, END_DATE)
+        template = CompiledTemplate(message, with_date, START_DATE, END_DATE)
+        with timed() as compiled:
+            for _ in range(n):
+                template.render(day_context(TIMEZONE) if template.needs_day else None)
+        rows.append([
+            name,
+            f"{legacy['elapsed'] / n * 1e6:.2f}us",
+            f"{compiled['elapsed'] / n * 1e6:.2f}us",
+            f"{legacy['elapsed'] / compiled['elapsed']:.1f}x",
+        ])
+    print_table(["message", "legacy/render", "compiled/render", "speedup"], rows)
+
+    # Natija bir xil ekanligini tekshirish ({kun} kabi o'zgaruvchilarsiz matnda)
+    for with_date in (True, False):
+        assert legacy_render(PLAIN_MESSAGE, with_date, START_DATE, END_DATE) == \
+            CompiledTemplate(PLAIN_MESSAGE, with_date, START_DATE, END_DATE).render(day_context(TIMEZONE))
+
+
+if __name__ == '__main__':
+    main()
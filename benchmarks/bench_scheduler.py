@@ -0,0 +1,177 @@
+"""MessageScheduler orqali bir kunlik dispatch: o'tkazuvchanlik, kechikish va xotira.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_scheduler --schedules 10k,100k --skew 0.8
+    python -m benchmarks.bench_scheduler --latency 0.02 --retry-after-rate 0.01
+
+Vaqtinchalik bazaga sun'iy rejalar yoziladi (``--skew`` ulushi bir nechta
+mashhur vaqtga, masalan 09:00 ga tushadi), ular ``MessageScheduler`` ga
+yuklanadi va kundagi har bir band slot ``dispatch_slot`` orqali ketma-ket
+yuboriladi. Bot o'rnida tarmoqsiz ``FakeBot``: u kechikish qo'shadi va
+berilgan ulushdagi chaqiruvlarni ``RetryAfter`` bilan rad etadi.
+
+Bir kanalga bir daqiqada tushgan rejalar bitta xabarga birlashtiriladi
+(``saved`` — tejalgan API chaqiruvlari); ``--no-merge`` buni o'chiradi.
+
+Kechikish — slot dispatch'i boshlangan paytdan xabar yuborilgangacha.
+Rate limit'lar standart holda o'chirilgan (scheduler'ning o'z narxi
+o'lchanadi); ``--global-rate`` bilan yoqish mumkin.
+
+CI uchun: ``--max-p99-lag`` va ``--min-throughput`` chegaralari buzilsa,
+yoki biror reja yuborilmasa/ikki marta yuborilsa skript 1 bilan chiqadi.
+``--json`` natijalarni mashina o'qiydigan ko'rinishda chiqaradi.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import cast
+
+import pytz
+from telegram import Bot
+
+from config import TIMEZONE
+from db import Database
+from benchmarks.common import (
+    fmt_bytes, parse_sizes, percentile, print_table, seed_schedules, synthetic_entries
+)
+
+# Kelajakdagi kun: claim_runs har bir slotni bo'sh ``last_run_at`` ustiga yozadi
+DAY = (2030, 1, 1)
+UNLIMITED_RATE = 100_000_000
+SCHEDULE_ID_RE = re.compile(r'#(\d+)')
+
+
+async def run(count: int, args) -> dict:
+    from scheduler import MessageScheduler, peak_rss_bytes
+    from benchmarks.fake_telegram import FakeBot
+
+    tz = pytz.timezone(TIMEZONE)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "scheduler.db")
+        seed_schedules(db_file, synthetic_entries(count, args.seed, args.skew))
+        db = Database(db_file)
+        if args.no_merge:
+            with db.transaction() as cursor:
+                cursor.execute("UPDATE schedules SET merge_sends = 0")
+        bot = FakeBot(args.latency, args.retry_after_rate, args.retry_after, args.seed)
+        baseline = peak_rss_bytes() or 0
+
+        scheduler = MessageScheduler(cast(Bot, bot), db)
+        # Lease olinmaydi: bitta jarayon barcha shard'larga egalik qiladi
+        scheduler.shards.owned = frozenset(range(scheduler.shards.shards))
+        scheduler.send_queue.set_global_rate(args.global_rate or UNLIMITED_RATE)
+        scheduler.send_queue.chat_rate = args.chat_rate or UNLIMITED_RATE
+        scheduler.send_queue.start()
+        scheduler.load_schedules(db.iter_schedules())
+        loaded = len(scheduler.dispatcher)
+
+        lags, slot_times = [], []
+        elapsed = 0.0
+        for slot in sorted(scheduler.dispatcher.slot_sizes()):
+            hour, minute = map(int, slot.split(':'))
+            moment = tz.localize(datetime(*DAY, hour, minute))
+            first = len(bot.sent_at)
+            started = time.perf_counter()
+            await scheduler.dispatch_slot(moment)
+            await scheduler.send_queue.join()
+            took = time.perf_counter() - started
+            elapsed += took
+            slot_times.append((took, slot))
+            lags.extend(at - started for at in bot.sent_at[first:])
+
+        await scheduler.stop()
+        rss = (peak_rss_bytes() or 0) - baseline
+        db.close()
+
+    # Birlashtirilgan xabarda bir nechta "#id" bo'ladi
+    sent = Counter(int(schedule_id) for _, text in bot.sent for schedule_id in SCHEDULE_ID_RE.findall(text))
+    slowest, hot_slot = max(slot_times)
+    return {
+        'schedules': count,
+        'loaded': loaded,
+        'slots': len(slot_times),
+        'sent': len(bot.sent),
+        'duplicates': sum(1 for n in sent.values() if n > 1),
+        'missing': count - len(sent),
+        'saved': scheduler.api_calls_saved,
+        'retried': scheduler.send_queue.retried,
+        'dead_letters': scheduler.send_queue.failed,
+        'elapsed': elapsed,
+        'throughput': len(bot.sent) / elapsed if elapsed else 0.0,
+        'lag_p50': percentile(lags, 50),
+        'lag_p95': percentile(lags, 95),
+        'lag_p99': percentile(lags, 99),
+        'hot_slot': hot_slot,
+        'hot_slot_seconds': slowest,
+        'rss_growth': rss,
+    }
+
+
+def check(result: dict, args) -> list:
+    """CI chegaralari: buzilganlari ro'yxati"""
+    problems = []
+    if result['missing'] or result['duplicates']:
+        problems.append(f"yuborilmagan: {result['missing']}, ikki marta: {result['duplicates']}")
+    if args.max_p99_lag is not None and result['lag_p99'] > args.max_p99_lag:
+        problems.append(f"p99 kechikish {result['lag_p99']:.3f}s > {args.max_p99_lag}s")
+    if args.min_throughput is not None and result['throughput'] < args.min_throughput:
+        problems.append(f"o'tkazuvchanlik {result['throughput']:.0f} < {args.min_throughput:.0f} xabar/s")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--schedules', default='10k', help="Rejalar soni, masalan 10k,100k")
+    parser.add_argument('--skew', type=float, default=0.8, help="Mashhur vaqtlarga tushadigan ulush (0..1)")
+    parser.add_argument('--latency', type=float, default=0.0, help="send_message kechikishi (sekund)")
+    parser.add_argument('--retry-after-rate', type=float, default=0.0, help="RetryAfter bilan rad etish ulushi")
+    parser.add_argument('--retry-after', type=float, default=0.05, help="RetryAfter qiymati (sekund)")
+    parser.add_argument('--global-rate', type=int, default=0, help="xabar/sekund; 0 — cheklovsiz")
+    parser.add_argument('--chat-rate', type=int, default=0, help="xabar/daqiqa; 0 — cheklovsiz")
+    parser.add_argument('--no-merge', action='store_true', help="Rejalarni birlashtirmaslik (merge_sends = 0)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-p99-lag', type=float, help="p99 kechikish chegarasi (sekund)")
+    parser.add_argument('--min-throughput', type=float, help="Eng kam o'tkazuvchanlik (xabar/sekund)")
+    parser.add_argument('--json', action='store_true', help="Natijalarni JSON qatorlar sifatida chiqarish")
+    args = parser.parse_args()
+
+    # Har bir xabar uchun INFO log o'lchovni buzadi
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    rows, failures = [], 0
+    for count in parse_sizes(args.schedules):
+        result = asyncio.run(run(count, args))
+        problems = check(result, args)
+        failures += bool(problems)
+        result['problems'] = problems
+        if args.json:
+            print(json.dumps(result))
+            continue
+        rows.append([
+            f"{count:,}", result['slots'], f"{result['sent']:,}", f"{result['saved']:,}", result['retried'],
+            f"{result['elapsed']:.2f}s", f"{result['throughput']:,.0f}",
+            f"{result['lag_p50'] * 1000:.0f}ms", f"{result['lag_p95'] * 1000:.0f}ms",
+            f"{result['lag_p99'] * 1000:.0f}ms",
+            f"{result['hot_slot']} {result['hot_slot_seconds']:.2f}s",
+            fmt_bytes(result['rss_growth']), "; ".join(problems) or "ok",
+        ])
+    if not args.json:
+        print_table([
+            "schedules", "slots", "sent", "saved", "retried", "dispatch", "msg/s",
+            "p50", "p95", "p99", "hot slot", "RSS growth", "result",
+        ], rows)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
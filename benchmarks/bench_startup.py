@@ -0,0 +1,86 @@
+"""Ishga tushishda rejalarni yuklash: eski fetchall va oqimli yuklovchi.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_startup --rows 100k
+
+Vaqtinchalik bazaga sun'iy rejalar yoziladi, so'ng har bir usul alohida
+jarayonda ishga tushiriladi (peak RSS jarayon bo'yicha o'lchanadi):
+
+* legacy — ``get_all_schedules()`` (fetchall) va har bir qator uchun
+  ``add_schedule_job`` (INFO log bilan);
+* stream — ``iter_schedules()`` bo'laklari va ``load_schedules``.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from typing import cast
+
+from telegram import Bot
+
+from db import Database
+from benchmarks.common import fmt_bytes, parse_sizes, print_table, seed_schedules, synthetic_entries, timed
+
+
+def child(mode: str, db_file: str):
+    from scheduler import MessageScheduler, peak_rss_bytes
+
+    # Log chiqishi ham yuklash narxiga kiradi, lekin terminalni to'ldirmasin
+    logging.getLogger().handlers = [logging.StreamHandler(open(os.devnull, 'w'))]
+    db = Database(db_file)
+    baseline = peak_rss_bytes() or 0
+    with timed() as t:
+        # Yuklashda bot ishlatilmaydi
+        scheduler = MessageScheduler(cast(Bot, None), db)
+        # Lease olinmaydi: bitta jarayon barcha rejalarni yuklaydi
+        scheduler.shards.owned = frozenset(range(scheduler.shards.shards))
+        if mode == 'legacy':
+            for schedule in db.get_all_schedules():
+                schedule_id, user_id, channel_id, message, time, with_date, start_date, end_date = schedule[:8]
+                scheduler.add_schedule_job(
+                    user_id, channel_id, schedule_id, time, message, bool(with_date), start_date, end_date or ""
+                )
+        else:
+            scheduler.load_schedules(db.iter_schedules())
+    print(json.dumps({
+        'elapsed': t['elapsed'],
+        'loaded': len(scheduler.dispatcher),
+        'rss_growth': (peak_rss_bytes() or 0) - baseline,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--rows', default='100k', help="Rejalar soni, masalan 10k,100k")
+    parser.add_argument('--child', choices=('legacy', 'stream'), help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.db)
+        return
+
+    rows = []
+    for size in parse_sizes(args.rows):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "startup.db")
+            seed_schedules(db_file, synthetic_entries(size))
+            results = {}
+            for mode in ('legacy', 'stream'):
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode, '--db', db_file],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                results[mode] = json.loads(out.strip().splitlines()[-1])
+        for mode, r in results.items():
+            assert r['loaded'] == size, f"{mode}: {r['loaded']} != {size}"
+            rows.append([f"{size:,}", mode, f"{r['elapsed']:.2f}s", fmt_bytes(r['rss_growth'])])
+    print_table(["rows", "loader", "startup", "peak RSS growth"], rows)
+
+
+if __name__ == '__main__':
+    main()
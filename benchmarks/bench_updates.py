@@ -0,0 +1,167 @@
+"""Update qabul qilish tezligi: long polling va webhook (updates/sec).
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.bench_updates --updates 2000 --latency 0.05 --concurrency 16
+
+Har bir update handler'i ``reply_text`` qiladi; Bot API ``FakeRequest``
+orqali ``--latency`` sekund kechikish bilan javob beradi. Polling rejimida
+update'lar soxta ``getUpdates`` dan olinadi, webhook rejimida esa
+haqiqiy ichki HTTP server'ga (tornado) lokal POST so'rovlar yuboriladi.
+Webhook uchun ``python-telegram-bot[webhooks]`` o'rnatilgan bo'lishi kerak.
+"""
+import argparse
+import asyncio
+import json
+import secrets
+from typing import Dict, List
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes, MessageHandler, filters
+
+from benchmarks.common import print_table, timed
+from benchmarks.fake_telegram import FakeRequest, make_update
+
+WEBHOOK_PATH = "telegram"
+
+
+class Counter:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.finished = asyncio.Event()
+
+    async def handle(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if update.message:
+            await update.message.reply_text("ok")
+        self.done += 1
+        if self.done >= self.total:
+            self.finished.set()
+
+
+def build_application(request: FakeRequest, concurrency: int, counter: Counter) -> Application:
+    application = (
+        Application.builder()
+        .token("1:bench")
+        .request(request)
+        .get_updates_request(request)
+        .concurrent_updates(concurrency)
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.TEXT, counter.handle))
+    return application
+
+
+def synthetic_updates(count: int) -> List[Dict]:
+    return [make_update(i + 1, 1000 + i % 500, f"xabar {i}") for i in range(count)]
+
+
+async def run_polling(updates: List[Dict], concurrency: int, latency: float) -> float:
+    request = FakeRequest(latency)
+    counter = Counter(len(updates))
+    application = build_application(request, concurrency, counter)
+    updater = application.updater
+    assert updater is not None
+    await application.initialize()
+    await application.start()
+    request.push_updates(updates)
+    with timed() as t:
+        await updater.start_polling(poll_interval=0, timeout=0)
+        await counter.finished.wait()
+    await updater.stop()
+    await application.stop()
+    await application.shutdown()
+    return len(updates) / t['elapsed']
+
+
+async def post(reader, writer, body: bytes, secret: str) -> int:
+    """Bitta keep-alive ulanish orqali POST; HTTP status qaytaradi"""
+    writer.write(
+        f"POST /{WEBHOOK_PATH} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(port: int, bodies: List[bytes], secret: str):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for body in bodies:
+            status = await post(reader, writer, body, secret)
+            if status != 200:
+                raise RuntimeError(f"Webhook {status} qaytardi")
+    finally:
+        writer.close()
+
+
+async def run_webhook(updates: List[Dict], concurrency: int, latency: float, port: int, clients: int) -> float:
+    request = FakeRequest(latency)
+    counter = Counter(len(updates))
+    application = build_application(request, concurrency, counter)
+    updater = application.updater
+    assert updater is not None
+    secret = secrets.token_urlsafe(32)
+    await application.initialize()
+    await application.start()
+    await updater.start_webhook(
+        listen="127.0.0.1", port=port, url_path=WEBHOOK_PATH,
+        webhook_url=f"https://example.invalid/{WEBHOOK_PATH}", secret_token=secret,
+    )
+    try:
+        # Noto'g'ri token bilan kelgan so'rov rad etilishi kerak
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        status = await post(reader, writer, json.dumps(make_update(0, 1, "x")).encode(), "wrong")
+        writer.close()
+        assert status == 403, f"secret token tekshirilmadi: {status}"
+
+        bodies = [json.dumps(u).encode() for u in updates]
+        with timed() as t:
+            await asyncio.gather(*(client(port, bodies[i::clients], secret) for i in range(clients)))
+            await counter.finished.wait()
+    finally:
+        await updater.stop()
+        await application.stop()
+        await application.shutdown()
+    return len(updates) / t['elapsed']
+
+
+async def main_async(args):
+    updates = synthetic_updates(args.updates)
+    rows = []
+    for concurrency in sorted({1, args.concurrency}):
+        rate = await run_polling(updates, concurrency, args.latency)
+        rows.append(["polling", concurrency, f"{rate:,.0f}"])
+    for concurrency in sorted({1, args.concurrency}):
+        try:
+            rate = await run_webhook(updates, concurrency, args.latency, args.port, args.clients)
+        except RuntimeError as e:
+            rows.append(["webhook", concurrency, f"o'tkazib yuborildi: {e}"])
+            continue
+        rows.append(["webhook", concurrency, f"{rate:,.0f}"])
+    print_table(["mode", "concurrent_updates", "updates/sec"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05, help="Bot API javob kechikishi (sekund)")
+    parser.add_argument('--concurrency', type=int, default=16, help="CONCURRENT_UPDATES qiymati")
+    parser.add_argument('--clients', type=int, default=8, help="Webhook'ga parallel HTTP ulanishlar")
+    parser.add_argument('--port', type=int, default=18443)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Bir nechta scheduler jarayoni: ikki marta yuborish yo'qligi va o'tkazuvchanlik.
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.check_shards --schedules 50k --workers 1,4 --shards 16
+
+Vaqtinchalik bazaga bitta slotdagi rejalar yoziladi va ``--workers`` ta
+haqiqiy jarayon (``MessageScheduler`` + soxta bot) ishga tushiriladi.
+Qo'shimcha bitta "qurbon" jarayon shard olgandan keyin SIGKILL bilan
+o'ldiriladi; uning shard'larini qolganlar lease muddati o'tgach egallashi
+kerak. So'ng hamma jarayon bir vaqtda slotni ikki marta dispatch qiladi.
+Har bir reja aynan bir marta yuborilmasa skript 1 bilan chiqadi.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import cast
+
+from telegram import Bot
+
+from benchmarks.common import parse_sizes, print_table
+
+LEASE_TTL = 2.0
+# Jarayonlar shu muhit o'zgaruvchilari bilan ishga tushadi (config import paytida o'qiydi)
+CHILD_ENV = {
+    'SHARD_LEASE_TTL': str(LEASE_TTL),
+    'SHARD_HEARTBEAT_INTERVAL': '0.2',
+    'SCHEDULE_SYNC_INTERVAL': '0.2',
+    'MISFIRE_GRACE_TIME': '0',
+    'GLOBAL_RATE_LIMIT': '100000000',
+    'CHAT_RATE_LIMIT': '100000000',
+    'SEND_QUEUE_MAXSIZE': '100000',
+}
+
+
+def slot_moment() -> datetime:
+    """Haqiqiy daqiqalik tick bilan to'qnashmaydigan slot"""
+    import pytz
+    from config import TIMEZONE
+    return datetime.now(pytz.timezone(TIMEZONE)).replace(second=0, microsecond=0) + timedelta(hours=12)
+
+
+def seed(db_file: str, count: int, slot: str):
+    from db import Database
+    db = Database(db_file)
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO schedules (user_id, channel_id, message, time, with_date, start_date, end_date) "
+            "VALUES (?, ?, ?, ?, 0, '2025-01-01', '')",
+            ((i % 1000, str(-1000000000000 - i % 5000), f"#{i}", slot) for i in range(1, count + 1))
+        )
+    db.close()
+
+
+async def child(db_file: str, moment: datetime, go_at: float, victim: bool):
+    from db import Database
+    from scheduler import MessageScheduler
+    from benchmarks.fake_telegram import FakeBot
+
+    bot = FakeBot()
+    scheduler = MessageScheduler(cast(Bot, bot), Database(db_file))
+    scheduler.start()
+    if victim:
+        print(json.dumps({'ready': True}), flush=True)
+        await asyncio.Event().wait()
+    await asyncio.sleep(max(0.0, go_at - time.time()))
+
+    started = time.perf_counter()
+    claimed = await scheduler.dispatch_slot(moment)
+    await scheduler.send_queue.join()
+    elapsed = time.perf_counter() - started
+    # Ikkinchi urinish hech narsa band qila olmasligi kerak
+    again = await scheduler.dispatch_slot(moment)
+    owned = sorted(scheduler.shards.owned)
+    await scheduler.stop()
+    print(json.dumps({
+        'owned': owned,
+        'claimed': claimed,
+        'again': again,
+        'elapsed': elapsed,
+        # Birlashtirilgan xabarda bir nechta "#id" bo'ladi
+        'sent': [int(i) for _, text in bot.sent for i in re.findall(r'#(\d+)', text)],
+    }), flush=True)
+
+
+def spawn(db_file: str, moment: datetime, go_at: float, shards: int, victim: bool = False) -> subprocess.Popen:
+    env = dict(os.environ, SCHEDULER_SHARDS=str(shards), **CHILD_ENV)
+    args = [sys.executable, '-m', 'benchmarks.check_shards', '--child', db_file,
+            '--moment', moment.isoformat(), '--go-at', str(go_at)]
+    if victim:
+        args.append('--victim')
+    return subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+
+def run(count: int, workers: int, shards: int):
+    moment = slot_moment()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "shards.db")
+        seed(db_file, count, moment.strftime('%H:%M'))
+        go_at = time.time() + 3 * LEASE_TTL + 3
+        victim = spawn(db_file, moment, go_at, shards, victim=True)
+        assert victim.stdout is not None
+        victim.stdout.readline()
+        procs = [spawn(db_file, moment, go_at, shards) for _ in range(workers)]
+        # Qurbon shard'larni ushlab turgan paytda o'ldiriladi
+        time.sleep(LEASE_TTL)
+        # SIGKILL (POSIX'da): lease'lar bo'shatilmaydi
+        victim.kill()
+        victim.wait()
+        results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+
+    sent = Counter(i for r in results for i in r['sent'])
+    duplicates = sum(1 for n in sent.values() if n > 1)
+    missing = count - len(sent)
+    owned = sorted(s for r in results for s in r['owned'])
+    ok = (duplicates == 0 and missing == 0 and owned == list(range(shards))
+          and all(r['again'] == 0 for r in results))
+    elapsed = max(r['elapsed'] for r in results)
+    return ok, [
+        f"{count:,}", workers, sum(r['claimed'] for r in results), duplicates, missing,
+        f"{elapsed:.2f}s", f"{count / elapsed:,.0f}", "ok" if ok else "FAIL",
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--schedules', default='50k')
+    parser.add_argument('--workers', default='1,4')
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--moment', help=argparse.SUPPRESS)
+    parser.add_argument('--go-at', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--victim', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(args.child, datetime.fromisoformat(args.moment), args.go_at, args.victim))
+        return 0
+
+    rows, failures = [], 0
+    for count in parse_sizes(args.schedules):
+        for workers in parse_sizes(args.workers):
+            ok, row = run(count, workers, args.shards)
+            failures += not ok
+            rows.append(row)
+    print_table(["schedules", "workers", "sent", "duplicates", "missing", "dispatch", "msg/s", "result"], rows)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Benchmarklar uchun umumiy yordamchilar"""
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List
+
+from dispatcher import ScheduleEntry, slot_key
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_sizes(text: str) -> List[int]:
+    """'10k,100k,1M' kabi qatorni sonlar ro'yxatiga aylantirish"""
+    sizes = []
+    for part in text.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        factor = 1
+        if part.endswith('k'):
+            factor, part = 1_000, part[:-1]
+        elif part.endswith('m'):
+            factor, part = 1_000_000, part[:-1]
+        sizes.append(int(float(part) * factor))
+    return sizes
+
+
+# Ko'pchilik tanlaydigan vaqtlar (skewed taqsimot uchun), ulushi kamayib boradi
+POPULAR_TIMES = ("09:00", "06:00", "08:00", "21:00", "07:00", "20:00", "05:00", "22:00")
+
+
+def random_time(rng: random.Random, skew: float = 0.0) -> str:
+    """Tasodifiy HH:MM; ``skew`` ulushdagi rejalar ``POPULAR_TIMES`` ga tushadi"""
+    if skew and rng.random() < skew:
+        # Zipf'ga o'xshash: birinchi vaqt eng ko'p tanlanadi
+        weights = [1 / (i + 1) for i in range(len(POPULAR_TIMES))]
+        return rng.choices(POPULAR_TIMES, weights)[0]
+    minute_of_day = rng.randrange(MINUTES_PER_DAY)
+    return slot_key(minute_of_day // 60, minute_of_day % 60)
+
+
+def synthetic_entries(count: int, seed: int = 42, skew: float = 0.0) -> Iterator[ScheduleEntry]:
+    """Sun'iy rejalar: kun bo'yicha tekis yoki ``skew`` ulushi mashhur vaqtlarda"""
+    rng = random.Random(seed)
+    for schedule_id in range(1, count + 1):
+        yield ScheduleEntry(
+            schedule_id,
+            rng.randrange(1, max(2, count // 10)),
+            str(-1000000000000 - rng.randrange(max(2, count // 5))),
+            random_time(rng, skew),
+            f"Challenge xabari #{schedule_id}",
+            bool(schedule_id % 2),
+            "2025-01-01",
+            "",
+        )
+
+
+def seed_schedules(db_file: str, entries: Iterable[ScheduleEntry]):
+    """Rejalarni bitta tranzaksiyada ``schedules`` jadvaliga yozish (id'lar saqlanadi)"""
+    from db import Database
+    db = Database(db_file)
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO schedules (id, user_id, channel_id, message, time, with_date, start_date, end_date) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((e.schedule_id, e.user_id, e.channel_id, e.message, e.time, int(e.with_date), e.start_date, e.end_date)
+             for e in entries)
+        )
+    db.close()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+@contextmanager
+def traced_memory():
+    """Blok ichida ajratilgan xotira cho'qqisini o'lchash (bayt)"""
+    result = {}
+    tracemalloc.start()
+    try:
+        yield result
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['current'] = current
+        result['peak'] = peak
+
+
+@contextmanager
+def timed():
+    """Blok bajarilish vaqtini o'lchash (sekund)"""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['elapsed'] = time.perf_counter() - start
+
+
+def fmt_bytes(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def print_table(headers: List[str], rows: List[List[str]]):
+    widths = [max(len(str(x)) for x in col) for col in zip(headers, *rows)]
+    line = "  ".join(h.ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for row in rows:
+        print("  ".join(str(x).ljust(w) for x, w in zip(row, widths)))
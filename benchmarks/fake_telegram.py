@@ -0,0 +1,228 @@
+"""Benchmarklar uchun soxta Telegram Bot API (tarmoqsiz).
+
+``FakeRequest`` python-telegram-bot'ning ``BaseRequest`` interfeysini
+amalga oshiradi, shuning uchun haqiqiy ``Application`` va ``Bot`` bilan
+ishlaydi: ``getUpdates`` oldindan qo'yilgan update'larni qaytaradi,
+boshqa metodlar esa berilgan kechikish bilan javob beradi. ``getChat`` va
+``getChatMember`` har qanday kanalni bot admin bo'lgan kanal deb qaytaradi.
+"""
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from telegram.error import Forbidden, RetryAfter
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    """Shaxsiy chatdan kelgan matnli xabar update'i"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        "text": text,
+    }
+    if text.startswith('/'):
+        command = text.split(None, 1)[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def make_callback_update(update_id: int, user_id: int, data: str) -> Dict[str, Any]:
+    """Inline tugma bosilganda keladigan callback_query update'i"""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "...",
+            },
+        },
+    }
+
+
+def channel_id_for(username: str) -> int:
+    """``@kanal_123`` -> barqaror soxta kanal ID'si"""
+    digits = ''.join(ch for ch in username if ch.isdigit()) or '0'
+    return -1001000000000 - int(digits)
+
+
+class FakeRequest(BaseRequest):
+    """Bot API javoblarini xotirada yasaydigan request"""
+
+    def __init__(self, latency: float = 0.0, poll_timeout: float = 0.05):
+        self.latency = latency
+        self.poll_timeout = poll_timeout
+        self.pending: List[Dict[str, Any]] = []
+        self.calls: Dict[str, int] = {}
+        self._message_id = 0
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def push_updates(self, updates: List[Dict[str, Any]]):
+        self.pending.extend(updates)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ) -> Tuple[int, bytes]:
+        endpoint = url.rsplit('/', 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        params = request_data.parameters if request_data else {}
+        result = await self._handle(endpoint, params)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    async def _handle(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        if endpoint == 'getMe':
+            return BOT_USER
+        if endpoint == 'getUpdates':
+            return await self._get_updates(params)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if endpoint == 'getChat':
+            chat_id = params["chat_id"]
+            username = chat_id.lstrip('@') if isinstance(chat_id, str) and chat_id.startswith('@') else None
+            chat_id = channel_id_for(username) if username else int(chat_id)
+            return {"id": chat_id, "type": "channel", "title": f"Kanal {chat_id}", "username": username}
+        if endpoint == 'getChatMember':
+            return {
+                "status": "administrator", "user": BOT_USER, "can_be_edited": False,
+                "is_anonymous": False, "can_manage_chat": True, "can_delete_messages": True,
+                "can_manage_video_chats": True, "can_restrict_members": True,
+                "can_promote_members": False, "can_change_info": True, "can_invite_users": True,
+                "can_post_messages": True, "can_post_stories": True, "can_edit_stories": True,
+                "can_delete_stories": True,
+            }
+        if endpoint == 'sendMessage':
+            self._message_id += 1
+            return {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id"), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = params.get("offset") or 0
+        limit = params.get("limit") or 100
+        self.pending = [u for u in self.pending if u["update_id"] >= offset]
+        if not self.pending:
+            await asyncio.sleep(self.poll_timeout)
+            return []
+        return self.pending[:limit]
+
+
+class FakeBot:
+    """``SendQueue`` uchun soxta bot: ``send_message`` chaqiruvlarini yozib boradi.
+
+    ``send_photo``/``send_video``/``send_document`` ham yoziladi: ``sent`` ga
+    izoh tushadi, fayl obyekti yoki URL kelsa yuklash (``uploads``,
+    ``uploaded_bytes``) hisoblanadi va yangi ``file_id`` qaytariladi.
+    ``get_chat_member`` bot'ni har qanday kanalda admin deb qaytaradi;
+    ``kicked`` dagi kanallar ``Forbidden``, ``demoted`` dagilari ``member`` beradi.
+    ``retry_after_rate`` ulushdagi chaqiruvlar ``RetryAfter(retry_after)``
+    bilan rad etiladi (flood limit'ni taqlid qilish); ``seed`` bilan takrorlanadi.
+    """
+
+    id = BOT_USER["id"]
+
+    def __init__(self, latency: float = 0.0, retry_after_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 42):
+        self.latency = latency
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self.sent: List[Tuple[str, str]] = []
+        # ``sent`` bilan parallel: har bir xabar yuborilgan ``time.perf_counter()``
+        self.sent_at: List[float] = []
+        self.calls = 0
+        self.rejected = 0
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.kicked: Set[str] = set()
+        self.demoted: Set[str] = set()
+        self.member_calls = 0
+
+    async def send_message(self, chat_id, text: str, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.retry_after_rate and self._rng.random() < self.retry_after_rate:
+            self.rejected += 1
+            # PTB retry_after ni int deb e'lon qiladi, lekin kasr sekund ham ishlaydi
+            raise RetryAfter(self.retry_after)  # pyright: ignore[reportArgumentType]
+        if str(chat_id) in self.kicked or str(chat_id) in self.demoted:
+            self.rejected += 1
+            raise Forbidden("Forbidden: bot is not a member of the channel chat")
+        self.sent.append((chat_id, text))
+        self.sent_at.append(time.perf_counter())
+
+    async def send_photo(self, chat_id, photo, caption: Optional[str] = None, **kwargs):
+        return await self._send_media('photo', chat_id, photo, caption)
+
+    async def send_video(self, chat_id, video, caption: Optional[str] = None, **kwargs):
+        return await self._send_media('video', chat_id, video, caption)
+
+    async def send_document(self, chat_id, document, caption: Optional[str] = None, **kwargs):
+        return await self._send_media('document', chat_id, document, caption)
+
+    async def _send_media(self, media_type: str, chat_id, media, caption: Optional[str]):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.retry_after_rate and self._rng.random() < self.retry_after_rate:
+            self.rejected += 1
+            # PTB retry_after ni int deb e'lon qiladi, lekin kasr sekund ham ishlaydi
+            raise RetryAfter(self.retry_after)  # pyright: ignore[reportArgumentType]
+        if hasattr(media, 'read'):
+            self.uploaded_bytes += len(media.read())
+            self.uploads += 1
+            file_id = f"fake-file-{self.uploads}"
+        elif media.startswith(('http://', 'https://')):
+            self.uploads += 1
+            file_id = f"fake-file-{self.uploads}"
+        else:
+            file_id = media
+        self.sent.append((chat_id, caption or ""))
+        self.sent_at.append(time.perf_counter())
+        attachment = SimpleNamespace(file_id=file_id)
+        return SimpleNamespace(**{media_type: [attachment] if media_type == 'photo' else attachment})
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.member_calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        chat_id = str(chat_id)
+        if chat_id in self.kicked:
+            raise Forbidden("Forbidden: bot was kicked from the channel chat")
+        if chat_id in self.demoted:
+            return SimpleNamespace(status="member")
+        return SimpleNamespace(status="administrator", can_post_messages=True)
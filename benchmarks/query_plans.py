@@ -0,0 +1,101 @@
+"""Hot so'rovlar indeksdan foydalanishini tekshirish (query-plan regressiyasi).
+
+Ishga tushirish (repo ildizidan):
+
+    python -m benchmarks.query_plans
+
+Database'ning public metodlari vaqtinchalik bazada chaqiriladi, bajarilgan
+har bir SQL trace callback orqali yig'iladi va ``EXPLAIN QUERY PLAN``
+bilan tekshiriladi. Jadvalni to'liq skan qiladigan so'rov topilsa, skript
+nolga teng bo'lmagan kod bilan chiqadi (CI uchun).
+"""
+import os
+import sys
+import tempfile
+from typing import List
+
+from db import Database
+
+# Qatorlar soni worker/shard soniga teng jadvallar: to'liq skan arzon
+SMALL_TABLES = ("scheduler_workers", "shard_leases")
+
+
+def hot_calls(db: Database):
+    """Bot ish paytida tez-tez chaqiriladigan metodlar"""
+    db.add_user(1, "user")
+    db.add_channel(1, "-1001", "Kanal")
+    db.get_user_channels(1)
+    schedule_id = db.add_schedule(1, "-1001", "Xabar", "09:00", True, "2025-01-01", "")
+    db.get_user_schedules(1)
+    db.get_user_schedules_page(1)
+    db.get_user_schedules_page(1, after_id=0)
+    db.get_schedule_by_id(schedule_id)
+    db.complete_expired_schedules("2025-01-01")
+    db.claim_runs("2025-01-01 09:00", [schedule_id])
+    db.get_last_runs([schedule_id])
+    db.get_schedule_rows([schedule_id])
+    db.get_schedule_events(0)
+    db.add_schedules(1, [("-1001", "Xabar", "10:00", False, "2025-01-01", "", True, "photo", "https://x/1.jpg")])
+    db.save_media_file("https://x/1.jpg", "photo", "file-1")
+    list(db.iter_schedules(user_id=1))
+    db.sync_leases("worker", 4, 30.0, 0.0)
+    db.save_persistence({1: '{"time": "09:00"}', 2: None}, {("send", "[1, 1]"): "2", ("send", "[2, 2]"): None})
+    db.load_conversations("send")
+    db.set_merge_sends(schedule_id, 1, False)
+    db.get_channel_states_page("", 20)
+    db.get_channel_states(["-1001"])
+    db.pause_channel("-1001")
+    db.resume_channel("-1001")
+    db.delete_schedule(schedule_id)
+    db.delete_channel(1, "-1001")
+
+
+def collect_statements(db: Database) -> List[str]:
+    statements: List[str] = []
+
+    def trace(sql: str):
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if head in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            statements.append(sql)
+
+    db.conn.set_trace_callback(trace)
+    try:
+        hot_calls(db)
+    finally:
+        db.conn.set_trace_callback(None)
+    return statements
+
+
+def full_scans(db: Database, sql: str) -> List[str]:
+    plan = db.conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    details = [row[-1] for row in plan]
+    # "SCAN x USING INDEX" ham butun indeksni o'qiydi; faqat SEARCH qabul qilinadi
+    return [
+        d for d in details
+        if d.startswith("SCAN") and "CONSTANT ROW" not in d
+        and not any(d.split()[1] == table for table in SMALL_TABLES)
+    ]
+
+
+def main() -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "plans.db"))
+        for sql in collect_statements(db):
+            scans = full_scans(db, sql)
+            summary = " ".join(sql.split())
+            if scans:
+                failures += 1
+                print(f"FAIL  {summary}\n      {'; '.join(scans)}")
+            else:
+                print(f"ok    {summary}")
+        db.close()
+    if failures:
+        print(f"\n{failures} ta so'rov jadvalni to'liq skan qilmoqda")
+        return 1
+    print("\nBarcha hot so'rovlar indeksdan foydalanadi")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,76 +1,169 @@
+import asyncio
 import logging
 import re
-import sqlite3
+import secrets
+import signal
+import tempfile
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler, CallbackQueryHandler,
+    Application, BaseUpdateProcessor, CommandHandler, MessageHandler, CallbackQueryHandler,
     ContextTypes, ConversationHandler, filters
 )
 from telegram.error import TelegramError
+from telegram.request import BaseRequest
 import pytz
 
-from config import BOT_TOKEN, ADMIN_USERNAME, TIMEZONE
+from config import (
+    BOT_TOKEN, ADMIN_USERNAME, TIMEZONE,
+    CHAT_CACHE_SIZE, CHAT_CACHE_TTL, CHAT_FETCH_CONCURRENCY, SCHEDULES_PAGE_SIZE,
+    RUN_MODE, CONCURRENT_UPDATES, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN, WEBHOOK_MAX_CONNECTIONS, SHUTDOWN_DRAIN_TIMEOUT, RUN_SCHEDULER, PERSISTENCE,
+    IMPORT_MAX_BYTES
+)
+from cache import TTLCache
 from db import Database
+from async_db import AsyncDatabase
+from bulk import EXPORT_FORMATS, FIELDS as BULK_FIELDS, ImportValidationError, parse_import
+from persistence import SQLitePersistence
 from scheduler import MessageScheduler
+from health import can_post
+from media import MAX_CAPTION_LENGTH, file_id_of
+from templates import MAX_MESSAGE_LENGTH, CompiledTemplate
+from logs import setup_logging
+from metrics import ACTIVE_CONVERSATIONS, start_metrics_server
 
-# Logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+# /send da qabul qilinadigan media turlari (media.MEDIA_TYPES) va ularning nomlari
+MEDIA_LABELS = {'photo': 'rasm', 'video': 'video', 'document': 'hujjat'}
+
+
+class ChatInfo(NamedTuple):
+    """Keshlangan kanal ma'lumoti"""
+    title: Optional[str]
+    username: Optional[str]
+    is_admin: bool
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Turli foydalanuvchilar update'lari parallel, bitta foydalanuvchiniki esa kelgan tartibda.
+
+    ConversationHandler holati va ``user_data`` foydalanuvchi bo'yicha
+    saqlanadi: bir foydalanuvchining ikki update'i (masalan, ikki marta
+    bosilgan tugma va matnli javob) bir vaqtda ishlansa, holat poygasi
+    bo'ladi. Navbatini kutayotgan update ham ``max_concurrent_updates``
+    o'rinlaridan birini egallab turadi.
+    """
+
+    __slots__ = ('_locks', '_waiting')
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._waiting: Dict[int, int] = {}
+
+    @staticmethod
+    def _key(update: object) -> Optional[int]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return update.effective_user.id
+        return update.effective_chat.id if update.effective_chat else None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._key(update)
+        if key is None:
+            await coroutine
+            return
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
 # Conversation states
 CHOOSING_CHANNEL, ENTERING_MESSAGE, ENTERING_TIME, CONFIRMING_DATE, ENTERING_CHALLENGE_DAY, ENTERING_END_DATE = range(6)
 
 class ChallengeBot:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None, request: Optional[BaseRequest] = None,
+                 persistence: bool = PERSISTENCE):
+        """``db`` va ``request`` benchmark'larda almashtiriladi (standart: DATABASE_FILE va HTTP)"""
+        self.db = db or Database()
+        # Handler'lar bazaga shu orqali murojaat qiladi (event loop bloklanmaydi)
+        self.adb = AsyncDatabase(self.db)
+        # Suhbat holatlari va user_data restart'dan keyin ham saqlanadi
+        self.persistence = SQLitePersistence(self.adb) if persistence else None
+        # channel_id -> ChatInfo; /kanallarim har safar get_chat so'ramasligi uchun
+        self.chat_cache: TTLCache[ChatInfo] = TTLCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL)
         self.scheduler = None
-        self.application = (
-            Application.builder()
-            .token(BOT_TOKEN)
-            .build()
+        self.metrics_server = None
+        # Davom etayotgan /send suhbatlari (chat_id, user_id); ACTIVE_CONVERSATIONS shundan
+        self.send_conversations: Set[Tuple[int, int]] = set()
+        builder = Application.builder().token(BOT_TOKEN).concurrent_updates(
+            PerUserUpdateProcessor(CONCURRENT_UPDATES)
         )
+        if request is not None:
+            builder = builder.request(request).get_updates_request(request)
+        if self.persistence is not None:
+            builder = builder.persistence(self.persistence)
+        self.application = builder.build()
         self.setup_handlers()
-        # Scheduler'ni ishga tushirish
-        self.setup_scheduler_sync()
+        # Rejalarni yuklash
+        self.setup_scheduler()
     
     def setup_handlers(self):
         """Handler'larni sozlash"""
         
         # Conversation handler for /send command
         conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('send', self.start_schedule)],
+            entry_points=[CommandHandler('send', self._track_send(self.start_schedule))],
             states={
                 CHOOSING_CHANNEL: [
-                    CallbackQueryHandler(self.channel_selected, pattern='^channel_'),
-                    CommandHandler('cancel', self.cancel)
+                    CallbackQueryHandler(self._track_send(self.channel_selected), pattern='^channel_'),
+                    CommandHandler('cancel', self._track_send(self.cancel))
                 ],
                 ENTERING_MESSAGE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.message_entered),
-                    CommandHandler('cancel', self.cancel)
+                    MessageHandler(
+                        (filters.TEXT & ~filters.COMMAND) | filters.PHOTO | filters.VIDEO
+                        | (filters.Document.ALL & ~filters.CaptionRegex(r'^/import\b')),
+                        self._track_send(self.message_entered)
+                    ),
+                    CommandHandler('cancel', self._track_send(self.cancel))
                 ],
                 ENTERING_TIME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.time_entered),
-                    CommandHandler('cancel', self.cancel)
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, self._track_send(self.time_entered)),
+                    CommandHandler('cancel', self._track_send(self.cancel))
                 ],
                 CONFIRMING_DATE: [
-                    CallbackQueryHandler(self.date_confirmed, pattern='^date_'),
-                    CommandHandler('cancel', self.cancel)
+                    CallbackQueryHandler(self._track_send(self.date_confirmed), pattern='^date_'),
+                    CommandHandler('cancel', self._track_send(self.cancel))
                 ],
                 ENTERING_CHALLENGE_DAY: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.challenge_day_entered),
-                    CommandHandler('cancel', self.cancel)
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, self._track_send(self.challenge_day_entered)),
+                    CommandHandler('cancel', self._track_send(self.cancel))
                 ],
                 ENTERING_END_DATE: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.end_date_entered),
-                    CommandHandler('cancel', self.cancel)
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, self._track_send(self.end_date_entered)),
+                    CommandHandler('cancel', self._track_send(self.cancel))
                 ]
             },
-            fallbacks=[CommandHandler('cancel', self.cancel)]
+            fallbacks=[CommandHandler('cancel', self._track_send(self.cancel))],
+            name='send',
+            persistent=self.persistence is not None
         )
         
         # Kanal ulash uchun ConversationHandler
@@ -82,7 +175,9 @@ class ChallengeBot:
                     CommandHandler('cancel', self.cancel)
                 ]
             },
-            fallbacks=[CommandHandler('cancel', self.cancel)]
+            fallbacks=[CommandHandler('cancel', self.cancel)],
+            name='kanal_ulash',
+            persistent=self.persistence is not None
         )
         
         # Boshqa handler'lar
@@ -91,8 +186,17 @@ class ChallengeBot:
         self.application.add_handler(CommandHandler("kanallarim", self.my_channels))
         self.application.add_handler(CommandHandler("rejalarim", self.my_schedules))
         self.application.add_handler(conv_handler)
+        ACTIVE_CONVERSATIONS.set_function(lambda: len(self.send_conversations))
         self.application.add_handler(CallbackQueryHandler(self.delete_schedule_callback, pattern="^delete_"))
+        self.application.add_handler(CallbackQueryHandler(self.schedules_page_callback, pattern="^schedpage_"))
         self.application.add_handler(CallbackQueryHandler(self.delete_channel_callback, pattern="^deletechan_"))
+        self.application.add_handler(CallbackQueryHandler(self.merge_sends_callback, pattern="^merge_"))
+        self.application.add_handler(CommandHandler("qayta_yuborish", self.replay_failed))
+        self.application.add_handler(CommandHandler("import", self.import_help))
+        self.application.add_handler(MessageHandler(
+            filters.Document.ALL & filters.CaptionRegex(r'^/import\b'), self.import_document
+        ))
+        self.application.add_handler(CommandHandler("export", self.export_schedules))
         
         # Xatoliklar uchun
         # add_error_handler expects (object, context) not (Update, context)
@@ -110,7 +214,7 @@ class ChallengeBot:
             return
         
         user = update.effective_user
-        self.db.add_user(user.id, user.username or "")
+        await self.adb.add_user(user.id, user.username or "")
         
         welcome_text = f"""Salom {user.first_name or 'Foydalanuvchi'}!
 
@@ -121,6 +225,8 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
 • /kanallarim - Ulangan kanallar
 • /send - Xabar rejalashtirish
 • /rejalarim - Rejalashtirilgan xabarlar
+• /import - Rejalarni CSV/JSON fayldan qo'shish
+• /export - Rejalarni faylga yuklab olish
 
 ❓ Savollar bo'lsa: {ADMIN_USERNAME}
         """
@@ -148,17 +254,21 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
             else:
                 chat = await context.bot.get_chat(int(channel_input))
             bot_member = await context.bot.get_chat_member(chat.id, context.bot.id)
-            if bot_member.status not in ['administrator', 'creator']:
+            if not can_post(bot_member):
                 await update.message.reply_text(
                     "❌ Bot kanalda admin emas! Botni admin qiling va xabar yuborish ruxsatini bering."
                 )
                 return CHOOSING_CHANNEL
             kanal_nomi = chat.title if chat.title else "Noma'lum"
-            self.db.add_channel(user_id, str(chat.id), kanal_nomi)
+            await self.adb.add_channel(user_id, str(chat.id), kanal_nomi)
+            self.chat_cache.put(str(chat.id), ChatInfo(chat.title, chat.username, True))
+            # Huquq qaytgan kanal: health tekshiruvi to'xtatgan rejalar darhol davom etadi
+            _, resumed = await self.adb.resume_channel(str(chat.id))
             await update.message.reply_text(
                 f"✅ Kanal muvaffaqiyatli ulandi!\n\n"
                 f"📢 Kanal: {kanal_nomi}\n"
                 f"🆔 ID: {chat.id}"
+                + (f"\n▶️ {len(resumed)} ta to'xtatilgan reja davom ettirildi" if resumed else "")
             )
             return ConversationHandler.END
         except TelegramError as e:
@@ -173,38 +283,81 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
             return CHOOSING_CHANNEL
     
     async def my_channels(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Foydalanuvchining kanallarini ko'rsatish (yangilangan ko'rinish, o'chirish tugmasi bilan)"""
+        """Foydalanuvchining kanallarini bitta xabarda ko'rsatish (o'chirish tugmalari bilan)"""
         if not update.effective_user or not update.message:
             return
             
         user_id = update.effective_user.id
-        channels = self.db.get_user_channels(user_id)
+        text, reply_markup = await self.render_channels(context, user_id)
+        await update.message.reply_text(text, reply_markup=reply_markup)
 
+    async def fetch_chat_info(self, context: ContextTypes.DEFAULT_TYPE, channel_ids: List[str]) -> Dict[str, ChatInfo]:
+        """Kanal ma'lumotlarini keshdan olish; yo'qlarini parallel (cheklangan) so'rash"""
+        result: Dict[str, ChatInfo] = {}
+        missing = []
+        for channel_id in channel_ids:
+            info = self.chat_cache.get(channel_id)
+            if info is None:
+                missing.append(channel_id)
+            else:
+                result[channel_id] = info
+        if not missing:
+            return result
+
+        semaphore = asyncio.Semaphore(CHAT_FETCH_CONCURRENCY)
+
+        async def fetch(channel_id: str):
+            async with semaphore:
+                try:
+                    chat, member = await asyncio.gather(
+                        context.bot.get_chat(channel_id),
+                        context.bot.get_chat_member(channel_id, context.bot.id)
+                    )
+                except TelegramError as e:
+                    logger.warning(f"Kanal ma'lumotini olishda xatolik ({channel_id}): {e}")
+                    return
+                info = ChatInfo(chat.title, chat.username, can_post(member))
+                self.chat_cache.put(channel_id, info)
+                result[channel_id] = info
+
+        await asyncio.gather(*(fetch(channel_id) for channel_id in missing))
+        return result
+
+    async def render_channels(self, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+        """Kanallar ro'yxati matni va o'chirish tugmalari"""
+        channels = await self.adb.get_user_channels(user_id)
         if not channels:
-            await update.message.reply_text(
+            return (
                 "📭 Sizda ulangan kanallar yo'q.\n\n"
                 "Kanal ulash uchun: /kanal_ulash"
-            )
-            return
+            ), None
 
+        infos = await self.fetch_chat_info(context, [channel_id for channel_id, _ in channels])
+        blocks = []
+        keyboard = []
         for idx, (channel_id, channel_name) in enumerate(channels, 1):
-            username = "🚫 Username yo'q"
-            try:
-                chat = await context.bot.get_chat(channel_id)
-                if getattr(chat, 'username', None):
-                    username = f"@{chat.username}"
-            except Exception:
-                pass
-            text = (
-                f"{idx}\u20e3 Kanal nomi: ✅ {channel_name}\n"
+            info = infos.get(channel_id)
+            username = f"@{info.username}" if info and info.username else "🚫 Username yo'q"
+            status = "✅" if info is None or info.is_admin else "⚠️ Bot admin emas,"
+            blocks.append(
+                f"{idx}\u20e3 Kanal nomi: {status} {channel_name}\n"
                 f"🔗 Username: {username}\n"
                 f"🆔 ID: {channel_id}\n"
             )
-            keyboard = [
-                [InlineKeyboardButton("🗑 O'chirish", callback_data=f"deletechan_{channel_id}")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text(text, reply_markup=reply_markup)
+            keyboard.append(
+                [InlineKeyboardButton(f"🗑 {idx}-kanalni o'chirish", callback_data=f"deletechan_{channel_id}")]
+            )
+        return self._join_blocks(blocks), InlineKeyboardMarkup(keyboard)
+
+    @staticmethod
+    def _join_blocks(blocks: List[str]) -> str:
+        """Bloklarni Telegram xabar uzunligi chegarasida birlashtirish"""
+        text = ""
+        for shown, block in enumerate(blocks):
+            if len(text) + len(block) + 1 > MAX_MESSAGE_LENGTH - 40:
+                return text + f"\n... va yana {len(blocks) - shown} ta"
+            text += block + "\n"
+        return text
 
     async def delete_channel_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.callback_query or not update.effective_user:
@@ -216,15 +369,40 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
         if data and data.startswith("deletechan_"):
             channel_id = data.replace("deletechan_", "")
             user_id = update.effective_user.id
-            self.db.delete_channel(user_id, channel_id)
-            await query.edit_message_text("✅ Kanal o'chirildi!")
+            schedule_ids = await self.adb.delete_channel(user_id, channel_id)
+            if self.scheduler:
+                self.scheduler.remove_channel_jobs(user_id, channel_id)
+            done = "✅ Kanal o'chirildi!"
+            if schedule_ids:
+                done = f"✅ Kanal va unga tegishli {len(schedule_ids)} ta reja o'chirildi!"
+            # Ro'yxatni shu xabarning o'zida yangilash
+            text, reply_markup = await self.render_channels(context, user_id)
+            await query.edit_message_text(done + "\n\n" + text, reply_markup=reply_markup)
     
+    def _track_send(self, callback: Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[object]]):
+        """/send qadamini ``send_conversations`` hisobi bilan o'rash.
+
+        Qadam END qaytarsa suhbat tugagan, boshqa holat qaytarsa davom etmoqda;
+        ``None`` — holat o'zgarmagan. Restart'dan oldin boshlangan (persistence'dan
+        tiklangan) suhbat keyingi qadamida qayta hisobga olinadi.
+        """
+        async def step(update: Update, context: ContextTypes.DEFAULT_TYPE) -> object:
+            state = await callback(update, context)
+            if state is not None and update.effective_chat and update.effective_user:
+                key = (update.effective_chat.id, update.effective_user.id)
+                if state == ConversationHandler.END:
+                    self.send_conversations.discard(key)
+                else:
+                    self.send_conversations.add(key)
+            return state
+        return step
+
     async def start_schedule(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.effective_user or not update.message:
             return ConversationHandler.END
             
         user_id = update.effective_user.id
-        channels = self.db.get_user_channels(user_id)
+        channels = await self.adb.get_user_channels(user_id)
         if not channels:
             await update.message.reply_text(
                 "❌ Avval kanal ulashingiz kerak!\n\nKanal ulash uchun: /kanal_ulash"
@@ -254,7 +432,7 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
 
         # Kanal nomi va sana
         user_id = query.from_user.id
-        channels = self.db.get_user_channels(user_id)
+        channels = await self.adb.get_user_channels(user_id)
         kanal_nomi = next((name for cid, name in channels if cid == channel_id), channel_id)
         today = datetime.now(pytz.timezone(TIMEZONE)).strftime('%d.%m.%Y')
 
@@ -262,16 +440,35 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
             f"📝 Yangi xabar matnini kiriting:\n\n"
             f"📢 Kanal: {kanal_nomi}\n"
             f"📅 Sana: {today}\n\n"
-            f"Xabar matnini quyiga yozing va yuboring."
+            f"Xabar matnini quyiga yozing va yuboring. Rasm, video yoki hujjat "
+            f"(izohi bilan) ham yuborishingiz mumkin.\n\n"
+            f"Matnda {{kun}}, {{qoldi}}, {{sana}}, {{hafta_kuni}} ishlatsangiz, "
+            f"ular har kuni avtomatik to'ldiriladi."
         )
         return ENTERING_MESSAGE
 
     async def message_entered(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not update.message or not update.message.text:
+        if not update.message:
             return ENTERING_MESSAGE
+        message = update.message
         if context.user_data is None:
             context.user_data = {}
-        context.user_data['message_text'] = update.message.text
+        media_type = next((t for t in MEDIA_LABELS if getattr(message, t, None)), "")
+        if media_type:
+            caption = message.caption or ""
+            if len(caption) > MAX_CAPTION_LENGTH:
+                await message.reply_text(f"❌ Izoh {MAX_CAPTION_LENGTH} belgidan oshmasligi kerak.")
+                return ENTERING_MESSAGE
+            # Fayl Telegram'da qoladi: rejada faqat file_id saqlanadi, qayta yuklanmaydi
+            context.user_data['media_type'] = media_type
+            context.user_data['media'] = file_id_of(message, media_type)
+            context.user_data['message_text'] = caption
+        elif message.text:
+            context.user_data.pop('media_type', None)
+            context.user_data.pop('media', None)
+            context.user_data['message_text'] = message.text
+        else:
+            return ENTERING_MESSAGE
         await update.message.reply_text(
             "⏰ Har kuni qaysi vaqtda yuborilsin?\n\nFormat: HH:MM\nMasalan: 09:30 yoki 18:45"
         )
@@ -465,20 +662,42 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
                 start_date = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d')
             if end_date_str is None:
                 end_date_str = ""
-            schedule_id = self.db.add_schedule(
-                user_id, channel_id, message_text, time_text, with_date, start_date, end_date_str
+            user_data = context.user_data or {}
+            media_type = user_data.get('media_type', "")
+            media = user_data.get('media', "")
+            if media_type:
+                # Izoh har kuni sana sarlavhasi bilan yuboriladi: Telegram chegarasidan oshmasin
+                length = CompiledTemplate(message_text, with_date, start_date, end_date_str).max_length()
+                if length > MAX_CAPTION_LENGTH:
+                    error_text = (
+                        f"❌ Izoh sana sarlavhasi bilan {length} belgigacha yetadi, "
+                        f"{MAX_CAPTION_LENGTH} dan oshmasligi kerak.\n"
+                        "Qisqaroq izoh bilan /send ni qaytadan boshlang."
+                    )
+                    if hasattr(update, 'message') and update.message:
+                        await update.message.reply_text(error_text)
+                    elif hasattr(update, 'edit_message_text'):
+                        await update.edit_message_text(error_text)
+                    user_data.clear()
+                    return ConversationHandler.END
+            schedule_id = await self.adb.add_schedule(
+                user_id, channel_id, message_text, time_text, with_date, start_date, end_date_str,
+                media_type=media_type, media=media
             )
             if self.scheduler:
                 self.scheduler.add_schedule_job(
-                    user_id, channel_id, schedule_id, time_text, message_text, with_date, start_date, end_date_str
+                    user_id, channel_id, schedule_id, time_text, message_text, with_date, start_date, end_date_str,
+                    media_type=media_type, media=media
                 )
-            channels = self.db.get_user_channels(user_id)
+            channels = await self.adb.get_user_channels(user_id)
             kanal_nomi = next((name for cid, name in channels if cid == channel_id), channel_id)
             status_text = (
                 f"✅ Xabar rejalashtirildi!\n\n"
                 f"📢 Kanal: {kanal_nomi}\n"
                 f"🕒 Vaqt: {time_text}\n"
             )
+            if media_type:
+                status_text += f"🖼 Media: {MEDIA_LABELS[media_type]}\n"
             if with_date:
                 status_text += f"📅 Sana: {start_date}"
             try:
@@ -508,43 +727,94 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
             return ConversationHandler.END
     
     async def my_schedules(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Foydalanuvchining rejalarini dublikatlarsiz, har biriga alohida o'chirish tugmasi bilan ko'rsatish"""
+        """Foydalanuvchining rejalarini bitta xabarda, sahifalab ko'rsatish"""
         if not update.effective_user or not update.message:
             return
         user_id = update.effective_user.id
-        schedules = self.db.get_user_schedules(user_id)
+        text, reply_markup = await self.render_schedules_page(user_id)
+        await update.message.reply_text(text, reply_markup=reply_markup)
+
+    async def render_schedules_page(self, user_id: int, before_id: Optional[int] = None,
+                                    after_id: Optional[int] = None, offset: int = 0):
+        """Rejalar sahifasi matni, o'chirish va oldingi/keyingi tugmalari.
 
+        ``offset`` faqat reja raqamlarini ko'rsatish uchun kerak.
+        """
+        schedules, has_prev, has_next = await self.adb.get_user_schedules_page(
+            user_id, before_id, after_id, SCHEDULES_PAGE_SIZE
+        )
         if not schedules:
-            await update.message.reply_text(
+            if before_id is not None or after_id is not None:
+                # Sahifa bo'shab qolgan bo'lsa, boshidan ko'rsatish
+                return await self.render_schedules_page(user_id)
+            return (
                 "📭 Sizda rejalashtirilgan xabarlar yo'q.\n\n"
                 "Reja yaratish uchun: /send"
-            )
-            return
+            ), None
 
-        seen = set()
-        for idx, schedule in enumerate(schedules, 1):
-            schedule_id, channel_id, message, time, with_date, start_date, day_count, channel_name = schedule
-            key = (channel_id, message, time, start_date)
-            if key in seen:
-                continue
-            seen.add(key)
+        blocks = []
+        keyboard = []
+        for number, schedule in enumerate(schedules, offset + 1):
+            (schedule_id, channel_id, message, time, with_date, start_date, day_count, channel_name,
+             status, merge_sends, media_type) = schedule
             sana_ha = 'Ha' if with_date else "Yo'q"
             kanal_nomi = channel_name or channel_id
-            text = (
-                f"🔢 Reja raqami: {len(seen)}\n"
+            holat = {
+                'completed': f"🏁 Holat: yakunlangan ({day_count} kun)\n",
+                'paused': "⏸ Holat: to'xtatilgan (bot kanalga yoza olmaydi)\n",
+            }.get(status, "")
+            blocks.append(
+                f"🔢 Reja raqami: {number}\n"
                 f"📢 Kanal: {kanal_nomi}\n"
                 f"⏰ Vaqt: {time}\n"
                 f"📅 Sana: {sana_ha}\n"
-                f"📝 Xabar: {message[:50]}{'...' if len(message) > 50 else ''}\n"
+                f"{holat}"
+                + (f"🖼 Media: {MEDIA_LABELS.get(media_type, media_type)}\n" if media_type else "")
+                + f"📝 Xabar: {message[:50]}{'...' if len(message) > 50 else ''}\n"
             )
-            keyboard = [
-                [InlineKeyboardButton(f"🗑 {len(seen)}-reja o'chirish", callback_data=f"delete_{schedule_id}")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text(text, reply_markup=reply_markup)
+            row = [InlineKeyboardButton(f"🗑 {number}-reja o'chirish", callback_data=f"delete_{schedule_id}")]
+            if status == 'active' and not media_type:
+                # Bir kanalga bir vaqtda tushgan rejalar bitta xabar bo'lib ketadi
+                row.append(InlineKeyboardButton(
+                    f"🔗 Birlashtirish: {'✅' if merge_sends else '❌'}",
+                    callback_data=f"merge_{schedule_id}_{0 if merge_sends else 1}"
+                ))
+            keyboard.append(row)
+
+        navigation = []
+        if has_prev:
+            prev_offset = max(0, offset - SCHEDULES_PAGE_SIZE)
+            navigation.append(InlineKeyboardButton(
+                "⬅️ Oldingi", callback_data=f"schedpage_prev_{schedules[0][0]}_{prev_offset}"
+            ))
+        if has_next:
+            navigation.append(InlineKeyboardButton(
+                "Keyingi ➡️", callback_data=f"schedpage_next_{schedules[-1][0]}_{offset + len(schedules)}"
+            ))
+        if navigation:
+            keyboard.append(navigation)
+        return self._join_blocks(blocks), InlineKeyboardMarkup(keyboard)
+
+    async def schedules_page_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/rejalarim sahifalari orasida yurish"""
+        if not update.callback_query or not update.effective_user:
+            return
+        query = update.callback_query
+        await query.answer()
+        try:
+            _, direction, cursor, offset = (query.data or "").split("_")
+            cursor_id, offset_num = int(cursor), int(offset)
+        except ValueError:
+            return
+        user_id = update.effective_user.id
+        if direction == "next":
+            text, reply_markup = await self.render_schedules_page(user_id, before_id=cursor_id, offset=offset_num)
+        else:
+            text, reply_markup = await self.render_schedules_page(user_id, after_id=cursor_id, offset=offset_num)
+        await query.edit_message_text(text, reply_markup=reply_markup)
 
     async def delete_schedule_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not update.callback_query:
+        if not update.callback_query or not update.effective_user:
             return
             
         query = update.callback_query
@@ -552,20 +822,113 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
         data = query.data
         if data and data.startswith("delete_"):
             schedule_id = int(data.replace("delete_", ""))
+            user_id = update.effective_user.id
             # Bazadan o'chirish
-            sched = self.db.get_schedule_by_id(schedule_id)
-            if sched:
-                user_id = sched[1]
-                channel_id = sched[2]
-                time = sched[4]  # schedules jadvalida 4-index: time
-                self.db.delete_schedule(schedule_id)
+            sched = await self.adb.get_schedule_by_id(schedule_id)
+            if sched and sched[1] == user_id:
+                await self.adb.delete_schedule(schedule_id)
                 # Scheduler'dan ham o'chirish
-                if self.scheduler and time:
-                    self.scheduler.remove_schedule_job(user_id, channel_id, time)
-                await query.edit_message_text("✅ Reja o'chirildi!")
+                if self.scheduler:
+                    self.scheduler.remove_schedule_job(schedule_id)
+                text, reply_markup = await self.render_schedules_page(user_id)
+                await query.edit_message_text("✅ Reja o'chirildi!\n\n" + text, reply_markup=reply_markup)
             else:
                 await query.edit_message_text("❌ Reja topilmadi yoki allaqachon o'chirilgan.")
     
+    async def merge_sends_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Rejani bir daqiqadagi boshqa rejalar bilan birlashtirishni yoqish/o'chirish"""
+        if not update.callback_query or not update.effective_user:
+            return
+        query = update.callback_query
+        await query.answer()
+        _, schedule_id, value = (query.data or "").split("_")
+        schedule_id = int(schedule_id)
+        user_id = update.effective_user.id
+        if not await self.adb.set_merge_sends(schedule_id, user_id, value == "1"):
+            await query.edit_message_text("❌ Reja topilmadi yoki allaqachon o'chirilgan.")
+            return
+        if self.scheduler:
+            self.scheduler.add_schedule_jobs(await self.adb.get_schedule_rows([schedule_id]))
+        text, reply_markup = await self.render_schedules_page(user_id)
+        await query.edit_message_text(text, reply_markup=reply_markup)
+
+    async def replay_failed(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Yuborilmagan xabarlarni ommaviy qayta yuborish (faqat admin uchun)"""
+        if not update.effective_user or not update.message:
+            return
+        if f"@{update.effective_user.username}" != ADMIN_USERNAME:
+            await update.message.reply_text("❌ Bu buyruq faqat admin uchun.")
+            return
+        if not self.scheduler:
+            await update.message.reply_text(
+                "⚠️ Bu jarayonda scheduler yo'q (RUN_SCHEDULER=0), xabarlarni bu yerdan qayta yuborib bo'lmaydi."
+            )
+            return
+        count = await self.scheduler.replay_failed()
+        if count:
+            await update.message.reply_text(f"🔁 {count} ta xabar qayta yuborish navbatiga qo'yildi.")
+        else:
+            await update.message.reply_text("📭 Yuborilmagan xabarlar yo'q.")
+
+    async def import_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Import fayli formati haqida"""
+        if not update.message:
+            return
+        await update.message.reply_text(
+            "📥 Rejalarni ommaviy qo'shish uchun CSV yoki JSON faylni /import izohi (caption) bilan yuboring.\n\n"
+            f"Ustunlar: {', '.join(BULK_FIELDS)}\n"
+            "time — HH:MM, with_date — 0/1, sanalar — YYYY-MM-DD (start_date bo'sh bo'lsa bugun).\n"
+            "Namuna uchun: /export csv"
+        )
+
+    async def import_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Fayldagi barcha rejalarni tekshirib, bitta tranzaksiyada qo'shish"""
+        if not update.effective_user or not update.message or not update.message.document:
+            return
+        document = update.message.document
+        user_id = update.effective_user.id
+        filename = document.file_name or ""
+        if not filename.lower().endswith(('.csv', '.json')):
+            await update.message.reply_text("❌ Faqat .csv yoki .json fayl qabul qilinadi.")
+            return
+        if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+            await update.message.reply_text(f"❌ Fayl {IMPORT_MAX_BYTES // 2 ** 20} MB dan katta.")
+            return
+        data = bytes(await (await document.get_file()).download_as_bytearray())
+        channels = {channel_id for channel_id, _ in await self.adb.get_user_channels(user_id)}
+        try:
+            # Katta faylni tekshirish event loop'ni bloklamasin
+            rows = await asyncio.to_thread(parse_import, data, filename, channels)
+        except ImportValidationError as e:
+            more = f"\n... yana {e.total - len(e.errors)} ta" if e.total > len(e.errors) else ""
+            await update.message.reply_text(
+                f"❌ Import qilinmadi, {e.total} ta xato:\n" + "\n".join(e.errors) + more
+            )
+            return
+        except UnicodeDecodeError:
+            await update.message.reply_text("❌ Fayl UTF-8 kodlashda bo'lishi kerak.")
+            return
+        ids = await self.adb.add_schedules(user_id, rows)
+        if self.scheduler:
+            self.scheduler.add_schedule_jobs((schedule_id, user_id) + tuple(row) for schedule_id, row in zip(ids, rows))
+        await update.message.reply_text(f"✅ {len(ids)} ta reja import qilindi.")
+
+    async def export_schedules(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Foydalanuvchi rejalarini CSV/JSON faylga oqim bilan yozib yuborish"""
+        if not update.effective_user or not update.message:
+            return
+        fmt = (context.args[0].lower() if context.args else 'csv')
+        if fmt not in EXPORT_FORMATS:
+            await update.message.reply_text("❌ Format: /export csv yoki /export json")
+            return
+        with tempfile.TemporaryFile() as out:
+            count = await self.adb.export_schedules(out, fmt, update.effective_user.id)
+            if not count:
+                await update.message.reply_text("📭 Rejalar yo'q.")
+                return
+            out.seek(0)
+            await update.message.reply_document(out, filename=f"rejalar.{fmt}", caption=f"📤 {count} ta reja")
+
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Conversation'ni bekor qilish"""
         if context.user_data:
@@ -582,64 +945,86 @@ Men Challenge Bot - har kuni avtomatik xabar yuborish uchun yaratilgan bot.
                 "❌ Kutilmagan xatolik yuz berdi. Iltimos, qaytadan urinib ko'ring."
             )
     
-    def setup_scheduler_sync(self):
-        """Scheduler'ni sinxron tarzda ishga tushirish"""
-        self.scheduler = MessageScheduler(self.application.bot)
-        
-        # Scheduler'ni keyinroq ishga tushirish (event loop ishlaganda)
-        # self.scheduler.start()
-       
-        all_schedules = []
-        with sqlite3.connect(self.db.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, user_id, channel_id, message, time, with_date, start_date, end_date FROM schedules")
-            all_schedules = cursor.fetchall()
-        for schedule in all_schedules:
-            schedule_id, user_id, channel_id, message, time, with_date, start_date, end_date = schedule
-            self.scheduler.add_schedule_job(
-                user_id, channel_id, schedule_id, time, message, bool(with_date), start_date, end_date or ""
-            )
+    def setup_scheduler(self):
+        """Scheduler yaratish (RUN_SCHEDULER=0 bo'lsa rejalarni faqat worker.py yuboradi).
 
-    async def setup_scheduler(self):
-        """Scheduler'ni ishga tushirish va barcha mavjud rejalarni yuklash"""
-        self.scheduler = MessageScheduler(self.application.bot)
-        
-        # Scheduler'ni ishga tushirish
-        self.scheduler.start()
-       
-        all_schedules = []
-        with sqlite3.connect(self.db.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, user_id, channel_id, message, time, with_date, start_date, end_date FROM schedules")
-            all_schedules = cursor.fetchall()
-        for schedule in all_schedules:
-            schedule_id, user_id, channel_id, message, time, with_date, start_date, end_date = schedule
-            self.scheduler.add_schedule_job(
-                user_id, channel_id, schedule_id, time, message, bool(with_date), start_date, end_date or ""
-            )
+        Scheduler ``serve()`` da ishga tushadi: shard lease'larini olib, o'z
+        shard'laridagi rejalarni bazadan bo'laklab yuklaydi.
+        """
+        if not RUN_SCHEDULER:
+            return
+        self.scheduler = MessageScheduler(self.application.bot, self.db)
 
     def run(self):
-        """Botni ishga tushirish"""
-        async def start_bot():
-            # Scheduler'ni ishga tushirish
-            if self.scheduler:
-                self.scheduler.start()
-            # Bot'ni ishga tushirish
-            if self.application:
-                await self.application.initialize()
-                await self.application.start()
-                if self.application.updater:
-                    await self.application.updater.start_polling()
-                # Bot'ni to'xtatmaslik uchun kutish
-                try:
-                    await asyncio.Event().wait()
-                except KeyboardInterrupt:
-                    await self.application.stop()
-                    await self.application.shutdown()
-        
-        import asyncio
-        asyncio.run(start_bot())
+        """Botni ishga tushirish (RUN_MODE: polling yoki webhook)"""
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """SIGINT/SIGTERM kelguncha ishlash, keyin navbatlarni bo'shatib to'xtash"""
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:  # Windows
+                pass
+
+        self.metrics_server = await start_metrics_server()
+        if self.scheduler:
+            self.scheduler.start()
+        await self.application.initialize()
+        await self.application.start()
+        try:
+            await self.start_updates()
+            await stop_event.wait()
+        finally:
+            await self.shutdown()
+
+    async def start_updates(self):
+        """Update'larni long polling yoki webhook orqali qabul qilishni boshlash"""
+        updater = self.application.updater
+        if updater is None:
+            raise RuntimeError("Application updater'siz qurilgan: update'larni qabul qilib bo'lmaydi")
+        if RUN_MODE == 'webhook':
+            if not WEBHOOK_URL:
+                raise ValueError("RUN_MODE=webhook uchun WEBHOOK_URL kerak")
+            secret_token = WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)
+            await updater.start_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+                secret_token=secret_token,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logger.info(f"Webhook {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH} da ishlayapti "
+                        f"(concurrent_updates={CONCURRENT_UPDATES})")
+        elif RUN_MODE == 'polling':
+            await updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            logger.info(f"Long polling ishlayapti (concurrent_updates={CONCURRENT_UPDATES})")
+        else:
+            raise ValueError(f"Noma'lum RUN_MODE: {RUN_MODE}")
+
+    async def shutdown(self):
+        """Yangi update qabul qilmay, boshlangan handler'lar va navbatni tugatib to'xtash"""
+        logger.info("Bot to'xtatilmoqda...")
+        updater = self.application.updater
+        if updater and updater.running:
+            await updater.stop()
+        if self.application.running:
+            # Navbatdagi va ishlanayotgan update'lar tugashini kutadi
+            await self.application.stop()
+        if self.scheduler:
+            await self.scheduler.stop(drain_timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        await self.application.shutdown()
+        await self.adb.close()
+        self.db.close()
+        if self.metrics_server:
+            self.metrics_server.close()
+        logger.info("Bot to'xtatildi")
 
 if __name__ == '__main__':
+    setup_logging()
     bot = ChallengeBot()
     bot.run()
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""Rejalarni CSV/JSON fayldan ommaviy import qilish va oqim bilan eksport qilish.
+
+Import avval butun faylni tekshiradi: bitta qator xato bo'lsa ham hech
+narsa yozilmaydi, foydalanuvchiga esa barcha xatolar qator raqami bilan
+qaytariladi. To'g'ri qatorlar ``Database.add_schedules`` orqali bitta
+tranzaksiyada yoziladi.
+"""
+import csv
+import io
+import json
+import re
+from datetime import date, datetime
+from typing import IO, Any, Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import pytz
+
+from config import IMPORT_MAX_ROWS, TIMEZONE
+from dispatcher import normalize_time
+from media import MAX_CAPTION_LENGTH, MEDIA_TYPES, local_path
+from templates import MAX_MESSAGE_LENGTH, CompiledTemplate
+
+# Fayldagi ustunlar (eksport ham shu tartibda)
+FIELDS = ('channel_id', 'message', 'time', 'with_date', 'start_date', 'end_date', 'merge_sends', 'media_type', 'media')
+REQUIRED_FIELDS = ('channel_id', 'message', 'time')
+EXPORT_FORMATS = ('csv', 'json')
+# Foydalanuvchiga ko'rsatiladigan xatolar soni
+MAX_REPORTED_ERRORS = 20
+
+_TIME_RE = re.compile(r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$')
+_TRUE = ('1', 'true', 'yes', 'ha')
+_FALSE = ('', '0', 'false', 'no', "yo'q")
+
+
+class ImportRow(NamedTuple):
+    """Tekshirilgan bitta reja (``Database.add_schedules`` tartibida)"""
+    channel_id: str
+    message: str
+    time: str
+    with_date: bool
+    start_date: str
+    end_date: str
+    merge_sends: bool
+    media_type: str
+    media: str
+
+
+class ImportValidationError(ValueError):
+    """Faylda xato bor; ``errors`` — "qator N: ..." ko'rinishidagi xabarlar"""
+
+    def __init__(self, errors: List[str], total: Optional[int] = None):
+        self.errors = errors
+        self.total = total if total is not None else len(errors)
+        super().__init__(f"{self.total} ta xato")
+
+
+def read_records(data: bytes, filename: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Fayldan (qator raqami, yozuv) juftlari; format kengaytma bo'yicha"""
+    text = data.decode('utf-8-sig')
+    if filename.lower().endswith('.json'):
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportValidationError([f"JSON o'qilmadi: {e}"])
+        if isinstance(parsed, dict):
+            parsed = parsed.get('schedules')
+        if not isinstance(parsed, list):
+            raise ImportValidationError(["JSON rejalar ro'yxati (yoki {\"schedules\": [...]}) bo'lishi kerak"])
+        for index, record in enumerate(parsed, 1):
+            yield index, record
+        return
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [name for name in REQUIRED_FIELDS if name not in (reader.fieldnames or ())]
+    if missing:
+        raise ImportValidationError([f"CSV sarlavhasida ustun yo'q: {', '.join(missing)}"])
+    # 1-qator — sarlavha
+    for index, record in enumerate(reader, 2):
+        yield index, record
+
+
+def _text(record: Dict[str, Any], name: str) -> str:
+    value = record.get(name)
+    return "" if value is None else str(value).strip()
+
+
+def _parse_bool(value: Any, name: str) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"{name} 0/1 bo'lishi kerak: {value!r}")
+
+
+def _parse_date(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} YYYY-MM-DD formatida bo'lishi kerak: {value!r}")
+
+
+def validate_record(record: Any, allowed_channels: Optional[Collection[str]], today: str,
+                    allow_local: bool = False) -> ImportRow:
+    """Bitta yozuvni tekshirish; xato bo'lsa ValueError.
+
+    Lokal fayl manbalari (``file://`` va absolyut yo'l) faqat ``allow_local``
+    bilan qabul qilinadi — ular server faylini kanalga yuklaydi, shuning
+    uchun faqat operator CLI (manage.py) ularga ruxsat beradi.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("yozuv obyekt bo'lishi kerak")
+    channel_id = _text(record, 'channel_id')
+    if not channel_id:
+        raise ValueError("channel_id bo'sh")
+    if allowed_channels is not None and channel_id not in allowed_channels:
+        raise ValueError(f"kanal {channel_id} sizga ulanmagan")
+    message = record.get('message')
+    message = "" if message is None else str(message)
+    media_type = _text(record, 'media_type').lower()
+    media = _text(record, 'media')
+    if media_type:
+        if media_type not in MEDIA_TYPES:
+            raise ValueError(f"media_type {'/'.join(MEDIA_TYPES)} bo'lishi kerak: {media_type!r}")
+        if not media:
+            raise ValueError("media bo'sh (file_id, URL yoki fayl yo'li)")
+        if not allow_local and local_path(media) is not None:
+            raise ValueError("media lokal fayl bo'lishi mumkin emas (file_id yoki http(s) URL bering)")
+        # Media rejada message — izoh, bo'sh bo'lishi mumkin
+        if len(message) > MAX_CAPTION_LENGTH:
+            raise ValueError(f"media izohi {MAX_CAPTION_LENGTH} belgidan uzun")
+    elif media:
+        raise ValueError("media berilgan, lekin media_type bo'sh")
+    elif not message.strip():
+        raise ValueError("message bo'sh")
+    elif len(message) > MAX_MESSAGE_LENGTH:
+        raise ValueError(f"message {MAX_MESSAGE_LENGTH} belgidan uzun")
+    time_text = _text(record, 'time')
+    if not _TIME_RE.match(time_text):
+        raise ValueError(f"time HH:MM formatida bo'lishi kerak: {time_text!r}")
+    with_date = _parse_bool(record.get('with_date', ''), 'with_date')
+    # Ustun bo'lmasa yoki bo'sh bo'lsa birlashtirish yoqilgan (bazadagi standart)
+    merge_value = record.get('merge_sends')
+    merge_sends = _parse_bool('1' if merge_value in (None, '') else merge_value, 'merge_sends')
+    start_date = _text(record, 'start_date') or today
+    start = _parse_date(start_date, 'start_date')
+    end_date = _text(record, 'end_date')
+    if end_date:
+        end = _parse_date(end_date, 'end_date')
+        if end < start:
+            raise ValueError("end_date start_date dan oldin")
+        # Bazada faqat YYYY-MM-DD (shablon va sweep'dagi satr solishtirish shunga tayanadi)
+        end_date = end.isoformat()
+    if media_type:
+        # Izoh sana sarlavhasi va to'ldirilgan o'zgaruvchilar bilan yuboriladi
+        length = CompiledTemplate(message, with_date, start.isoformat(), end_date).max_length()
+        if length > MAX_CAPTION_LENGTH:
+            raise ValueError(
+                f"media izohi sana sarlavhasi bilan {length} belgigacha yetadi, {MAX_CAPTION_LENGTH} dan oshmasligi kerak"
+            )
+    return ImportRow(
+        channel_id, message, normalize_time(time_text), with_date, start.isoformat(), end_date, merge_sends,
+        media_type, media
+    )
+
+
+def parse_import(data: bytes, filename: str, allowed_channels: Optional[Collection[str]] = None,
+                 max_rows: int = IMPORT_MAX_ROWS, allow_local: bool = False) -> List[ImportRow]:
+    """Butun faylni tekshirish; bitta xato bo'lsa ham ImportValidationError"""
+    today = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d')
+    rows: List[ImportRow] = []
+    errors: List[str] = []
+    error_count = 0
+    # CSV'da 1-qator sarlavha, JSON'da yozuvlar 1 dan sanaladi
+    last_index = max_rows + (0 if filename.lower().endswith('.json') else 1)
+    for index, record in read_records(data, filename):
+        if index > last_index:
+            raise ImportValidationError([f"Faylda {max_rows} tadan ko'p reja bo'lmasligi kerak"])
+        try:
+            rows.append(validate_record(record, allowed_channels, today, allow_local))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"qator {index}: {e}")
+    if error_count:
+        raise ImportValidationError(errors, error_count)
+    if not rows:
+        raise ImportValidationError(["Faylda reja yo'q"])
+    return rows
+
+
+def export_records(rows: Iterable[Tuple]) -> Iterator[Dict[str, Any]]:
+    """``Database.iter_schedules()`` qatorlarini import formatiga o'tkazish"""
+    for _, _, channel_id, message, time, with_date, start_date, end_date, merge_sends, media_type, media in rows:
+        yield {
+            'channel_id': channel_id,
+            'message': message or "",
+            'time': time,
+            'with_date': int(bool(with_date)),
+            'start_date': start_date or "",
+            'end_date': end_date or "",
+            'merge_sends': int(bool(merge_sends)),
+            'media_type': media_type or "",
+            'media': media or "",
+        }
+
+
+def write_export(rows: Iterable[Tuple], fmt: str, out: IO[bytes]) -> int:
+    """Rejalarni ``out`` ga oqim bilan yozish (butun ro'yxat xotiraga olinmaydi); yozilganlar soni"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Noma'lum format: {fmt}")
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    count = 0
+    try:
+        if fmt == 'csv':
+            writer: 'csv.DictWriter[str]' = csv.DictWriter(text, fieldnames=FIELDS)
+            writer.writeheader()
+            for record in export_records(rows):
+                writer.writerow(record)
+                count += 1
+        else:
+            text.write('[')
+            for record in export_records(rows):
+                text.write(',\n' if count else '\n')
+                text.write(json.dumps(record, ensure_ascii=False))
+                count += 1
+            text.write('\n]\n')
+        text.flush()
+    finally:
+        # ``out`` ni yopmasdan ajratish: chaqiruvchi uni o'qiydi yoki yuboradi
+        text.detach()
+    return count
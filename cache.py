@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar('V')
+
+
+class LRUCache(Generic[V]):
+    """Hajmi cheklangan, thread-safe LRU kesh.
+
+    O'qish va invalidatsiya poygasidan himoya: ``token()`` so'rovdan oldin
+    olinadi va ``put()`` ga beriladi. Agar oraliqda ``invalidate()``
+    chaqirilgan bo'lsa, eskirgan qiymat keshga yozilmaydi.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[Hashable, V]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def token(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, key: Hashable, value: V, token: Optional[int] = None):
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._on_evict(evicted)
+                self.evictions += 1
+
+    def _on_evict(self, key: Hashable):
+        """Yozuv LRU bo'yicha chiqarib yuborilganda (lock ostida) chaqiriladi"""
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class TTLCache(LRUCache[V]):
+    """Yozuvlari ``ttl`` sekunddan keyin eskiradigan LRU kesh"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, clock=time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+        self._expires: Dict[Hashable, float] = {}
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            expires = self._expires.get(key)
+            if expires is not None and expires <= self.clock():
+                self._data.pop(key, None)
+                del self._expires[key]
+        return super().get(key)
+
+    def put(self, key: Hashable, value: V, token: Optional[int] = None):
+        super().put(key, value, token)
+        with self._lock:
+            if key in self._data:
+                self._expires[key] = self.clock() + self.ttl
+
+    def _on_evict(self, key: Hashable):
+        self._expires.pop(key, None)
+
+    def invalidate(self, key: Hashable):
+        super().invalidate(key)
+        with self._lock:
+            self._expires.pop(key, None)
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._expires.clear()
@@ -13,4 +13,99 @@ ADMIN_USERNAME = "@shamsiyev1909"
 TIMEZONE = "Asia/Tashkent"
 
 # Database fayl
-DATABASE_FILE = "bot_database.db" 
\ No newline at end of file
+DATABASE_FILE = "bot_database.db" 
+# Telegram rate limitlari
+GLOBAL_RATE_LIMIT = int(os.getenv('GLOBAL_RATE_LIMIT', '30'))  # xabar/sekund (butun bot)
+CHAT_RATE_LIMIT = int(os.getenv('CHAT_RATE_LIMIT', '20'))  # xabar/daqiqa (bitta kanal/guruh)
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '3'))
+
+# Yuborish navbati
+SEND_QUEUE_MAXSIZE = int(os.getenv('SEND_QUEUE_MAXSIZE', '10000'))
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', '8'))
+
+# Qayta urinishlar
+SEND_MAX_ATTEMPTS = int(os.getenv('SEND_MAX_ATTEMPTS', '5'))
+SEND_RETRY_BASE_DELAY = float(os.getenv('SEND_RETRY_BASE_DELAY', '2'))  # sekund
+SEND_RETRY_MAX_DELAY = float(os.getenv('SEND_RETRY_MAX_DELAY', '300'))  # sekund
+
+# Foydalanuvchi kanallari keshi (foydalanuvchilar soni)
+CHANNEL_CACHE_SIZE = int(os.getenv('CHANNEL_CACHE_SIZE', '10000'))
+
+# Kanal ma'lumotlari (nomi, username, admin holati) keshi
+CHAT_CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', '10000'))
+CHAT_CACHE_TTL = int(os.getenv('CHAT_CACHE_TTL', '3600'))  # sekund
+CHAT_FETCH_CONCURRENCY = int(os.getenv('CHAT_FETCH_CONCURRENCY', '5'))
+
+# /rejalarim sahifasidagi rejalar soni
+SCHEDULES_PAGE_SIZE = int(os.getenv('SCHEDULES_PAGE_SIZE', '5'))
+
+# Update'larni qabul qilish: 'polling' yoki 'webhook'
+RUN_MODE = os.getenv('RUN_MODE', 'polling').strip().lower()
+# Bir vaqtda ishlanadigan update'lar soni (1 — ketma-ket); bitta foydalanuvchiniki doim ketma-ket
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '16'))
+
+# Webhook rejimi (RUN_MODE=webhook)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # tashqi manzil, masalan https://bot.example.com
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', '8443')))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+# Bo'sh bo'lsa har ishga tushishda tasodifiy token yaratiladi
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Suhbat holatlari va user_data bazada saqlanadi (restart'dan keyin /send davom etadi)
+PERSISTENCE = os.getenv('PERSISTENCE', '1').strip().lower() not in ('0', 'false', 'no')
+# O'zgargan holatlar shu oraliqda (sekund) bitta tranzaksiyada yoziladi
+PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', '10'))
+
+# /import va manage.py import: fayldagi rejalar soni va fayl hajmi chegarasi
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '100000'))
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', str(20 * 1024 * 1024)))  # Bot API yuklab olish limiti
+
+# To'xtashda navbatdagi xabarlar ketishini kutish (sekund)
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '10'))
+
+# Ishga tushishda rejalarni bazadan shu o'lchamdagi bo'laklarda o'qish
+SCHEDULE_LOAD_CHUNK = int(os.getenv('SCHEDULE_LOAD_CHUNK', '1000'))
+
+# Restartdan keyin shu oraliqda (sekund) o'tib ketgan slotlar navbatga qo'yiladi; 0 — o'chirilgan
+MISFIRE_GRACE_TIME = int(os.getenv('MISFIRE_GRACE_TIME', '21600'))
+# Ish paytida qo'shilgan yoki pauzadan qaytgan rejalar uchun shu oraliq (sekund): kanal
+# uzoq pauzadan keyin soatlab o'tib ketgan slotlar bilan to'lib ketmasin; 0 — o'chirilgan
+EVENT_GRACE_TIME = int(os.getenv('EVENT_GRACE_TIME', '300'))
+# Bir reja uchun bir nechta o'tkazib yuborilgan slot bo'lsa, faqat oxirgisini yuborish
+MISFIRE_COALESCE = os.getenv('MISFIRE_COALESCE', '1').strip().lower() not in ('0', 'false', 'no')
+
+# end_date'i o'tgan rejalar har kuni shu o'lchamdagi bo'laklarda yakunlanadi
+EXPIRY_SWEEP_BATCH = int(os.getenv('EXPIRY_SWEEP_BATCH', '500'))
+# Challenge yakunlanganda egasiga bitta xabar yuborish
+CHALLENGE_FINISHED_NOTIFY = os.getenv('CHALLENGE_FINISHED_NOTIFY', '1').strip().lower() not in ('0', 'false', 'no')
+
+# Kanallarda bot huquqini fonda qayta tekshirish oralig'i (sekund); 0 — o'chirilgan
+CHANNEL_HEALTH_INTERVAL = float(os.getenv('CHANNEL_HEALTH_INTERVAL', '21600'))
+# Bir bo'lakda parallel tekshiriladigan kanallar va bo'laklar orasidagi pauza (sekund)
+CHANNEL_HEALTH_BATCH = int(os.getenv('CHANNEL_HEALTH_BATCH', '20'))
+CHANNEL_HEALTH_BATCH_DELAY = float(os.getenv('CHANNEL_HEALTH_BATCH_DELAY', '2'))
+
+# Scheduler shard'lari: rejalar channel_id xeshi bo'yicha shuncha bo'lakka bo'linadi,
+# har bir bo'lakni bitta jarayon bazadagi lease orqali egallaydi
+SCHEDULER_SHARDS = int(os.getenv('SCHEDULER_SHARDS', '1'))
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', '30'))  # sekund
+SHARD_HEARTBEAT_INTERVAL = float(os.getenv('SHARD_HEARTBEAT_INTERVAL', '10'))  # sekund
+# Boshqa jarayonlarda qo'shilgan/o'chirilgan rejalarni tekshirish oralig'i (sekund)
+SCHEDULE_SYNC_INTERVAL = float(os.getenv('SCHEDULE_SYNC_INTERVAL', '5'))
+# Bo'sh bo'lsa host:pid ishlatiladi
+WORKER_ID = os.getenv('WORKER_ID', '')
+# 0 bo'lsa bot.py faqat update'larni qabul qiladi (rejalarni worker.py yuboradi)
+RUN_SCHEDULER = os.getenv('RUN_SCHEDULER', '1').strip().lower() not in ('0', 'false', 'no')
+
+# Prometheus metrikalari (/metrics); 0 — o'chirilgan
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Loglar (logs.py): daraja, format (text yoki json), navbat hajmi va
+# "Xabar yuborildi" kabi takroriy yozuvlar uchun sekundlik chegara (0 — cheklovsiz)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').strip().upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').strip().lower()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_SAMPLE_PER_SECOND = int(os.getenv('LOG_SAMPLE_PER_SECOND', '5'))
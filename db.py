@@ -1,105 +1,383 @@
 import sqlite3
 import logging
-from typing import List, Tuple, Optional
-from config import DATABASE_FILE
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple, Optional
+import pytz
+from config import DATABASE_FILE, CHANNEL_CACHE_SIZE, EXPIRY_SWEEP_BATCH, SCHEDULE_LOAD_CHUNK, TIMEZONE
+from cache import LRUCache
+from metrics import DB_SECONDS, instrument_methods
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ulanish sozlamalari
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # WAL rejimida NORMAL xavfsiz: faqat checkpoint paytida fsync qilinadi
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # ~16 MB sahifa keshi
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+CACHED_STATEMENTS = 256
+
+
+def _migration_1_initial(cursor: sqlite3.Cursor):
+    """Boshlang'ich jadvallar"""
+    # Foydalanuvchilar jadvali
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT
+        )
+    ''')
+
+    # Kanallar jadvali
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS channels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            channel_id TEXT,
+            channel_name TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+
+    # Rejalar jadvali
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            channel_id TEXT,
+            message TEXT,
+            time TEXT,
+            with_date INTEGER DEFAULT 0,
+            start_date TEXT,
+            end_date TEXT,
+            day_count INTEGER DEFAULT 1,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+
+    # Yuborib bo'lmagan xabarlar (dead letter) jadvali
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS failed_deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_id INTEGER,
+            user_id INTEGER,
+            chat_id TEXT,
+            text TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 0,
+            failed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # end_date ustunini faqat birinchi marta qo'shish
+    cursor.execute("PRAGMA table_info(schedules)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'end_date' not in columns:
+        try:
+            cursor.execute('ALTER TABLE schedules ADD COLUMN end_date TEXT')
+            logger.info("end_date ustuni qo'shildi")
+        except sqlite3.OperationalError:
+            pass
+
+
+def _migration_2_indexes(cursor: sqlite3.Cursor):
+    """Tez-tez ishlatiladigan so'rovlar uchun indekslar"""
+    # Unique indeksdan oldin takroriy kanallarni tozalash (eng oxirgisi qoladi)
+    cursor.execute('''
+        DELETE FROM channels
+        WHERE id NOT IN (SELECT MAX(id) FROM channels GROUP BY user_id, channel_id)
+    ''')
+    # get_user_channels, delete_channel va get_user_schedules'dagi JOIN
+    cursor.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_channels_user_channel ON channels (user_id, channel_id)'
+    )
+    # get_user_schedules: WHERE user_id ... ORDER BY id DESC
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedules_user ON schedules (user_id, id)')
+
+
+def _migration_3_schedule_dedup_index(cursor: sqlite3.Cursor):
+    """/rejalarim dublikat tekshiruvi uchun indeks"""
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_schedules_user_channel_time ON schedules (user_id, channel_id, time)'
+    )
+
+
+def _migration_4_last_run(cursor: sqlite3.Cursor):
+    """Rejaning oxirgi yuborilgan sloti (restartdan keyin o'tkazib yuborilganlarni topish uchun)"""
+    cursor.execute('ALTER TABLE schedules ADD COLUMN last_run_at TEXT')
+
+
+def _migration_5_shards(cursor: sqlite3.Cursor):
+    """Scheduler jarayonlari o'rtasida shard lease'lari va rejalar o'zgarishlari jurnali"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shard_leases (
+            shard INTEGER PRIMARY KEY,
+            owner TEXT,
+            expires_at REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduler_workers (
+            worker_id TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    # Boshqa jarayondagi scheduler'lar yangi/o'chirilgan rejalarni shu yerdan oladi
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_events_created ON schedule_events (created_at)')
+
+
+def _migration_6_persistence(cursor: sqlite3.Cursor):
+    """Suhbat holatlari va user_data (persistence.py)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversations (
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (name, key)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _migration_7_schedule_status(cursor: sqlite3.Cursor):
+    """Rejalar holati (active/completed) va end_date bo'yicha kunlik sweep indeksi"""
+    cursor.execute("ALTER TABLE schedules ADD COLUMN status TEXT NOT NULL DEFAULT 'active'")
+    # Faqat faol rejalar indekslanadi: yakunlanganlar indeksdan chiqib ketadi
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_schedules_active_end ON schedules (end_date) WHERE status = 'active'"
+    )
+
+
+def _migration_8_merge_sends(cursor: sqlite3.Cursor):
+    """Bir kanalga bir daqiqada tushgan rejalarni bitta xabarga birlashtirish (reja bo'yicha sozlanadi)"""
+    cursor.execute("ALTER TABLE schedules ADD COLUMN merge_sends INTEGER NOT NULL DEFAULT 1")
+
+
+def _migration_9_media(cursor: sqlite3.Cursor):
+    """Rasm/video/hujjatli rejalar va yuklangan fayllarning Telegram file_id keshi"""
+    for table in ('schedules', 'failed_deliveries'):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN media_type TEXT NOT NULL DEFAULT ''")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN media TEXT NOT NULL DEFAULT ''")
+    # Manba (URL yoki fayl yo'li) -> Telegram file_id; fayl faqat bir marta yuklanadi
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS media_files (
+            source TEXT PRIMARY KEY,
+            media_type TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+
+
+def _migration_10_channel_health(cursor: sqlite3.Cursor):
+    """Bot kira olmay qolgan kanallar (health.py): to'xtatilgan vaqt va kanal bo'yicha indeks"""
+    cursor.execute("ALTER TABLE channels ADD COLUMN paused_at TEXT")
+    # Tekshiruv kanallarni channel_id bo'yicha sahifalab o'qiydi (covering)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_channels_channel_paused ON channels (channel_id, paused_at)"
+    )
+
+
+# (versiya, migratsiya) — yangi migratsiyalar faqat ro'yxat oxiriga qo'shiladi
+MIGRATIONS = [
+    (1, _migration_1_initial),
+    (2, _migration_2_indexes),
+    (3, _migration_3_schedule_dedup_index),
+    (4, _migration_4_last_run),
+    (5, _migration_5_shards),
+    (6, _migration_6_persistence),
+    (7, _migration_7_schedule_status),
+    (8, _migration_8_merge_sends),
+    (9, _migration_9_media),
+    (10, _migration_10_channel_health),
+]
+
+# Scheduler yuklaydigan ustunlar (iter_schedules, get_schedule_rows)
+SCHEDULE_COLUMNS = (
+    "id, user_id, channel_id, message, time, with_date, start_date, end_date, merge_sends, media_type, media"
+)
+
+# schedules.last_run_at formati (mahalliy vaqt); satr sifatida solishtirish mumkin
+RUN_AT_FORMAT = '%Y-%m-%d %H:%M'
+# IN (...) ro'yxatidagi parametrlar soni
+IN_CHUNK = 500
+
+# Foydalanuvchi rejalari sahifasi: bir xil (kanal, xabar, vaqt, sana) rejalardan
+# faqat eng yangisi ko'rsatiladi. {cmp} va {order} keyset yo'nalishini belgilaydi.
+SCHEDULES_PAGE_SQL = '''
+    SELECT s.id, s.channel_id, s.message, s.time, s.with_date,
+           s.start_date, s.day_count, c.channel_name, s.status, s.merge_sends, s.media_type
+    FROM schedules s
+    LEFT JOIN channels c ON c.user_id = s.user_id AND c.channel_id = s.channel_id
+    WHERE s.user_id = ? AND s.id {cmp} ?
+      AND NOT EXISTS (
+          SELECT 1 FROM schedules d
+          WHERE d.user_id = s.user_id AND d.channel_id = s.channel_id AND d.time = s.time
+            AND d.message = s.message AND d.start_date = s.start_date AND d.id > s.id
+      )
+    ORDER BY s.id {order}
+    LIMIT ?
+'''
+MAX_ID = 2 ** 63 - 1
+
+
+@instrument_methods(DB_SECONDS, exclude=('transaction', 'close'))
 class Database:
-    def __init__(self):
-        self.db_file = DATABASE_FILE
+    def __init__(self, db_file: Optional[str] = None, channel_cache: Optional[LRUCache] = None):
+        self.db_file = db_file or DATABASE_FILE
+        # Bitta uzoq yashovchi ulanish; lock orqali threadlar o'rtasida bo'lishiladi
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        self._after_tx: List[Callable[[], None]] = []
+        # user_id -> kanallar ro'yxati; bir nechta ulanish bitta keshni bo'lishishi mumkin
+        self.channel_cache: LRUCache = channel_cache if channel_cache is not None else LRUCache(CHANNEL_CACHE_SIZE)
+        self.conn = self._connect()
         self.init_database()
-    
+
+    def _connect(self) -> sqlite3.Connection:
+        """Ulanish ochish va pragmalarni sozlash"""
+        conn = sqlite3.connect(
+            self.db_file,
+            check_same_thread=False,
+            isolation_level=None,  # tranzaksiyalar transaction() orqali boshqariladi
+            cached_statements=CACHED_STATEMENTS
+        )
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Cursor]:
+        """Yozish tranzaksiyasi.
+
+        Ichma-ich chaqirilsa SAVEPOINT ishlatiladi: ichki blok xatosi faqat
+        o'z o'zgarishlarini bekor qiladi, commit esa eng tashqi blokda bo'ladi.
+        ``immediate`` — avval o'qib keyin yozadigan bloklar uchun yozish
+        lock'ini boshidanoq olish (boshqa jarayonlar bilan poyga bo'lmasin).
+        Ichki blokda ``immediate`` ta'sir qilmaydi: lock tashqi ``BEGIN`` ga bog'liq.
+        """
+        with self._lock:
+            depth = self._tx_depth
+            savepoint = f"sp_{depth}"
+            begin = "BEGIN IMMEDIATE" if immediate else "BEGIN"
+            self.conn.execute(begin if depth == 0 else f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self.conn.cursor()
+            except BaseException:
+                self._tx_depth -= 1
+                if depth == 0:
+                    self.conn.execute("ROLLBACK")
+                    self._run_after_tx()
+                else:
+                    self.conn.execute(f"ROLLBACK TO {savepoint}")
+                    self.conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                self._tx_depth -= 1
+                self.conn.execute("COMMIT" if depth == 0 else f"RELEASE {savepoint}")
+                if depth == 0:
+                    self._run_after_tx()
+
+    def _after_transaction(self, callback: Callable[[], None]):
+        """Callback'ni eng tashqi tranzaksiya tugagandan keyin bajarish"""
+        if self._tx_depth == 0:
+            callback()
+        else:
+            self._after_tx.append(callback)
+
+    def _run_after_tx(self):
+        callbacks, self._after_tx = self._after_tx, []
+        for callback in callbacks:
+            callback()
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[Tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def _scalar(self, sql: str, params: tuple = ()) -> Any:
+        """Bitta qiymatli so'rov natijasi (qator bo'lmasa None)"""
+        row = self._fetchone(sql, params)
+        return row[0] if row is not None else None
+
     def init_database(self):
-        """Database jadvallarini yaratish"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
-            
-            # Foydalanuvchilar jadvali
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT
-                )
-            ''')
-            
-            # Kanallar jadvali
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS channels (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    channel_id TEXT,
-                    channel_name TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            # Rejalar jadvali
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS schedules (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    channel_id TEXT,
-                    message TEXT,
-                    time TEXT,
-                    with_date INTEGER DEFAULT 0,
-                    start_date TEXT,
-                    end_date TEXT,
-                    day_count INTEGER DEFAULT 1,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            # end_date ustunini faqat birinchi marta qo'shish
-            cursor.execute("PRAGMA table_info(schedules)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if 'end_date' not in columns:
-                try:
-                    cursor.execute('ALTER TABLE schedules ADD COLUMN end_date TEXT')
-                    logger.info("end_date ustuni qo'shildi")
-                except sqlite3.OperationalError:
-                    pass
-            conn.commit()
-            logger.info("Database jadvallari yaratildi")
-    
+        """Database jadvallarini yaratish va migratsiyalarni qo'llash"""
+        current = self._scalar("PRAGMA user_version")
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            with self.transaction() as cursor:
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {version}")
+            logger.info(f"Migratsiya qo'llandi: {version} ({migration.__name__})")
+        logger.info("Database jadvallari yaratildi")
+
     def add_user(self, user_id: int, username: Optional[str] = None):
         """Foydalanuvchi qo'shish"""
         if username is None:
             username = ""
         if not isinstance(username, str):
             username = str(username)
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute(
                 'INSERT OR REPLACE INTO users (user_id, username) VALUES (?, ?)',
                 (user_id, username)
             )
-            conn.commit()
-    
+
     def add_channel(self, user_id: int, channel_id: str, channel_name: str):
         """Kanal qo'shish"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO channels (user_id, channel_id, channel_name) VALUES (?, ?, ?)',
-                (user_id, channel_id, channel_name)
-            )
-            conn.commit()
-    
+        with self.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO channels (user_id, channel_id, channel_name) VALUES (?, ?, ?)
+                ON CONFLICT (user_id, channel_id) DO UPDATE SET channel_name = excluded.channel_name
+            ''', (user_id, channel_id, channel_name))
+            # Kesh commit'dan keyin tozalanadi, aks holda parallel o'qish eski ro'yxatni qaytarib yozishi mumkin
+            self._after_transaction(lambda: self.channel_cache.invalidate(user_id))
+
     def get_user_channels(self, user_id: int) -> List[Tuple[str, str]]:
-        """Foydalanuvchining kanallarini olish"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT channel_id, channel_name FROM channels WHERE user_id = ?',
-                (user_id,)
-            )
-            return cursor.fetchall()
-    
-    def add_schedule(self, user_id: int, channel_id: str, message: Optional[str], 
-                    time: str, with_date: bool, start_date: Optional[str], end_date: Optional[str] = None) -> int:
-        """Reja qo'shish"""
+        """Foydalanuvchining kanallarini olish (LRU kesh orqali)"""
+        cached = self.channel_cache.get(user_id)
+        if cached is not None:
+            return list(cached)
+        token = self.channel_cache.token()
+        channels = self._fetchall(
+            'SELECT channel_id, channel_name FROM channels WHERE user_id = ?',
+            (user_id,)
+        )
+        self.channel_cache.put(user_id, tuple(channels), token)
+        return channels
+
+    def add_schedule(self, user_id: int, channel_id: str, message: Optional[str],
+                    time: str, with_date: bool, start_date: Optional[str], end_date: Optional[str] = None,
+                    merge_sends: bool = True, media_type: str = "", media: str = "") -> int:
+        """Reja qo'shish; ``media_type`` berilsa ``message`` media izohi bo'ladi"""
         if message is None:
             message = ""
         if not isinstance(message, str):
@@ -112,61 +390,445 @@ class Database:
             end_date = ""
         if not isinstance(end_date, str):
             end_date = str(end_date)
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
+        # Yaratilishdan oldingi slotlar "o'tkazib yuborilgan" hisoblanmasin
+        created_at = datetime.now(pytz.timezone(TIMEZONE)).strftime(RUN_AT_FORMAT)
+        with self.transaction() as cursor:
             cursor.execute('''
-                INSERT INTO schedules (user_id, channel_id, message, time, with_date, start_date, end_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, channel_id, message, time, int(with_date), start_date, end_date))
-            conn.commit()
+                INSERT INTO schedules (user_id, channel_id, message, time, with_date, start_date, end_date,
+                                       last_run_at, merge_sends, media_type, media)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, channel_id, message, time, int(with_date), start_date, end_date, created_at, int(merge_sends),
+                  media_type, media))
             last_id = cursor.lastrowid
             if last_id is None:
                 return 0
+            self._schedule_event(cursor, last_id, 'add')
             return int(last_id)
-    
+
+    def add_schedules(self, user_id: int,
+                      rows: Iterable[Tuple[str, str, str, bool, str, str, bool, str, str]]) -> List[int]:
+        """Ko'p rejani bitta tranzaksiyada qo'shish; yangi id'lar qatorlar tartibida.
+
+        ``rows`` — (channel_id, message, time, with_date, start_date, end_date, merge_sends, media_type, media).
+        """
+        created_at = datetime.now(pytz.timezone(TIMEZONE)).strftime(RUN_AT_FORMAT)
+        # IMMEDIATE: oraliqda boshqa jarayon yoza olmaydi, shuning uchun MAX(id) dan keyingilar bizniki.
+        # Ichma-ich chaqirilsa (AsyncDatabase partiyasi) tashqi tranzaksiya ham BEGIN IMMEDIATE bo'ladi
+        with self.transaction(immediate=True) as cursor:
+            before = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM schedules').fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO schedules (user_id, channel_id, message, time, with_date, start_date, end_date,
+                                       last_run_at, merge_sends, media_type, media)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                (user_id, channel_id, message, at, int(with_date), start_date, end_date or "", created_at, int(merge),
+                 media_type, media)
+                for channel_id, message, at, with_date, start_date, end_date, merge, media_type, media in rows
+            ))
+            ids = [row[0] for row in cursor.execute('SELECT id FROM schedules WHERE id > ? ORDER BY id', (before,))]
+            self._schedule_events(cursor, ids, 'add')
+        return ids
+
     def get_user_schedules(self, user_id: int) -> List[Tuple]:
         """Foydalanuvchining rejalarini olish"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT s.id, s.channel_id, s.message, s.time, s.with_date, 
-                       s.start_date, s.day_count, c.channel_name
-                FROM schedules s
-                LEFT JOIN channels c ON s.channel_id = c.channel_id
-                WHERE s.user_id = ?
-                ORDER BY s.id DESC
-            ''', (user_id,))
-            return cursor.fetchall()
-    
+        return self._fetchall('''
+            SELECT s.id, s.channel_id, s.message, s.time, s.with_date,
+                   s.start_date, s.day_count, c.channel_name, s.status, s.merge_sends, s.media_type
+            FROM schedules s
+            LEFT JOIN channels c ON c.user_id = s.user_id AND c.channel_id = s.channel_id
+            WHERE s.user_id = ?
+            ORDER BY s.id DESC
+        ''', (user_id,))
+
+    def get_user_schedules_page(self, user_id: int, before_id: Optional[int] = None,
+                                after_id: Optional[int] = None, limit: int = 5) -> Tuple[List[Tuple], bool, bool]:
+        """Rejalarning bitta sahifasi (yangidan eskiga, keyset bo'yicha).
+
+        ``before_id`` berilsa undan eskiroq, ``after_id`` berilsa undan
+        yangiroq sahifa olinadi. (qatorlar, oldingi sahifa bormi, keyingi
+        sahifa bormi) qaytariladi.
+        """
+        if after_id is not None:
+            rows = self._fetchall(SCHEDULES_PAGE_SQL.format(cmp='>', order='ASC'), (user_id, after_id, limit + 1))
+            has_prev = len(rows) > limit
+            rows = rows[:limit][::-1]
+            has_next = bool(rows) and self._schedules_beyond(user_id, rows[-1][0], '<')
+            return rows, has_prev, has_next
+        rows = self._fetchall(
+            SCHEDULES_PAGE_SQL.format(cmp='<', order='DESC'),
+            (user_id, before_id if before_id is not None else MAX_ID, limit + 1)
+        )
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        has_prev = bool(rows) and self._schedules_beyond(user_id, rows[0][0], '>')
+        return rows, has_prev, has_next
+
+    def _schedules_beyond(self, user_id: int, schedule_id: int, cmp: str) -> bool:
+        order = 'DESC' if cmp == '<' else 'ASC'
+        return bool(self._fetchall(SCHEDULES_PAGE_SQL.format(cmp=cmp, order=order), (user_id, schedule_id, 1)))
+
     def get_schedule_by_id(self, schedule_id: int) -> Optional[Tuple]:
         """Reja ID bo'yicha olish"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM schedules WHERE id = ?
-            ''', (schedule_id,))
-            return cursor.fetchone()
-    
-    def update_day_count(self, schedule_id: int, day_count: int):
-        """Challenge kunini yangilash"""
-        if day_count is None:
-            day_count = 1
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
+        return self._fetchone('''
+            SELECT * FROM schedules WHERE id = ?
+        ''', (schedule_id,))
+
+    def get_all_schedules(self) -> List[Tuple]:
+        """Scheduler uchun barcha rejalar"""
+        return self._fetchall(f"SELECT {SCHEDULE_COLUMNS} FROM schedules WHERE status = 'active'")
+
+    def get_schedule_rows(self, schedule_ids: Iterable[int]) -> List[Tuple]:
+        """Berilgan rejalar ``iter_schedules()`` formatida"""
+        ids = list(schedule_ids)
+        rows: List[Tuple] = []
+        for i in range(0, len(ids), IN_CHUNK):
+            chunk = ids[i:i + IN_CHUNK]
+            rows.extend(self._fetchall(
+                f"SELECT {SCHEDULE_COLUMNS} FROM schedules "
+                f"WHERE id IN ({','.join('?' * len(chunk))}) AND status = 'active'", tuple(chunk)
+            ))
+        return rows
+
+    def iter_schedules(self, chunk_size: int = SCHEDULE_LOAD_CHUNK, user_id: Optional[int] = None) -> Iterator[Tuple]:
+        """Barcha (yoki ``user_id`` ning) faol rejalarini id bo'yicha bo'laklab o'qish (butun jadval xotiraga olinmaydi)"""
+        last_id = 0
+        while True:
+            if user_id is None:
+                rows = self._fetchall(
+                    f"SELECT {SCHEDULE_COLUMNS} FROM schedules WHERE id > ? AND status = 'active' ORDER BY id LIMIT ?",
+                    (last_id, chunk_size)
+                )
+            else:
+                rows = self._fetchall(
+                    f"SELECT {SCHEDULE_COLUMNS} FROM schedules "
+                    "WHERE user_id = ? AND id > ? AND status = 'active' ORDER BY id LIMIT ?",
+                    (user_id, last_id, chunk_size)
+                )
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_last_runs(self, schedule_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        """Rejalarning oxirgi yuborilgan sloti (``RUN_AT_FORMAT``)"""
+        ids = list(schedule_ids)
+        result: Dict[int, Optional[str]] = {}
+        for i in range(0, len(ids), IN_CHUNK):
+            chunk = ids[i:i + IN_CHUNK]
+            result.update(self._fetchall(
+                f"SELECT id, last_run_at FROM schedules WHERE id IN ({','.join('?' * len(chunk))})",
+                tuple(chunk)
+            ))
+        return result
+
+    def claim_runs(self, run_at: str, schedule_ids: Iterable[int]) -> List[int]:
+        """``run_at`` slotini rejalar uchun band qilish; band qilinganlar id'sini qaytaradi.
+
+        Slot faqat bir marta band qilinadi (``last_run_at`` orqaga qaytmaydi),
+        shuning uchun bir nechta jarayon bir xil rejani ikki marta yubormaydi.
+        """
+        ids = list(schedule_ids)
+        claimed: List[int] = []
+        with self.transaction() as cursor:
+            for i in range(0, len(ids), IN_CHUNK):
+                chunk = ids[i:i + IN_CHUNK]
+                claimed.extend(row[0] for row in cursor.execute(
+                    f"UPDATE schedules SET last_run_at = ? WHERE id IN ({','.join('?' * len(chunk))}) "
+                    "AND status = 'active' AND (last_run_at IS NULL OR last_run_at < ?) RETURNING id",
+                    (run_at, *chunk, run_at)
+                ).fetchall())
+        return claimed
+
+    def _schedule_event(self, cursor: sqlite3.Cursor, schedule_id: int, op: str):
+        cursor.execute(
+            "INSERT INTO schedule_events (schedule_id, op, created_at) VALUES (?, ?, ?)",
+            (schedule_id, op, time.time())
+        )
+
+    def _schedule_events(self, cursor: sqlite3.Cursor, schedule_ids: List[int], op: str):
+        now = time.time()
+        cursor.executemany(
+            "INSERT INTO schedule_events (schedule_id, op, created_at) VALUES (?, ?, ?)",
+            ((schedule_id, op, now) for schedule_id in schedule_ids)
+        )
+
+    def last_schedule_event_id(self) -> int:
+        return self._scalar("SELECT COALESCE(MAX(id), 0) FROM schedule_events")
+
+    def get_schedule_events(self, after_id: int, limit: int = 1000) -> List[Tuple[int, int, str]]:
+        """``after_id`` dan keyingi (id, schedule_id, op) yozuvlari"""
+        return self._fetchall(
+            "SELECT id, schedule_id, op FROM schedule_events WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+
+    def prune_schedule_events(self, before: float):
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM schedule_events WHERE created_at < ?", (before,))
+
+    def sync_leases(self, worker_id: str, shards: int, ttl: float, now: float) -> Set[int]:
+        """Worker heartbeat'i: o'z lease'larini yangilash va shard'larni teng bo'lishish.
+
+        Har bir tirik worker ``ceil(shards / workers)`` tagacha shard oladi;
+        ortiqchasini bo'shatadi, muddati o'tgan (o'lgan worker) shard'larni
+        egallaydi. Worker egallagan shard'lar to'plamini qaytaradi.
+        """
+        expires = now + ttl
+        with self.transaction(immediate=True) as cursor:
+            cursor.execute(
+                "INSERT INTO scheduler_workers (worker_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET expires_at = excluded.expires_at",
+                (worker_id, expires)
+            )
+            cursor.execute("DELETE FROM scheduler_workers WHERE expires_at <= ?", (now,))
+            workers = cursor.execute("SELECT COUNT(*) FROM scheduler_workers").fetchone()[0]
+            cursor.executemany(
+                "INSERT OR IGNORE INTO shard_leases (shard, owner, expires_at) VALUES (?, NULL, 0)",
+                [(shard,) for shard in range(shards)]
+            )
             cursor.execute(
-                'UPDATE schedules SET day_count = ? WHERE id = ?',
-                (day_count, schedule_id)
+                "UPDATE shard_leases SET expires_at = ? WHERE owner = ? AND shard < ?", (expires, worker_id, shards)
             )
-            conn.commit() 
+            rows = cursor.execute(
+                "SELECT shard, owner, expires_at FROM shard_leases WHERE shard < ? ORDER BY shard", (shards,)
+            ).fetchall()
+            owned = [shard for shard, owner, _ in rows if owner == worker_id]
+            target = -(-shards // max(workers, 1))
+            if len(owned) > target:
+                release = owned[target:]
+                cursor.executemany(
+                    "UPDATE shard_leases SET owner = NULL, expires_at = 0 WHERE shard = ?",
+                    [(shard,) for shard in release]
+                )
+                owned = owned[:target]
+            else:
+                free = [shard for shard, owner, expires_at in rows
+                        if owner != worker_id and (owner is None or expires_at <= now)]
+                take = free[:target - len(owned)]
+                cursor.executemany(
+                    "UPDATE shard_leases SET owner = ?, expires_at = ? WHERE shard = ?",
+                    [(worker_id, expires, shard) for shard in take]
+                )
+                owned.extend(take)
+        return set(owned)
+
+    def release_leases(self, worker_id: str):
+        """To'xtashda shard'larni boshqa worker'larga darhol bo'shatish"""
+        with self.transaction() as cursor:
+            cursor.execute("UPDATE shard_leases SET owner = NULL, expires_at = 0 WHERE owner = ?", (worker_id,))
+            cursor.execute("DELETE FROM scheduler_workers WHERE worker_id = ?", (worker_id,))
+
+    def load_user_data(self) -> List[Tuple[int, str]]:
+        """Saqlangan user_data (JSON)"""
+        return self._fetchall('SELECT user_id, data FROM user_data')
+
+    def load_conversations(self, name: str) -> List[Tuple[str, str]]:
+        """``name`` suhbatining (kalit, holat) juftlari (JSON)"""
+        return self._fetchall('SELECT key, state FROM conversations WHERE name = ?', (name,))
+
+    def save_persistence(self, user_data: Dict[int, Optional[str]],
+                         conversations: Dict[Tuple[str, str], Optional[str]]):
+        """Persistence partiyasini bitta tranzaksiyada yozish; None qiymat — yozuvni o'chirish"""
+        with self.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO user_data (user_id, data) VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET data = excluded.data
+            ''', [(user_id, data) for user_id, data in user_data.items() if data is not None])
+            cursor.executemany(
+                'DELETE FROM user_data WHERE user_id = ?',
+                [(user_id,) for user_id, data in user_data.items() if data is None]
+            )
+            cursor.executemany('''
+                INSERT INTO conversations (name, key, state) VALUES (?, ?, ?)
+                ON CONFLICT (name, key) DO UPDATE SET state = excluded.state
+            ''', [(name, key, state) for (name, key), state in conversations.items() if state is not None])
+            cursor.executemany(
+                'DELETE FROM conversations WHERE name = ? AND key = ?',
+                [(name, key) for (name, key), state in conversations.items() if state is None]
+            )
+
+    def complete_expired_schedules(self, today: str, batch_size: int = EXPIRY_SWEEP_BATCH) -> List[Tuple]:
+        """``end_date`` i ``today`` dan oldin bo'lgan faol rejalarni yakunlash; (id, user_id, channel_id, message, day_count).
+
+        Har bo'lak alohida tranzaksiya; ``day_count`` challenge'ning jami kunlari
+        bilan to'ldiriladi. Boshqa jarayonlar ``schedule_events`` dan biladi.
+        """
+        completed: List[Tuple] = []
+        while True:
+            with self.transaction() as cursor:
+                rows = cursor.execute('''
+                    UPDATE schedules
+                    SET status = 'completed',
+                        day_count = COALESCE(CAST(julianday(end_date) - julianday(start_date) AS INTEGER) + 1, day_count)
+                    WHERE id IN (
+                        SELECT id FROM schedules
+                        WHERE status = 'active' AND end_date > '' AND end_date < ?
+                        LIMIT ?
+                    )
+                    RETURNING id, user_id, channel_id, message, day_count
+                ''', (today, batch_size)).fetchall()
+                self._schedule_events(cursor, [row[0] for row in rows], 'delete')
+            completed.extend(rows)
+            if len(rows) < batch_size:
+                return completed
+
+    def set_merge_sends(self, schedule_id: int, user_id: int, merge_sends: bool) -> bool:
+        """Rejani bir daqiqadagi boshqa rejalar bilan birlashtirishni yoqish/o'chirish; o'zgardimi"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "UPDATE schedules SET merge_sends = ? WHERE id = ? AND user_id = ? AND status = 'active'",
+                (int(merge_sends), schedule_id, user_id)
+            )
+            if not cursor.rowcount:
+                return False
+            # Boshqa jarayonlardagi scheduler'lar rejani qayta yuklaydi
+            self._schedule_event(cursor, schedule_id, 'add')
+        return True
 
     def delete_schedule(self, schedule_id: int):
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute('DELETE FROM schedules WHERE id = ?', (schedule_id,))
-            conn.commit() 
+            if cursor.rowcount:
+                self._schedule_event(cursor, schedule_id, 'delete')
 
-    def delete_channel(self, user_id: int, channel_id: str):
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
+    def delete_channel(self, user_id: int, channel_id: str) -> List[int]:
+        """Kanalni va unga yuboriladigan rejalarni bitta tranzaksiyada o'chirish; o'chirilgan reja id'lari"""
+        with self.transaction() as cursor:
             cursor.execute('DELETE FROM channels WHERE user_id = ? AND channel_id = ?', (user_id, channel_id))
-            conn.commit() 
\ No newline at end of file
+            # idx_schedules_user_channel_time bo'yicha, jadval skan qilinmaydi
+            ids = [row[0] for row in cursor.execute(
+                'DELETE FROM schedules WHERE user_id = ? AND channel_id = ? RETURNING id', (user_id, channel_id)
+            ).fetchall()]
+            self._schedule_events(cursor, ids, 'delete')
+            self._after_transaction(lambda: self.channel_cache.invalidate(user_id))
+        return ids
+
+    def purge_orphan_schedules(self, batch_size: int = 1000) -> int:
+        """Kanali o'chirilgan rejalarni bo'laklab o'chirish (har bo'lak alohida tranzaksiya); o'chirilganlar soni"""
+        last_id = 0
+        total = 0
+        while True:
+            with self.transaction() as cursor:
+                ids = [row[0] for row in cursor.execute('''
+                    DELETE FROM schedules WHERE id IN (
+                        SELECT s.id FROM schedules s
+                        WHERE s.id > ? AND NOT EXISTS (
+                            SELECT 1 FROM channels c WHERE c.user_id = s.user_id AND c.channel_id = s.channel_id
+                        )
+                        ORDER BY s.id
+                        LIMIT ?
+                    )
+                    RETURNING id
+                ''', (last_id, batch_size)).fetchall()]
+                self._schedule_events(cursor, ids, 'delete')
+            total += len(ids)
+            if len(ids) < batch_size:
+                return total
+            # Oraliqdagi qatorlar kanali bor rejalar, qayta ko'rilmaydi
+            last_id = max(ids)
+            logger.info(f"Yetim rejalar: {total} ta o'chirildi (id {last_id} gacha)")
+
+    def get_channel_states_page(self, after: str = "", limit: int = 100) -> List[Tuple[str, bool]]:
+        """Kanallar ``channel_id`` tartibida ``after`` dan keyin: (channel_id, to'xtatilganmi)"""
+        return [(channel_id, bool(paused)) for channel_id, paused in self._fetchall('''
+            SELECT channel_id, MAX(paused_at IS NOT NULL) FROM channels
+            WHERE channel_id > ?
+            GROUP BY channel_id
+            ORDER BY channel_id
+            LIMIT ?
+        ''', (after, limit))]
+
+    def get_channel_states(self, channel_ids: Iterable[str]) -> List[Tuple[str, bool]]:
+        """Berilgan kanallar holati; bazada yo'qlari tushib qoladi"""
+        channel_ids = list(channel_ids)
+        states: List[Tuple[str, bool]] = []
+        for start in range(0, len(channel_ids), IN_CHUNK):
+            chunk = channel_ids[start:start + IN_CHUNK]
+            states.extend((channel_id, bool(paused)) for channel_id, paused in self._fetchall(
+                f"SELECT channel_id, MAX(paused_at IS NOT NULL) FROM channels "
+                f"WHERE channel_id IN ({','.join('?' * len(chunk))}) GROUP BY channel_id",
+                tuple(chunk)
+            ))
+        return states
+
+    def _set_channel_schedules_status(self, cursor: sqlite3.Cursor, channel_id: str,
+                                      old: str, new: str) -> Dict[int, List[int]]:
+        """Kanalga ulangan har bir egasining ``old`` holatdagi rejalarini ``new`` ga o'tkazish"""
+        changed: Dict[int, List[int]] = {}
+        owners = [row[0] for row in cursor.execute('SELECT user_id FROM channels WHERE channel_id = ?', (channel_id,))]
+        for user_id in owners:
+            # idx_schedules_user_channel_time bo'yicha
+            ids = [row[0] for row in cursor.execute(
+                'UPDATE schedules SET status = ? WHERE user_id = ? AND channel_id = ? AND status = ? RETURNING id',
+                (new, user_id, channel_id, old)
+            ).fetchall()]
+            if ids:
+                changed[user_id] = ids
+        return changed
+
+    def pause_channel(self, channel_id: str) -> Tuple[List[Tuple[int, str, int]], List[int]]:
+        """Bot kira olmaydigan kanal rejalarini ``paused`` qilish.
+
+        Qaytaradi: (shu chaqiruvda to'xtatilgan egalar — (user_id, kanal nomi,
+        rejalar soni), to'xtatilgan reja id'lari). Kanal avval to'xtatilgan
+        bo'lsa egalar qaytmaydi, lekin keyin qo'shilgan rejalar ham to'xtatiladi.
+        """
+        paused_at = datetime.now(pytz.timezone(TIMEZONE)).strftime(RUN_AT_FORMAT)
+        with self.transaction() as cursor:
+            owners = cursor.execute(
+                'UPDATE channels SET paused_at = ? WHERE channel_id = ? AND paused_at IS NULL '
+                'RETURNING user_id, channel_name',
+                (paused_at, channel_id)
+            ).fetchall()
+            changed = self._set_channel_schedules_status(cursor, channel_id, 'active', 'paused')
+            ids = [i for user_ids in changed.values() for i in user_ids]
+            self._schedule_events(cursor, ids, 'delete')
+        return [(user_id, name, len(changed.get(user_id, ()))) for user_id, name in owners], ids
+
+    def resume_channel(self, channel_id: str) -> Tuple[List[Tuple[int, str, int]], List[int]]:
+        """Kanalga kirish qaytganda to'xtatilgan rejalarni yana ``active`` qilish (``pause_channel`` teskarisi)"""
+        with self.transaction() as cursor:
+            owners = cursor.execute(
+                'UPDATE channels SET paused_at = NULL WHERE channel_id = ? AND paused_at IS NOT NULL '
+                'RETURNING user_id, channel_name',
+                (channel_id,)
+            ).fetchall()
+            if not owners:
+                return [], []
+            changed = self._set_channel_schedules_status(cursor, channel_id, 'paused', 'active')
+            ids = [i for user_ids in changed.values() for i in user_ids]
+            self._schedule_events(cursor, ids, 'add')
+        return [(user_id, name, len(changed.get(user_id, ()))) for user_id, name in owners], ids
+
+    def add_failed_delivery(self, schedule_id: Optional[int], user_id: Optional[int], chat_id: str,
+                            text: str, error: str, attempts: int, media_type: str = "", media: str = ""):
+        """Yuborilmagan xabarni dead letter jadvaliga yozish"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO failed_deliveries (schedule_id, user_id, chat_id, text, error, attempts, media_type, media)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (schedule_id, user_id, chat_id, text, error, attempts, media_type, media))
+
+    def get_failed_deliveries(self, limit: int = 1000) -> List[Tuple]:
+        """Dead letter jadvalidagi eng eski xabarlar"""
+        return self._fetchall('''
+            SELECT id, schedule_id, user_id, chat_id, text, error, attempts, failed_at, media_type, media
+            FROM failed_deliveries
+            ORDER BY id
+            LIMIT ?
+        ''', (limit,))
+
+    def get_media_files(self) -> List[Tuple[str, str]]:
+        """Yuklangan media keshi: (manba, file_id)"""
+        return self._fetchall('SELECT source, file_id FROM media_files')
+
+    def save_media_file(self, source: str, media_type: str, file_id: str):
+        with self.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO media_files (source, media_type, file_id, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (source) DO UPDATE SET media_type = excluded.media_type, file_id = excluded.file_id
+            ''', (source, media_type, file_id, time.time()))
+
+    def delete_failed_deliveries(self, ids: List[int]):
+        with self.transaction() as cursor:
+            cursor.executemany('DELETE FROM failed_deliveries WHERE id = ?', [(i,) for i in ids])
@@ -0,0 +1,132 @@
+import logging
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from templates import CompiledTemplate
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleEntry(NamedTuple):
+    """Dispatcher ichida saqlanadigan bitta reja"""
+    schedule_id: int
+    user_id: int
+    channel_id: str
+    time: str
+    message: str
+    with_date: bool
+    start_date: str
+    end_date: str
+    template: Optional[CompiledTemplate] = None
+    # Bir daqiqada shu kanalga tushgan boshqa rejalar bilan bitta xabarga birlashtirish
+    merge: bool = True
+    # Bo'sh bo'lmasa rasm/video/hujjat; ``message`` uning izohi (media.py)
+    media_type: str = ""
+    media: str = ""
+
+
+def slot_key(hour: int, minute: int) -> str:
+    """Soat va daqiqadan HH:MM kalitini yasash"""
+    return f"{hour:02d}:{minute:02d}"
+
+
+def normalize_time(time: str) -> str:
+    """'9:30' kabi vaqtni '09:30' ko'rinishiga keltirish"""
+    hour, minute = map(int, time.split(':'))
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f"Noto'g'ri vaqt: {time}")
+    return slot_key(hour, minute)
+
+
+def group_by_channel(entries: Iterable[ScheduleEntry]) -> List[List[ScheduleEntry]]:
+    """Bir slotdagi rejalarni yuborish guruhlariga ajratish.
+
+    ``merge`` yoqilgan, bir kanalga tushgan matnli rejalar id tartibida
+    bitta guruhga yig'iladi; qolganlari (media rejalar ham) alohida guruh bo'ladi.
+    """
+    groups: List[List[ScheduleEntry]] = []
+    by_channel: Dict[str, List[ScheduleEntry]] = {}
+    for entry in sorted(entries, key=lambda e: e.schedule_id):
+        if not entry.merge or entry.media_type:
+            groups.append([entry])
+            continue
+        group = by_channel.get(entry.channel_id)
+        if group is None:
+            group = by_channel[entry.channel_id] = []
+            groups.append(group)
+        group.append(entry)
+    return groups
+
+
+class MinuteDispatcher:
+    """Rejalarni HH:MM slotlari bo'yicha indekslash.
+
+    Har bir reja uchun alohida cron job o'rniga bitta daqiqalik tick
+    ishlatiladi: tick joriy slotdagi rejalarni ``due()`` orqali oladi.
+    Qo'shish va o'chirish O(1); kanal bo'yicha o'chirish shu kanal
+    rejalari soniga proporsional.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[int, ScheduleEntry]] = {}
+        self._slots: Dict[int, str] = {}
+        # (user_id, channel_id) -> reja id'lari
+        self._channels: Dict[Tuple[int, str], Set[int]] = {}
+
+    def add(self, entry: ScheduleEntry) -> ScheduleEntry:
+        """Rejani o'z slotiga qo'shish (mavjud bo'lsa almashtiriladi)"""
+        entry = entry._replace(time=normalize_time(entry.time))
+        self.remove(entry.schedule_id)
+        self._buckets.setdefault(entry.time, {})[entry.schedule_id] = entry
+        self._slots[entry.schedule_id] = entry.time
+        self._channels.setdefault((entry.user_id, entry.channel_id), set()).add(entry.schedule_id)
+        return entry
+
+    def remove(self, schedule_id: int) -> Optional[ScheduleEntry]:
+        """Rejani slotdan olib tashlash"""
+        slot = self._slots.pop(schedule_id, None)
+        if slot is None:
+            return None
+        bucket = self._buckets[slot]
+        entry = bucket.pop(schedule_id, None)
+        if not bucket:
+            del self._buckets[slot]
+        if entry is not None:
+            key = (entry.user_id, entry.channel_id)
+            ids = self._channels.get(key)
+            if ids is not None:
+                ids.discard(schedule_id)
+                if not ids:
+                    del self._channels[key]
+        return entry
+
+    def remove_channel(self, user_id: int, channel_id: str) -> List[ScheduleEntry]:
+        """Kanalga yuboriladigan barcha rejalarni olib tashlash"""
+        ids = self._channels.pop((user_id, channel_id), ())
+        return [entry for entry in map(self.remove, list(ids)) if entry is not None]
+
+    def get(self, schedule_id: int) -> Optional[ScheduleEntry]:
+        slot = self._slots.get(schedule_id)
+        if slot is None:
+            return None
+        return self._buckets[slot].get(schedule_id)
+
+    def due(self, slot: str) -> List[ScheduleEntry]:
+        """Berilgan slotda yuborilishi kerak bo'lgan rejalar"""
+        bucket = self._buckets.get(slot)
+        if not bucket:
+            return []
+        return list(bucket.values())
+
+    def slot_sizes(self) -> Dict[str, int]:
+        """Har bir slotdagi rejalar soni"""
+        return {slot: len(bucket) for slot, bucket in self._buckets.items()}
+
+    def __contains__(self, schedule_id: int) -> bool:
+        return schedule_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __iter__(self) -> Iterator[ScheduleEntry]:
+        for bucket in self._buckets.values():
+            yield from bucket.values()
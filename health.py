@@ -0,0 +1,166 @@
+"""Kanallarda bot huquqini fonda qayta tekshirish va kira olmaydigan kanallar rejalarini to'xtatish.
+
+Admin huquqi faqat /kanal_ulash da tekshiriladi; bot keyinroq kanaldan
+chiqarilsa yoki adminlikdan olinsa, har kungi yuborishlar xato bilan
+tugaydi va navbat sig'imini behuda egallaydi. ``ChannelHealthChecker``
+har ``CHANNEL_HEALTH_INTERVAL`` sekundda o'z shard'laridagi kanallarni
+``CHANNEL_HEALTH_BATCH`` talik bo'laklarda ``get_chat_member`` bilan
+tekshiradi (bo'laklar orasida ``CHANNEL_HEALTH_BATCH_DELAY`` pauza):
+
+* kira olmaydigan kanal rejalari ``paused`` holatiga o'tadi;
+* huquq qaytsa rejalar yana ``active`` bo'ladi;
+* har bir o'tishda egasiga bitta xabar yuboriladi.
+
+Yuborish ``Forbidden``/``BadRequest`` bilan yiqilgan kanallar to'liq
+aylanishni kutmasdan ``SUSPECT_CHECK_INTERVAL`` ichida tekshiriladi.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, List, Optional, Set, Tuple
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter, TelegramError
+
+from config import CHANNEL_HEALTH_BATCH, CHANNEL_HEALTH_BATCH_DELAY, CHANNEL_HEALTH_INTERVAL
+from metrics import CHANNEL_CHECKS
+from send_queue import OutboundMessage, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Bot kanalda shu statuslardan birida bo'lsa xabar yubora oladi
+ADMIN_STATUSES = ('administrator', 'creator')
+# Shubhali kanallar (va birinchi aylanish) shuncha sekundda bir tekshiriladi
+SUSPECT_CHECK_INTERVAL = 60
+
+
+def can_post(member: Any) -> bool:
+    """``get_chat_member`` natijasi bo'yicha bot kanalga yoza oladimi"""
+    if member.status not in ADMIN_STATUSES:
+        return False
+    # Kanal admini post huquqisiz bo'lishi mumkin; guruhlarda bu maydon None
+    return getattr(member, 'can_post_messages', None) is not False
+
+
+class ChannelHealthChecker:
+    """``MessageScheduler`` ning shard'laridagi kanallarni tekshiradi va rejalarni to'xtatadi/davom ettiradi"""
+
+    def __init__(self, scheduler, interval: float = CHANNEL_HEALTH_INTERVAL,
+                 batch_size: int = CHANNEL_HEALTH_BATCH, batch_delay: float = CHANNEL_HEALTH_BATCH_DELAY):
+        self.scheduler = scheduler
+        self.db = scheduler.db
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        # Yuborish xatosi bergan kanallar (navbatdan tashqari tekshiriladi)
+        self._suspects: Set[str] = set()
+        self.paused = 0
+        self.resumed = 0
+
+    def suspect(self, channel_id: str):
+        self._suspects.add(channel_id)
+
+    async def check(self, channel_id: str) -> Optional[bool]:
+        """True — yoza oladi, False — kira olmaydi, None — aniqlab bo'lmadi (tarmoq, flood limit)"""
+        bot = self.scheduler.bot
+        try:
+            member = await bot.get_chat_member(channel_id, bot.id)
+        except RetryAfter as e:
+            CHANNEL_CHECKS.labels('error').inc()
+            await asyncio.sleep(retry_after_seconds(e))
+            return None
+        except (Forbidden, BadRequest, ChatMigrated) as e:
+            # Bot chiqarilgan, kanal o'chirilgan yoki ko'chirilgan
+            logger.info("Kanalga kirib bo'lmadi: %s: %s", channel_id, e, extra={'channel_id': channel_id})
+            reachable = False
+        except TelegramError as e:
+            CHANNEL_CHECKS.labels('error').inc()
+            logger.warning("Kanal holatini tekshirib bo'lmadi: %s: %s", channel_id, e, extra={'channel_id': channel_id})
+            return None
+        else:
+            reachable = can_post(member)
+        CHANNEL_CHECKS.labels('ok' if reachable else 'unreachable').inc()
+        return reachable
+
+    async def check_channels(self, channels: List[Tuple[str, bool]]) -> int:
+        """(channel_id, to'xtatilganmi) ro'yxatini parallel tekshirish; holati o'zgargan kanallar soni"""
+        channels = [(channel_id, paused) for channel_id, paused in channels if self.scheduler.shards.owns(channel_id)]
+        results = await asyncio.gather(*(self.check(channel_id) for channel_id, _ in channels))
+        changed = 0
+        for (channel_id, paused), reachable in zip(channels, results):
+            if reachable is None or (reachable and not paused):
+                continue
+            changed += await self._apply(channel_id, reachable)
+        if changed:
+            # Dispatcher schedule_events orqali yangilanadi (boshqa jarayonlardagi kabi)
+            await self.scheduler.apply_schedule_events()
+        return changed
+
+    async def _apply(self, channel_id: str, reachable: bool) -> int:
+        if reachable:
+            owners, ids = await asyncio.to_thread(self.db.resume_channel, channel_id)
+            self.resumed += len(owners)
+        else:
+            # Kanal avval to'xtatilgan bo'lsa ham: keyin qo'shilgan rejalar ham to'xtatiladi
+            owners, ids = await asyncio.to_thread(self.db.pause_channel, channel_id)
+            self.paused += len(owners)
+        for user_id, channel_name, count in owners:
+            await self.scheduler.send_queue.put(OutboundMessage(
+                str(user_id), self._notice(channel_name or channel_id, reachable, count), user_id=user_id
+            ))
+        if owners or ids:
+            logger.info(
+                "Kanal %s: %d ta reja %s", channel_id, len(ids), "davom ettirildi" if reachable else "to'xtatildi",
+                extra={'channel_id': channel_id}
+            )
+            return 1
+        return 0
+
+    @staticmethod
+    def _notice(channel_name: str, reachable: bool, count: int) -> str:
+        if reachable:
+            return f"✅ Bot «{channel_name}» kanaliga yana xabar yubora oladi.\n▶️ {count} ta reja davom ettirildi."
+        return (
+            f"⚠️ Bot «{channel_name}» kanaliga xabar yubora olmayapti "
+            f"(kanaldan chiqarilgan yoki admin huquqi olingan).\n"
+            f"⏸ {count} ta reja to'xtatildi. Botni qayta admin qilsangiz, rejalar o'zi davom etadi."
+        )
+
+    async def check_suspects(self) -> int:
+        suspects, self._suspects = self._suspects, set()
+        states = await asyncio.to_thread(self.db.get_channel_states, suspects)
+        return await self.check_channels(states)
+
+    async def run_pass(self) -> int:
+        """O'z shard'laridagi barcha kanallarni bo'laklab tekshirish; holati o'zgargan kanallar soni"""
+        after = ""
+        changed = 0
+        while True:
+            page = await asyncio.to_thread(self.db.get_channel_states_page, after, self.batch_size)
+            changed += await self.check_channels(page)
+            if len(page) < self.batch_size:
+                return changed
+            after = page[-1][0]
+            await asyncio.sleep(self.batch_delay)
+
+    async def run(self):
+        """Fon vazifasi: shubhali kanallar har daqiqada, to'liq aylanish har ``interval`` sekundda"""
+        loop = asyncio.get_running_loop()
+        # Birinchi aylanish shard'lar egallangandan keyin
+        next_pass = loop.time() + SUSPECT_CHECK_INTERVAL
+        while True:
+            await asyncio.sleep(SUSPECT_CHECK_INTERVAL)
+            try:
+                if self._suspects:
+                    await self.check_suspects()
+                if loop.time() >= next_pass:
+                    started = time.perf_counter()
+                    changed = await self.run_pass()
+                    next_pass = loop.time() + self.interval
+                    logger.info(
+                        f"Kanallar tekshirildi: {changed} tasining holati o'zgardi "
+                        f"({time.perf_counter() - started:.1f}s)"
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Kanal holatini tekshirish xatoligi: {e}")
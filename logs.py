@@ -0,0 +1,142 @@
+"""Jarayon loglarini sozlash: navbat orqali yozish, JSON format va takroriy yozuvlarni cheklash.
+
+Logger chaqiruvi faqat yozuvni navbatga qo'yadi; formatlash va stderr'ga
+yozish alohida ``QueueListener`` thread'ida bajariladi, shuning uchun
+gavjum slotlarda log I/O event loop'ni to'xtatmaydi. Hot path'dagi
+yozuvlar ``%s`` argumentlari bilan (formatlash kechiktiriladi) va
+``extra`` maydonlari bilan yoziladi::
+
+    logger.info("Xabar yuborildi: %s", chat_id, extra={'schedule_id': 1, 'sample': True})
+
+``sample=True`` yozuvlar har bir shablon uchun sekundiga ``LOG_SAMPLE_PER_SECOND``
+tadan oshmaydi; tashlab yuborilganlar soni keyingi o'tgan yozuvga qo'shiladi.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+
+from config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_PER_SECOND
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# JSON yozuvga ``extra`` dan o'tkaziladigan maydonlar
+STRUCTURED_FIELDS = ('schedule_id', 'channel_id', 'user_id', 'lag', 'slot', 'sent', 'attempts', 'suppressed')
+
+_listener: Optional[QueueListener] = None
+
+
+class SampleFilter(logging.Filter):
+    """``sample=True`` yozuvlarni (logger, shablon) bo'yicha sekundiga ``per_second`` ta bilan cheklash"""
+
+    def __init__(self, per_second: int = LOG_SAMPLE_PER_SECOND):
+        super().__init__()
+        self.per_second = per_second
+        # (logger, shablon) -> [sekund, o'tganlar, tashlanganlar]
+        self._windows: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or not getattr(record, 'sample', False):
+            return True
+        key = (record.name, str(record.msg))
+        second = int(record.created)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != second:
+                window = self._windows[key] = [second, 0, window[2] if window else 0]
+            if window[1] >= self.per_second:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed = window[2]
+                window[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Yozuvni formatlamasdan navbatga qo'yadi; navbat to'lsa yozuv tashlanadi (kutilmaydi).
+
+    ``args`` o'zgarmas qiymatlar (son, satr) bo'lishi kerak: ular listener
+    thread'ida formatlanadi.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" (yana {suppressed} ta o'xshash yozuv tashlab yuborildi)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Bir qator — bitta JSON obyekt: vaqt, daraja, logger, xabar va ``STRUCTURED_FIELDS``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: Union[int, str] = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                  stream: Optional[TextIO] = None) -> QueueListener:
+    """Root logger'ni navbatli handler bilan sozlash (takroriy chaqiruv avvalgisini almashtiradi)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SampleFilter())
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Navbatda qolgan yozuvlarni yozib, listener thread'ini to'xtatish"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
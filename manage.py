@@ -0,0 +1,89 @@
+"""Bazaga to'g'ridan-to'g'ri ishlaydigan buyruqlar (bot to'xtatilmasdan ham ishlatish mumkin).
+
+    python manage.py import rejalar.csv --user-id 123456
+    python manage.py export --user-id 123456 --format json -o rejalar.json
+    python manage.py purge-orphans
+
+Import qilingan va o'chirilgan rejalarni ishlab turgan scheduler'lar
+``schedule_events`` orqali o'zi oladi.
+"""
+import argparse
+import logging
+import sys
+
+from bulk import EXPORT_FORMATS, ImportValidationError, parse_import, write_export
+from db import Database
+from logs import setup_logging
+
+
+def import_command(db: Database, args) -> int:
+    with open(args.file, 'rb') as f:
+        data = f.read()
+    allowed = None
+    if not args.any_channel:
+        allowed = {channel_id for channel_id, _ in db.get_user_channels(args.user_id)}
+    try:
+        # Operator CLI: lokal fayl manbalari (file://, absolyut yo'l) ruxsat etiladi
+        rows = parse_import(data, args.file, allowed, allow_local=True)
+    except ImportValidationError as e:
+        print(f"Import qilinmadi, {e.total} ta xato:", file=sys.stderr)
+        for error in e.errors:
+            print(f"  {error}", file=sys.stderr)
+        if e.total > len(e.errors):
+            print(f"  ... yana {e.total - len(e.errors)} ta", file=sys.stderr)
+        return 1
+    ids = db.add_schedules(args.user_id, rows)
+    print(f"{len(ids)} ta reja import qilindi (id {ids[0]}..{ids[-1]})")
+    return 0
+
+
+def export_command(db: Database, args) -> int:
+    if args.output in (None, '-'):
+        count = write_export(db.iter_schedules(user_id=args.user_id), args.format, sys.stdout.buffer)
+    else:
+        with open(args.output, 'wb') as out:
+            count = write_export(db.iter_schedules(user_id=args.user_id), args.format, out)
+    print(f"{count} ta reja eksport qilindi", file=sys.stderr)
+    return 0
+
+
+def purge_orphans_command(db: Database, args) -> int:
+    count = db.purge_orphan_schedules(args.batch_size)
+    print(f"{count} ta yetim reja o'chirildi")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition('\n')[0])
+    parser.add_argument('--db', help="Baza fayli (standart: DATABASE_FILE)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('import', help="CSV/JSON fayldagi rejalarni bitta tranzaksiyada qo'shish")
+    p.add_argument('file')
+    p.add_argument('--user-id', type=int, required=True, help="Rejalar egasi")
+    p.add_argument('--any-channel', action='store_true',
+                   help="Kanal foydalanuvchiga ulanganini tekshirmaslik")
+    p.set_defaults(handler=import_command)
+
+    p = commands.add_parser('export', help="Rejalarni CSV/JSON ga oqim bilan yozish")
+    p.add_argument('--user-id', type=int, help="Faqat shu foydalanuvchi (standart: hammasi)")
+    p.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    p.add_argument('-o', '--output', help="Fayl (standart: stdout)")
+    p.set_defaults(handler=export_command)
+
+    p = commands.add_parser('purge-orphans', help="Kanali o'chirilgan rejalarni bo'laklab o'chirish")
+    p.add_argument('--batch-size', type=int, default=1000, help="Bitta tranzaksiyadagi rejalar")
+    p.set_defaults(handler=purge_orphans_command)
+
+    args = parser.parse_args()
+    # CLI chiqishi faqat natija bo'lsin (migratsiya loglari ko'rinmaydi)
+    setup_logging(logging.WARNING)
+    db = Database(args.db)
+    try:
+        return args.handler(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Rasm, video va hujjatli rejalar: manbani bir marta yuklash va ``file_id`` ni qayta ishlatish.
+
+Reja ``media`` maydonida manba saqlanadi:
+
+* Telegram ``file_id`` — /send da foydalanuvchi yuborgan fayl (yuklash yo'q);
+* ``http(s)://`` URL — faylni Telegram o'zi yuklab oladi;
+* ``file://`` yoki absolyut yo'l — fayl botdan yuklanadi (faqat ``manage.py``
+  importida; Telegram orqali kelgan manbada rad etiladi).
+
+URL va yo'l birinchi muvaffaqiyatli yuborishda yuklanadi, Telegram qaytargan
+``file_id`` esa ``media_files`` jadvalida va xotirada keshlanadi: keyingi
+kunlarda faqat ``file_id`` yuboriladi (fayl qayta yuklanmaydi, diskda ham
+saqlanishi shart emas).
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from metrics import MEDIA_UPLOADS
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = ('photo', 'video', 'document')
+# Media izohi (caption) uzunligi chegarasi
+MAX_CAPTION_LENGTH = 1024
+_SEND_METHODS = {'photo': 'send_photo', 'video': 'send_video', 'document': 'send_document'}
+
+
+def local_path(source: str) -> Optional[str]:
+    """Manba lokal fayl bo'lsa uning yo'li"""
+    if source.startswith('file://'):
+        return source[len('file://'):]
+    if os.path.isabs(source):
+        return source
+    return None
+
+
+def needs_upload(source: str) -> bool:
+    """Manba ``file_id`` emas (birinchi yuborishda yuklanadi)"""
+    return source.startswith(('http://', 'https://')) or local_path(source) is not None
+
+
+def file_id_of(message: Any, media_type: str) -> Optional[str]:
+    """Yuborilgan (yoki foydalanuvchidan kelgan) xabardagi faylning ``file_id`` si"""
+    if media_type == 'photo':
+        return message.photo[-1].file_id if message.photo else None
+    attachment = getattr(message, media_type, None)
+    return attachment.file_id if attachment else None
+
+
+class MediaCache:
+    """Manba -> ``file_id``; bazadagi ``media_files`` bilan sinxron.
+
+    Bir manba bir vaqtda bir nechta rejada yuborilsa ham faqat bittasi
+    yuklaydi, qolganlari uning ``file_id`` sini kutadi.
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self._file_ids: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.uploads = 0
+
+    def load(self) -> int:
+        """Bazadagi keshni xotiraga olish"""
+        if self.db is not None:
+            self._file_ids.update(self.db.get_media_files())
+        return len(self._file_ids)
+
+    def get(self, source: str) -> Optional[str]:
+        return self._file_ids.get(source)
+
+    async def send(self, bot, chat_id: str, media_type: str, source: str, caption: str, **kwargs: Any):
+        """``media_type`` ni yuborish; kerak bo'lsa manbani bir marta yuklab, ``file_id`` ni saqlash"""
+        method = getattr(bot, _SEND_METHODS[media_type])
+        if len(caption) > MAX_CAPTION_LENGTH:
+            # Yaratish/importda tekshiriladi; bu yerga faqat eski rejalar tushadi
+            logger.warning(
+                "Media izohi %d belgidan %d ga qisqartirildi: %s", len(caption), MAX_CAPTION_LENGTH, chat_id,
+                extra={'channel_id': chat_id}
+            )
+        text = caption[:MAX_CAPTION_LENGTH] or None
+        if not needs_upload(source):
+            return await method(chat_id, source, caption=text, **kwargs)
+        file_id = self._file_ids.get(source)
+        if file_id is None:
+            lock = self._locks.setdefault(source, asyncio.Lock())
+            async with lock:
+                file_id = self._file_ids.get(source)
+                if file_id is None:
+                    return await self._upload(method, chat_id, media_type, source, text, **kwargs)
+        return await method(chat_id, file_id, caption=text, **kwargs)
+
+    async def _upload(self, method, chat_id: str, media_type: str, source: str, caption: Optional[str],
+                      **kwargs: Any):
+        path = local_path(source)
+        if path is None:
+            message = await method(chat_id, source, caption=caption, **kwargs)
+        else:
+            with open(path, 'rb') as f:
+                message = await method(chat_id, f, caption=caption, **kwargs)
+        self.uploads += 1
+        MEDIA_UPLOADS.inc()
+        file_id = file_id_of(message, media_type)
+        if file_id:
+            self._file_ids[source] = file_id
+            if self.db is not None:
+                await asyncio.to_thread(self.db.save_media_file, source, media_type, file_id)
+            logger.info("Media yuklandi, file_id keshlandi: %s", source)
+        return message
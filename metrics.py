@@ -0,0 +1,297 @@
+"""Prometheus text formatidagi metrikalar va ularni beradigan kichik HTTP server.
+
+Tashqi kutubxona talab qilinmaydi. Metrikalar thread-safe: ``Database``
+metodlari DB thread'larida ham o'lchanadi.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+# Metrikaning bola qiymati turi (_Value yoki _HistogramValue)
+ChildT = TypeVar('ChildT')
+
+# Bucket chegaralari (sekund)
+LAG_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List['Metric[Any]'] = []
+
+    def register(self, metric: 'Metric[Any]'):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric(Generic[ChildT]):
+    """Label'li metrika: ``labels(...)`` har bir qiymatlar to'plami uchun bola qaytaradi"""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, ChildT] = {}
+        if registry is not None:
+            registry.register(self)
+        if not self.labelnames:
+            # Label'siz metrika birinchi hodisagacha ham 0 bo'lib ko'rinsin
+            self.labels()
+
+    def _new_child(self) -> ChildT:
+        raise NotImplementedError
+
+    def labels(self, *values) -> ChildT:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: {len(self.labelnames)} ta label kerak")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self) -> ChildT:
+        return self.labels()
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric[_Value]):
+    type = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_labels_text(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Qiymat har bir so'rovda ``function()`` dan olinadi"""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                value = float(self._function())
+            except Exception as e:
+                logger.warning(f"{self.name} o'qilmadi: {e}")
+                return
+            yield f"{self.name} {_format_value(value)}"
+            return
+        yield from super().samples()
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(Metric[_HistogramValue]):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _labels_text(self.labelnames + ('le',), key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+# Bot metrikalari
+DISPATCH_LAG = Histogram(
+    "scheduler_dispatch_lag_seconds",
+    "Xabar haqiqatda yuborilgan vaqt minus rejadagi HH:MM slot", buckets=LAG_BUCKETS,
+)
+LAST_DISPATCH_LAG = Gauge("scheduler_last_dispatch_lag_seconds", "Oxirgi yuborilgan xabarning kechikishi")
+SEND_LATENCY = Histogram(
+    "telegram_send_latency_seconds", "Bot API send_message javob vaqti", ["result"], buckets=LATENCY_BUCKETS,
+)
+SENDS = Counter("telegram_sends_total", "Muvaffaqiyatli yuborilgan xabarlar")
+SEND_ERRORS = Counter("telegram_send_errors_total", "Yuborish xatoliklari turi bo'yicha", ["error"])
+API_CALLS_SAVED = Counter(
+    "scheduler_api_calls_saved_total", "Bir kanalga bir daqiqada tushgan rejalar birlashtirilib tejalgan send_message'lar"
+)
+MEDIA_UPLOADS = Counter("telegram_media_uploads_total", "URL/fayldan yuklangan media (keyin file_id ishlatiladi)")
+CHANNEL_CHECKS = Counter(
+    "channel_health_checks_total", "Kanalda bot huquqi tekshiruvlari natija bo'yicha (ok/unreachable/error)", ["result"]
+)
+DEAD_LETTERS = Counter("telegram_dead_letters_total", "Barcha urinishlardan keyin yuborilmagan xabarlar")
+DB_SECONDS = Histogram("db_call_seconds", "Database metodlari bajarilish vaqti", ["method"], buckets=DB_BUCKETS)
+REGISTERED_JOBS = Gauge("scheduler_registered_jobs", "Dispatcher'dagi rejalar soni")
+SEND_QUEUE_DEPTH = Gauge("send_queue_depth", "Yuborish navbatidagi xabarlar soni")
+ACTIVE_CONVERSATIONS = Gauge("bot_active_conversations", "Davom etayotgan /send suhbatlari")
+
+
+def instrument_methods(histogram: Histogram, exclude: Iterable[str] = ()):
+    """Klass decorator'i: har bir public metod vaqtini ``histogram`` ga ``method`` label bilan yozish.
+
+    Generator va context manager qaytaradigan metodlar ``exclude`` da berilishi kerak.
+    """
+    skip = set(exclude)
+
+    def decorate(cls):
+        for name, function in list(vars(cls).items()):
+            if name.startswith('_') or name in skip or not inspect.isfunction(function):
+                continue
+            if inspect.isgeneratorfunction(function):
+                continue
+            setattr(cls, name, _timed(function, histogram.labels(name)))
+        return cls
+    return decorate
+
+
+def _timed(function: Callable, child: _HistogramValue) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - started)
+    return wrapper
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, registry: Registry):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        path = request.split(b" ", 2)[1].decode() if request.count(b" ") >= 2 else "/"
+        if path.split('?', 1)[0] in ("/metrics", "/"):
+            status, body = "200 OK", registry.render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT,
+                               registry: Registry = REGISTRY) -> Optional[asyncio.AbstractServer]:
+    """``/metrics`` ni ``host:port`` da berish; port 0 bo'lsa o'chirilgan"""
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(lambda r, w: _handle(r, w, registry), host, port)
+    except OSError as e:
+        # Masalan, bot.py va worker.py bitta hostda: har biriga alohida METRICS_PORT bering
+        logger.error(f"Metrikalar serveri ochilmadi ({host}:{port}): {e}")
+        return None
+    logger.info(f"Metrikalar http://{host}:{port}/metrics da")
+    return server
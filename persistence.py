@@ -0,0 +1,130 @@
+"""Suhbat holatlari va ``context.user_data`` ni SQLite'da saqlash (write-behind).
+
+PTB har bir update'dan keyin faqat o'zgargan foydalanuvchi va suhbatlarni
+belgilab qo'yadi; ``update_interval`` sekundda bir marta ``update_*``
+metodlarini chaqiradi. Bu yerda ular faqat xotiradagi partiyaga yoziladi,
+partiya esa bitta ``AsyncDatabase`` tranzaksiyasida saqlanadi. Shuning
+uchun handler'larga sinxron yozish qo'shilmaydi, restart'da esa ko'pi
+bilan oxirgi ``PERSISTENCE_INTERVAL`` sekunddagi o'zgarishlar yo'qoladi
+(to'xtashda ``Application.stop()`` hammasini yozib chiqadi).
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from async_db import AsyncDatabase
+from config import PERSISTENCE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class SQLitePersistence(BasePersistence):
+    """Faqat ``user_data`` va suhbat holatlari saqlanadi (JSON ko'rinishida)"""
+
+    def __init__(self, adb: AsyncDatabase, update_interval: float = PERSISTENCE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.adb = adb
+        # Yozilishi kutilayotgan o'zgarishlar; None — yozuvni o'chirish
+        self._users: Dict[int, Optional[str]] = {}
+        self._conversations: Dict[Tuple[str, str], Optional[str]] = {}
+        self._pending: Optional[asyncio.Future] = None
+        self._save_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    async def _write_behind(self):
+        """Joriy partiya yozilguncha kutish; partiya shu loop iteratsiyasidagi barcha o'zgarishlarni oladi"""
+        if self._pending is None:
+            loop = asyncio.get_running_loop()
+            self._pending = loop.create_future()
+            # update_persistence() barcha update_* ni bitta gather'da chaqiradi
+            loop.call_soon(self._start_save, loop)
+        await asyncio.shield(self._pending)
+
+    def _start_save(self, loop: asyncio.AbstractEventLoop):
+        self._save_task = loop.create_task(self._save_batch())
+
+    async def _save_batch(self):
+        future, self._pending = self._pending, None
+        if future is None:
+            # Faqat _write_behind() orqali rejalashtiriladi; o'zgarishlar keyingi partiyada qoladi
+            return
+        users, self._users = self._users, {}
+        conversations, self._conversations = self._conversations, {}
+        try:
+            await self.adb.save_persistence(users, conversations)
+        except Exception as e:
+            # Keyingi partiyada qayta urinib ko'riladi (yangiroq qiymatlar ustun)
+            for user_id, data in users.items():
+                self._users.setdefault(user_id, data)
+            for key, state in conversations.items():
+                self._conversations.setdefault(key, state)
+            logger.error(f"Suhbat holatlarini saqlashda xatolik: {e}")
+            future.set_exception(e)
+            return
+        self.flushes += 1
+        self.flushed_rows += len(users) + len(conversations)
+        future.set_result(None)
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {user_id: json.loads(data) for user_id, data in await self.adb.load_user_data()}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        return {
+            tuple(json.loads(key)): json.loads(state)
+            for key, state in await self.adb.load_conversations(name)
+        }
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]):
+        self._conversations[(name, json.dumps(list(key)))] = None if new_state is None else json.dumps(new_state)
+        await self._write_behind()
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]):
+        # Bo'sh user_data (suhbat tugagan) saqlanmaydi
+        self._users[user_id] = json.dumps(data, ensure_ascii=False) if data else None
+        await self._write_behind()
+
+    async def drop_user_data(self, user_id: int):
+        self._users[user_id] = None
+        await self._write_behind()
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]):
+        pass
+
+    async def update_bot_data(self, data: Dict[Any, Any]):
+        pass
+
+    async def update_callback_data(self, data: Any):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]):
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]):
+        pass
+
+    async def flush(self):
+        """To'xtashda: yozilmagan o'zgarishlarni saqlash"""
+        if self._pending is not None or self._users or self._conversations:
+            await self._write_behind()
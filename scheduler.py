@@ -1,21 +1,92 @@
+import asyncio
 import logging
-from datetime import datetime
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
 import pytz
 from telegram import Bot
-from config import BOT_TOKEN, TIMEZONE
-from db import Database
+from telegram.error import BadRequest, Forbidden
+from config import (
+    TIMEZONE, MISFIRE_GRACE_TIME, EVENT_GRACE_TIME, MISFIRE_COALESCE, GLOBAL_RATE_LIMIT,
+    SCHEDULE_LOAD_CHUNK, SHARD_HEARTBEAT_INTERVAL, SCHEDULE_SYNC_INTERVAL, CHALLENGE_FINISHED_NOTIFY,
+    CHANNEL_HEALTH_INTERVAL
+)
+from db import Database, RUN_AT_FORMAT
+from metrics import API_CALLS_SAVED, REGISTERED_JOBS, SEND_QUEUE_DEPTH
+from shards import ShardCoordinator
+from health import ChannelHealthChecker
+from media import MediaCache
+from dispatcher import MinuteDispatcher, ScheduleEntry, group_by_channel, slot_key
+from send_queue import OutboundMessage, SendQueue
+from templates import MAX_MESSAGE_LENGTH, CompiledTemplate, DayContext, build_day_context, day_context
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Jarayonning eng yuqori RSS xotirasi (bayt); aniqlab bo'lmasa None"""
+    if sys.platform == 'win32' or resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'da KiB, macOS'da bayt
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# schedule_events jurnali shuncha sekund saqlanadi
+EVENTS_RETENTION = 24 * 3600
+
+# Birlashtirilgan xabardagi rejalar orasidagi ajratgich
+MERGE_SEPARATOR = "\n\n"
+
+# Har daqiqada ishlaydigan yagona job
+TICK_JOB_ID = "dispatch_tick"
+
 class MessageScheduler:
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, db: Optional[Database] = None):
         self.bot = bot
-        self.db = Database()
+        self.db = db or Database()
         from apscheduler.schedulers.asyncio import AsyncIOScheduler
         from apscheduler.triggers.cron import CronTrigger
         self.CronTrigger = CronTrigger
         self.scheduler = AsyncIOScheduler(timezone=TIMEZONE)
+        self.tz = pytz.timezone(TIMEZONE)
+        # Rejalar HH:MM slotlari bo'yicha saqlanadi, APScheduler'da esa
+        # faqat bitta daqiqalik tick job bo'ladi
+        self.dispatcher = MinuteDispatcher()
+        # Barcha xabarlar rate limitli navbat orqali yuboriladi
+        # URL/fayldan yuklangan media keyingi yuborishlarda file_id bilan ketadi
+        self.media = MediaCache(self.db)
+        self.send_queue = SendQueue(bot, dead_letter=self._dead_letter, media_cache=self.media)
+        # Bir nechta jarayon ishlasa, har biri faqat o'z shard'laridagi rejalarni yuboradi
+        self.shards = ShardCoordinator(self.db)
+        self._sync_task: Optional[asyncio.Task] = None
+        # Bot huquqini yo'qotgan kanallar rejalari to'xtatiladi (health.py)
+        self.health = ChannelHealthChecker(self)
+        self._health_task: Optional[asyncio.Task] = None
+        self._event_id: Optional[int] = None
+        # Birlashtirish tufayli yuborilmagan send_message chaqiruvlari
+        self.api_calls_saved = 0
+        # end_date sweep oxirgi marta qaysi kun uchun bajarilgan
+        self._swept_on: Optional[date] = None
+        REGISTERED_JOBS.set_function(lambda: len(self.dispatcher))
+        SEND_QUEUE_DEPTH.set_function(lambda: self.send_queue.depth)
+        self.scheduler.add_job(
+            func=self.dispatch_tick,
+            trigger=self.CronTrigger(minute='*'),
+            id=TICK_JOB_ID,
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=30,
+            # Navbat to'lib tick kutib qolsa, keyingi daqiqa o'tkazib yuborilmasin
+            max_instances=3
+        )
         # Scheduler'ni keyinroq ishga tushirish
         # self.scheduler.start()
     
@@ -24,6 +95,11 @@ class MessageScheduler:
         if not self.scheduler.running:
             try:
                 self.scheduler.start()
+                self.send_queue.start()
+                # Shard'larni egallash, rejalarni yuklash va o'tib ketgan slotlar fonda
+                self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+                if CHANNEL_HEALTH_INTERVAL > 0:
+                    self._health_task = asyncio.get_running_loop().create_task(self.health.run())
                 logger.info("Scheduler ishga tushirildi")
             except RuntimeError as e:
                 if "no running event loop" in str(e):
@@ -32,75 +108,434 @@ class MessageScheduler:
                     logger.error(f"Scheduler start xatoligi: {e}")
                     raise e
     
+    def _entry(self, user_id: int, channel_id: str, schedule_id: int, time: str, message: str,
+               with_date: bool, start_date: str, end_date: str = "", merge: bool = True,
+               media_type: str = "", media: str = "") -> ScheduleEntry:
+        # Ensure message, start_date, and end_date are not None
+        safe_message = message if message is not None else ""
+        safe_start_date = start_date if start_date is not None else "1970-01-01"
+        safe_end_date = end_date if end_date is not None else ""
+        # Shablon bir marta shu yerda tahlil qilinadi, yuborishda faqat to'ldiriladi
+        template = CompiledTemplate(safe_message, bool(with_date), safe_start_date, safe_end_date)
+        return self.dispatcher.add(ScheduleEntry(
+            schedule_id, user_id, channel_id, time, safe_message,
+            bool(with_date), safe_start_date, safe_end_date, template, bool(merge), media_type or "", media or ""
+        ))
+
+    def _entry_from_row(self, row: Tuple) -> ScheduleEntry:
+        schedule_id, user_id, channel_id, message, at, with_date, start_date, end_date, merge, media_type, media = row
+        return self._entry(
+            user_id, channel_id, schedule_id, at, message, with_date, start_date, end_date or "", merge,
+            media_type, media
+        )
+
     def add_schedule_job(self, user_id: int, channel_id: str, schedule_id: int, 
-                        time: str, message: str, with_date: bool, start_date: str, end_date: str = ""):
+                        time: str, message: str, with_date: bool, start_date: str, end_date: str = "",
+                        media_type: str = "", media: str = ""):
+        if not self.shards.owns(channel_id):
+            # Shard egasi rejani schedule_events orqali oladi
+            return
         try:
-            hour, minute = map(int, time.split(':'))
-            job_id = f"{user_id}_{channel_id}_{time}"
-            try:
-                self.scheduler.remove_job(job_id)
-            except Exception as e:
-                logger.debug(f"Oldingi jobni o'chirishda xatolik yoki mavjud emas: {e}")
-            # Ensure message, start_date, and end_date are not None
-            safe_message = message if message is not None else ""
-            safe_start_date = start_date if start_date is not None else "1970-01-01"
-            safe_end_date = end_date if end_date is not None else ""
-            self.scheduler.add_job(
-                func=self.send_scheduled_message,  # Async function directly
-                trigger=self.CronTrigger(hour=hour, minute=minute),
-                id=job_id,
-                args=[user_id, channel_id, schedule_id, safe_message, with_date, safe_start_date, safe_end_date],
-                replace_existing=True
+            entry = self._entry(
+                user_id, channel_id, schedule_id, time, message, with_date, start_date, end_date,
+                media_type=media_type, media=media
+            )
+            logger.info(
+                "Yangi reja qo'shildi: %s (%s)", schedule_id, entry.time,
+                extra={'schedule_id': schedule_id, 'channel_id': channel_id, 'sample': True}
             )
-            logger.info(f"Yangi reja qo'shildi: {job_id}")
         except Exception as e:
-            logger.error(f"Job qo'shishda xatolik: {e}")
+            logger.error("Job qo'shishda xatolik: %s", e, extra={'schedule_id': schedule_id, 'channel_id': channel_id})
 
-    async def send_scheduled_message(self, user_id: int, channel_id: str, schedule_id: int, message: str, with_date: bool, start_date: str, end_date: str = ""): 
+    def add_schedule_jobs(self, rows: Iterable[Tuple]) -> int:
+        """Ommaviy import qilingan rejalarni bitta partiyada ro'yxatga olish (faqat o'z shard'lari).
+
+        ``rows`` — ``Database.iter_schedules()`` formatidagi qatorlar.
+        """
+        started = time.perf_counter()
+        entries, failed = self._register_rows(rows, self.shards.owned)
+        self._log_loaded(len(entries), failed, started)
+        return len(entries)
+
+    def _register_rows(self, rows: Iterable[Tuple], shards: Optional[Collection[int]] = None) -> Tuple[List[ScheduleEntry], int]:
+        """Qatorlarni dispatcher'ga qo'shish (faqat ``shards`` dagilarini); (qo'shilganlar, xatolar soni)"""
+        entries: List[ScheduleEntry] = []
+        failed = 0
+        for row in rows:
+            if shards is not None and self.shards.shard_of(row[2]) not in shards:
+                continue
+            try:
+                entries.append(self._entry_from_row(row))
+            except Exception as e:
+                failed += 1
+                if failed <= 10:
+                    logger.error(f"Reja {row[0]} yuklanmadi: {e}")
+        return entries, failed
+
+    def _log_loaded(self, loaded: int, failed: int, started: float):
+        rss = peak_rss_bytes()
+        logger.info(
+            f"{loaded} ta reja {time.perf_counter() - started:.2f} s da yuklandi"
+            + (f", {failed} tasi xato" if failed else "")
+            + (f", peak RSS {rss / 2 ** 20:.1f} MiB" if rss is not None else "")
+        )
+
+    def load_schedules(self, rows: Iterable[Tuple], shards: Optional[Collection[int]] = None) -> int:
+        """Bazadagi rejalarni ommaviy ro'yxatdan o'tkazish (har bir qator uchun log yozilmaydi).
+
+        ``rows`` — ``Database.iter_schedules()`` formatidagi qatorlar.
+        """
+        started = time.perf_counter()
+        entries, failed = self._register_rows(rows, shards)
+        self._log_loaded(len(entries), failed, started)
+        return len(entries)
+
+    async def _load_shards(self, shards: Collection[int]) -> List[ScheduleEntry]:
+        """Shard'lar rejalarini bo'laklab yuklash: o'qish DB thread'ida, ro'yxatga olish loop'da"""
+        started = time.perf_counter()
+        rows = self.db.iter_schedules()
+        entries: List[ScheduleEntry] = []
+        failed = 0
+        while True:
+            chunk = await asyncio.to_thread(lambda: list(islice(rows, SCHEDULE_LOAD_CHUNK)))
+            if not chunk:
+                break
+            added, errors = self._register_rows(chunk, shards)
+            entries.extend(added)
+            failed += errors
+        self._log_loaded(len(entries), failed, started)
+        return entries
+
+    def _drop_shards(self, shards: Collection[int]):
+        for entry in list(self.dispatcher):
+            if self.shards.shard_of(entry.channel_id) in shards:
+                self.dispatcher.remove(entry.schedule_id)
+
+    async def sync_shards(self):
+        """Lease heartbeat'i: yo'qotilgan shard'larni tashlash, yangilarini yuklash"""
+        if self._event_id is None:
+            # Yuklashdan oldin olinadi: yuklash paytidagi o'zgarishlar ham jurnaldan o'qiladi
+            self._event_id = await asyncio.to_thread(self.db.last_schedule_event_id)
+        acquired, lost = await asyncio.to_thread(self.shards.heartbeat)
+        await asyncio.to_thread(self.db.prune_schedule_events, time.time() - EVENTS_RETENTION)
+        if lost:
+            self._drop_shards(lost)
+        if acquired or lost:
+            # Telegram limiti bot bo'yicha umumiy: har bir jarayon o'z ulushini oladi
+            share = GLOBAL_RATE_LIMIT * len(self.shards.owned) // self.shards.shards
+            self.send_queue.set_global_rate(max(1, share))
+        if acquired:
+            await self.catch_up(entries=await self._load_shards(acquired))
+
+    async def apply_schedule_events(self):
+        """Boshqa jarayonlarda qo'shilgan/o'chirilgan rejalarni dispatcher'ga o'tkazish"""
+        if self._event_id is None:
+            return
+        events = await asyncio.to_thread(self.db.get_schedule_events, self._event_id)
+        if not events:
+            return
+        self._event_id = events[-1][0]
+        added = []
+        for _, schedule_id, op in events:
+            if op == 'delete':
+                self.dispatcher.remove(schedule_id)
+            else:
+                added.append(schedule_id)
+        if added:
+            rows = await asyncio.to_thread(self.db.get_schedule_rows, added)
+            entries, _ = self._register_rows(rows, self.shards.owned)
+            # Slot o'tib ketgandan keyin kelgan reja ham o'sha kuni yuborilsin; pauzadan
+            # qaytgan kanalga esa faqat yaqindagi slot (MISFIRE_GRACE_TIME emas)
+            await self.catch_up(entries=entries, grace=EVENT_GRACE_TIME)
+
+    async def expire_finished(self, today: Optional[date] = None) -> int:
+        """``end_date`` i o'tgan rejalarni yakunlash (kuniga bir marta); yakunlanganlar soni.
+
+        Bazada indeks bo'yicha bo'laklab belgilanadi va dispatcher'dan olib
+        tashlanadi; ``CHALLENGE_FINISHED_NOTIFY`` yoqilgan bo'lsa egasiga
+        bitta yakuniy xabar yuboriladi. Sweep'ni bir nechta jarayon bajarsa
+        ham har bir reja faqat bittasida qaytadi.
+        """
+        today = today or datetime.now(self.tz).date()
+        if self._swept_on == today:
+            return 0
+        completed = await asyncio.to_thread(self.db.complete_expired_schedules, today.isoformat())
+        # Faqat muvaffaqiyatli sweep'dan keyin: xato bo'lsa keyingi tick qayta urinadi
+        self._swept_on = today
+        for schedule_id, user_id, channel_id, message, day_count in completed:
+            self.dispatcher.remove(schedule_id)
+            if CHALLENGE_FINISHED_NOTIFY:
+                await self.send_queue.put(OutboundMessage(
+                    str(user_id),
+                    f"🏁 Challenge yakunlandi!\n📢 Kanal: {channel_id}\n📅 Jami: {day_count} kun\n"
+                    f"📝 Xabar: {message[:50]}{'...' if len(message) > 50 else ''}",
+                    schedule_id, user_id
+                ))
+        # Boshqa jarayon yakunlagan rejalar jurnal orqali olib tashlanadi
+        await self.apply_schedule_events()
+        if completed:
+            logger.info(f"{len(completed)} ta challenge yakunlandi (end_date < {today})")
+        return len(completed)
+
+    async def _sync_loop(self):
+        next_heartbeat = 0.0
+        loop = asyncio.get_running_loop()
         try:
-            safe_message = message if message is not None else ""
-            safe_start_date = start_date if start_date is not None else "1970-01-01"
-            safe_end_date = end_date if end_date is not None else ""
-            msg = safe_message
-            if with_date:
-                today_dt = datetime.now(pytz.timezone(TIMEZONE))
-                oylar = ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul', 'avgust', 'sentyabr', 'oktyabr', 'noyabr', 'dekabr']
-                kunlar = ['dushanba', 'seshanba', 'chorshanba', 'payshanba', 'juma', 'shanba', 'yakshanba']
-                oy = oylar[today_dt.month - 1]
-                hafta_kuni = kunlar[today_dt.weekday()]
-                sana_str = f"{today_dt.day}-{oy}, {hafta_kuni}  [ {today_dt.strftime('%d.%m.%Y')} ]"
-                
-                start_dt = datetime.strptime(safe_start_date, '%Y-%m-%d')
-                challenge_kuni = (today_dt.date() - start_dt.date()).days + 1
-                
-                # Asosiy xabar
-                msg = f"Bugun: {sana_str}\nkun: {challenge_kuni}\n"
-                
-                if safe_end_date and safe_end_date.strip():
-                    end_dt = datetime.strptime(safe_end_date, '%Y-%m-%d')
-                    remaining_days = (end_dt.date() - today_dt.date()).days
-                    
-                    if remaining_days > 0:
-                        msg += f"Maqsadingizga erishish uchun {remaining_days} kun qoldi\n"
-                    else:
-                        msg += "✅ Challenge tugagan!\n"
-                
-                msg += f"\n{safe_message}"
-            await self.bot.send_message(chat_id=channel_id, text=msg)
-            logger.info(f"Xabar yuborildi: {channel_id} - {schedule_id}")
+            # Yuklash va catch-up'dan oldin: muddati o'tganlar qayta yuborilmasin
+            await self.expire_finished()
         except Exception as e:
-            logger.error(f"Xabar yuborilmadi: {e}")
+            logger.error(f"Yakunlangan rejalarni tozalash xatoligi: {e}")
+        try:
+            cached = await asyncio.to_thread(self.media.load)
+            if cached:
+                logger.info(f"Media keshi yuklandi: {cached} ta file_id")
+        except Exception as e:
+            logger.error(f"Media keshini yuklash xatoligi: {e}")
+        while True:
+            try:
+                if loop.time() >= next_heartbeat:
+                    next_heartbeat = loop.time() + SHARD_HEARTBEAT_INTERVAL
+                    await self.sync_shards()
+                await self.apply_schedule_events()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Shard sinxronlash xatoligi: {e}")
+            await asyncio.sleep(min(SCHEDULE_SYNC_INTERVAL, SHARD_HEARTBEAT_INTERVAL))
+
+    async def dispatch_tick(self):
+        """Joriy HH:MM slotidagi barcha rejalarni yuborish"""
+        now = datetime.now(self.tz)
+        if self._swept_on != now.date():
+            # Yangi kunning birinchi tick'i: avval muddati o'tgan rejalar yakunlanadi
+            try:
+                await self.expire_finished(now.date())
+            except Exception as e:
+                logger.error(f"Yakunlangan rejalarni tozalash xatoligi: {e}")
+        await self.dispatch_slot(now)
 
-    def remove_schedule_job(self, user_id: int, channel_id: str, time: str):
-        job_id = f"{user_id}_{channel_id}_{time}"
+    async def dispatch_slot(self, now: datetime) -> int:
+        """``now`` slotidagi rejalarni bazada band qilib, navbatga qo'yish"""
+        due = self.dispatcher.due(slot_key(now.hour, now.minute))
+        due_at = now.replace(second=0, microsecond=0).timestamp()
+        sent = 0
+        if due:
+            # Boshqa jarayon (yoki catch-up) allaqachon yuborgan rejalar tushib qoladi
+            claimed = set(await asyncio.to_thread(
+                self.db.claim_runs, now.strftime(RUN_AT_FORMAT), [entry.schedule_id for entry in due]
+            ))
+            # Bir kanalga tushgan rejalar bitta xabar (bitta rate limit tokeni) bo'lib ketadi
+            for group in group_by_channel(entry for entry in due if entry.schedule_id in claimed):
+                if len(group) == 1:
+                    await self.send_scheduled_message(group[0], due_at=due_at)
+                else:
+                    await self.send_merged(group, due_at=due_at)
+                sent += len(group)
+        slot = slot_key(now.hour, now.minute)
+        logger.info(
+            "Slot %s: %d ta xabar navbatga qo'yildi, navbat: %s", slot, sent, self.queue_stats(),
+            extra={'slot': slot, 'sent': sent}
+        )
+        return sent
+
+    @staticmethod
+    def _render(entry: ScheduleEntry, day: Optional[DayContext] = None) -> str:
+        template = entry.template or CompiledTemplate(
+            entry.message, entry.with_date, entry.start_date, entry.end_date
+        )
+        if day is None and template.needs_day:
+            day = day_context(TIMEZONE)
+        return template.render(day)
+
+    async def send_scheduled_message(self, entry: ScheduleEntry, day: Optional[DayContext] = None,
+                                     due_at: Optional[float] = None):
         try:
-            self.scheduler.remove_job(job_id)
-            logger.info(f"Reja o'chirildi: {job_id}")
-        except:
-            logger.warning(f"Reja topilmadi: {job_id}")
+            msg = self._render(entry, day)
+            await self.send_queue.put(
+                OutboundMessage(
+                    entry.channel_id, msg, entry.schedule_id, entry.user_id, due_at=due_at,
+                    media_type=entry.media_type, media=entry.media
+                )
+            )
+        except Exception as e:
+            logger.error(
+                "Xabar yuborilmadi: %s", e, extra={'schedule_id': entry.schedule_id, 'channel_id': entry.channel_id}
+            )
+
+    async def send_merged(self, entries: List[ScheduleEntry], due_at: Optional[float] = None) -> int:
+        """Bir kanalga bir daqiqada tushgan rejalarni uzunlik chegarasigacha bitta xabarga birlashtirish.
+
+        Rejalar berilgan tartibda qo'shiladi; sig'maganidan yangi xabar
+        boshlanadi. Navbatga qo'yilgan xabarlar sonini qaytaradi.
+        """
+        day = day_context(TIMEZONE)
+        chunks: List[Tuple[ScheduleEntry, List[str]]] = []
+        length = 0
+        for entry in entries:
+            try:
+                text = self._render(entry, day)
+            except Exception as e:
+                logger.error(
+                    "Xabar yuborilmadi: %s", e, extra={'schedule_id': entry.schedule_id, 'channel_id': entry.channel_id}
+                )
+                continue
+            if chunks and length + len(MERGE_SEPARATOR) + len(text) <= MAX_MESSAGE_LENGTH:
+                chunks[-1][1].append(text)
+                length += len(MERGE_SEPARATOR) + len(text)
+            else:
+                chunks.append((entry, [text]))
+                length = len(text)
+        saved = sum(len(texts) - 1 for _, texts in chunks)
+        if saved:
+            self.api_calls_saved += saved
+            API_CALLS_SAVED.inc(saved)
+        # Dead letter va loglar uchun guruhdagi birinchi reja
+        for first, texts in chunks:
+            await self.send_queue.put(OutboundMessage(
+                first.channel_id, MERGE_SEPARATOR.join(texts), first.schedule_id, first.user_id, due_at=due_at
+            ))
+        return len(chunks)
+
+    def missed_slots(self, end: datetime, grace: int = MISFIRE_GRACE_TIME) -> Dict[str, List[datetime]]:
+        """``end`` dan oldingi ``grace`` sekund ichidagi daqiqalar, HH:MM slot bo'yicha"""
+        end = end.astimezone(self.tz).replace(second=0, microsecond=0)
+        slots: Dict[str, List[datetime]] = {}
+        for minutes_ago in range(grace // 60, 0, -1):
+            moment = (end - timedelta(minutes=minutes_ago)).astimezone(self.tz)
+            slots.setdefault(slot_key(moment.hour, moment.minute), []).append(moment)
+        return slots
+
+    async def catch_up(self, end: Optional[datetime] = None, entries: Optional[Iterable[ScheduleEntry]] = None,
+                       grace: int = MISFIRE_GRACE_TIME) -> int:
+        """Bot ishlamagan paytda o'tib ketgan slotlarni navbatga qo'yish.
+
+        Faqat ``last_run_at`` dan keyingi va ``grace`` sekund ichidagi
+        slotlar olinadi. ``MISFIRE_COALESCE`` yoqilgan bo'lsa har bir reja
+        uchun faqat eng oxirgisi yuboriladi. ``entries`` berilmasa
+        dispatcher'dagi barcha rejalar tekshiriladi.
+        """
+        if grace < 60:
+            return 0
+        if end is None:
+            # Keyingi tick o'zi yuboradigan slotni takrorlamaslik uchun
+            job = self.scheduler.get_job(TICK_JOB_ID)
+            # APScheduler ishga tushmagan bo'lsa job'da next_run_time bo'lmaydi
+            next_run: Optional[datetime] = getattr(job, 'next_run_time', None)
+            end = next_run if next_run is not None else datetime.now(self.tz)
+        slots = self.missed_slots(end, grace)
+        candidates: List[Tuple[ScheduleEntry, List[datetime]]] = []
+        if entries is None:
+            for slot, moments in slots.items():
+                candidates.extend((entry, moments) for entry in self.dispatcher.due(slot))
+        else:
+            candidates = [(entry, slots[entry.time]) for entry in entries if entry.time in slots]
+        if not candidates:
+            return 0
+        last_runs = await asyncio.to_thread(self.db.get_last_runs, [e.schedule_id for e, _ in candidates])
+
+        pending: Dict[int, Tuple[ScheduleEntry, List[datetime]]] = {}
+        for entry, moments in candidates:
+            last_run = last_runs.get(entry.schedule_id)
+            if last_run is None:
+                continue
+            missed = [m for m in moments if m.strftime(RUN_AT_FORMAT) > last_run]
+            if MISFIRE_COALESCE:
+                missed = missed[-1:]
+            if missed:
+                pending[entry.schedule_id] = (entry, missed)
+        if not pending:
+            return 0
+
+        # Oxirgi o'tkazib yuborilgan slot bo'yicha band qilish
+        by_run_at: Dict[str, List[int]] = {}
+        for schedule_id, (_, missed) in pending.items():
+            by_run_at.setdefault(missed[-1].strftime(RUN_AT_FORMAT), []).append(schedule_id)
+        claimed = set()
+        for run_at, ids in by_run_at.items():
+            claimed.update(await asyncio.to_thread(self.db.claim_runs, run_at, ids))
+
+        queue = sorted(
+            ((moment, entry) for schedule_id, (entry, missed) in pending.items()
+             if schedule_id in claimed for moment in missed),
+            key=lambda item: item[0]
+        )
+        days: Dict[date, DayContext] = {}
+        for moment, entry in queue:
+            day = days.get(moment.date())
+            if day is None:
+                day = days[moment.date()] = build_day_context(moment.date())
+            await self.send_scheduled_message(entry, day, due_at=moment.timestamp())
+        logger.info(f"O'tkazib yuborilgan {len(queue)} ta xabar navbatga qo'yildi ({len(claimed)} ta reja)")
+        return len(queue)
+
+    async def _dead_letter(self, message: OutboundMessage, error: Exception):
+        """Barcha urinishlardan keyin ham ketmagan xabarni bazaga yozish"""
+        await asyncio.to_thread(
+            self.db.add_failed_delivery,
+            message.schedule_id, message.user_id, message.chat_id, message.text,
+            f"{type(error).__name__}: {error}", message.attempts, message.media_type, message.media
+        )
+        if isinstance(error, (Forbidden, BadRequest)) and message.chat_id != str(message.user_id):
+            # Bot kanaldan chiqarilgan bo'lishi mumkin: to'liq aylanishni kutmasdan tekshiriladi
+            self.health.suspect(message.chat_id)
+
+    async def replay_failed(self, limit: int = 1000) -> int:
+        """Dead letter jadvalidagi xabarlarni qayta navbatga qo'yish"""
+        rows = await asyncio.to_thread(self.db.get_failed_deliveries, limit)
+        if not rows:
+            return 0
+        # Har bir qator navbatga tushgandan keyingina o'chiriladi: oradagi
+        # xatoda xabar yo'qolmaydi. Qayta yiqilsa, navbat uni yana jadvalga yozadi
+        count = 0
+        for failed_id, schedule_id, user_id, chat_id, text, _, _, _, media_type, media in rows:
+            await self.send_queue.put(
+                OutboundMessage(chat_id, text, schedule_id, user_id, media_type=media_type, media=media)
+            )
+            await asyncio.to_thread(self.db.delete_failed_deliveries, [failed_id])
+            count += 1
+        logger.info(f"{count} ta yuborilmagan xabar qayta navbatga qo'yildi")
+        return count
+
+    def remove_schedule_job(self, schedule_id: int):
+        if self.dispatcher.remove(schedule_id):
+            logger.info("Reja o'chirildi: %s", schedule_id, extra={'schedule_id': schedule_id})
+        else:
+            logger.warning("Reja topilmadi: %s", schedule_id, extra={'schedule_id': schedule_id})
     
+    def remove_channel_jobs(self, user_id: int, channel_id: str) -> int:
+        """O'chirilgan kanalning barcha rejalarini dispatcher'dan olib tashlash"""
+        removed = self.dispatcher.remove_channel(user_id, channel_id)
+        if removed:
+            logger.info(f"Kanal {channel_id} o'chirildi, {len(removed)} ta reja olib tashlandi")
+        return len(removed)
+
     def get_jobs(self):
-        return self.scheduler.get_jobs()
+        return list(self.dispatcher)
+
+    def queue_stats(self):
+        """Yuborish navbati holati: chuqurlik va drain rate"""
+        return self.send_queue.stats()
     
     def shutdown(self):
-        self.scheduler.shutdown() 
\ No newline at end of file
+        self.scheduler.shutdown()
+
+    async def stop(self, drain_timeout: float = 0):
+        """Scheduler va yuborish navbatini to'xtatish.
+
+        ``drain_timeout`` > 0 bo'lsa navbatdagi xabarlar shuncha sekund
+        davomida yuborib bo'linishi kutiladi.
+        """
+        for task in (self._sync_task, self._health_task):
+            if task and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self.send_queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Navbatda yuborilmagan xabarlar qoldi: {self.queue_stats()}")
+        await self.send_queue.stop()
+        # Shard'lar boshqa worker'larga TTL kutmasdan o'tadi
+        await asyncio.to_thread(self.shards.release)
\ No newline at end of file
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from config import (
+    GLOBAL_RATE_LIMIT, CHAT_RATE_LIMIT, RATE_LIMIT_BURST,
+    SEND_QUEUE_MAXSIZE, SEND_WORKERS,
+    SEND_MAX_ATTEMPTS, SEND_RETRY_BASE_DELAY, SEND_RETRY_MAX_DELAY
+)
+from media import MediaCache
+from metrics import DEAD_LETTERS, DISPATCH_LAG, LAST_DISPATCH_LAG, SEND_ERRORS, SEND_LATENCY, SENDS
+
+logger = logging.getLogger(__name__)
+
+# Drain rate hisoblanadigan oyna (sekund)
+DRAIN_WINDOW = 60.0
+# Shundan ko'p chat bucket to'plansa, bo'shlari tozalanadi
+MAX_IDLE_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Oddiy token bucket: ``rate`` token/sekund, maksimal ``capacity`` token"""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    @classmethod
+    def for_window(cls, limit: int, window: float, burst: int = 1, clock=time.monotonic) -> 'TokenBucket':
+        """Istalgan ``window`` sekund oynasida ``limit`` dan oshmaydigan bucket.
+
+        Eng yomon holatda oynada ``burst + rate * window`` xabar ketadi,
+        shuning uchun rate ``(limit - burst) / window`` qilib olinadi.
+        """
+        burst = max(1, min(burst, limit))
+        rate = max(limit - burst, 1) / window
+        return cls(rate, burst, clock)
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """``tokens`` mavjud bo'lguncha kutish kerak bo'lgan vaqt"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0):
+        while True:
+            wait = self.delay(tokens)
+            if wait <= 0 and self.consume(tokens):
+                return
+            await asyncio.sleep(wait)
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+def is_retryable(error: Exception) -> bool:
+    """Vaqtinchalik xatolik (flood limit, timeout, tarmoq) ekanligini aniqlash.
+
+    BadRequest ham NetworkError'dan meros oladi, lekin qayta urinish foyda bermaydi.
+    """
+    if isinstance(error, RetryAfter):
+        return True
+    return isinstance(error, NetworkError) and not isinstance(error, BadRequest)
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class OutboundMessage:
+    """Navbatdagi bitta chiquvchi xabar"""
+    __slots__ = ('chat_id', 'text', 'schedule_id', 'user_id', 'kwargs', 'enqueued_at', 'attempts', 'due_at',
+                 'media_type', 'media')
+
+    def __init__(self, chat_id: str, text: str, schedule_id: Optional[int] = None,
+                 user_id: Optional[int] = None, *, due_at: Optional[float] = None,
+                 media_type: str = "", media: str = "", **kwargs: Any):
+        self.chat_id = chat_id
+        # Media bo'lsa ``text`` izoh (caption) sifatida yuboriladi
+        self.text = text
+        self.media_type = media_type
+        self.media = media
+        self.schedule_id = schedule_id
+        self.user_id = user_id
+        # Rejadagi yuborish vaqti (epoch sekund); kechikish metrikasi uchun
+        self.due_at = due_at
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueueStopped(Exception):
+    """Xabar navbat to'xtatilgunga qadar yuborilmadi"""
+
+
+class SendQueue:
+    """Scheduler va bot orasidagi markaziy yuborish navbati.
+
+    Global token bucket (Telegram: ~30 xabar/sekund) va har bir chat uchun
+    alohida bucket (~20 xabar/daqiqa) qo'llanadi. Chat limiti to'lgan xabar
+    worker'ni band qilmaydi: u kerakli vaqtga kechiktirilib navbatga qaytadi.
+    Navbat cheklangan, shuning uchun ``put()`` to'lganda kutadi (backpressure).
+
+    Vaqtinchalik xatoliklarda xabar backoff bilan qayta navbatga qo'yiladi
+    (RetryAfter bo'lsa serverning ``retry_after`` qiymati bo'yicha), boshqa
+    xabarlar esa kutib turmaydi. ``max_attempts`` urinishdan keyin yoki
+    doimiy xatolikda xabar ``dead_letter`` callback'iga beriladi.
+    """
+
+    def __init__(self, bot, global_rate: int = GLOBAL_RATE_LIMIT,
+                 chat_rate: int = CHAT_RATE_LIMIT, burst: int = RATE_LIMIT_BURST,
+                 maxsize: int = SEND_QUEUE_MAXSIZE, workers: int = SEND_WORKERS,
+                 max_attempts: int = SEND_MAX_ATTEMPTS,
+                 dead_letter: Optional[Callable[[OutboundMessage, Exception], Awaitable[None]]] = None,
+                 media_cache: Optional[MediaCache] = None):
+        self.bot = bot
+        self.media_cache = media_cache or MediaCache()
+        self.chat_rate = chat_rate
+        self.burst = burst
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.dead_letter = dead_letter
+        self._queue: 'asyncio.Queue[OutboundMessage]' = asyncio.Queue(maxsize)
+        self._global = TokenBucket.for_window(global_rate, 1.0, burst)
+        self._chats: Dict[str, TokenBucket] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # Kechiktirilgan xabarlar (RetryAfter, backoff, chat limiti)
+        self._deferred: Dict[asyncio.TimerHandle, OutboundMessage] = {}
+        self._in_flight = 0
+        self._sent_times: Deque[float] = deque()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def set_global_rate(self, global_rate: int):
+        """Umumiy limitni o'zgartirish (masalan, bir nechta jarayon ulushi)"""
+        self._global = TokenBucket.for_window(global_rate, 1.0, self.burst)
+
+    def start(self):
+        """Worker'larni ishga tushirish (event loop ichida chaqiriladi)"""
+        if self._tasks:
+            return
+        for i in range(self.workers):
+            task = asyncio.get_running_loop().create_task(self._worker(), name=f"send-worker-{i}")
+            self._tasks.add(task)
+
+    async def stop(self):
+        """Worker'larni to'xtatish.
+
+        Kechiktirilgan va navbatda qolgan xabarlar yo'qolmaydi: ular
+        ``dead_letter`` ga beriladi (/qayta_yuborish bilan qayta yuboriladi).
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        pending = []
+        for handle, message in self._deferred.items():
+            handle.cancel()
+            pending.append(message)
+        self._deferred.clear()
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+            self._queue.task_done()
+        if pending:
+            logger.warning(f"Navbat to'xtatildi: {len(pending)} ta yuborilmagan xabar dead letter'ga yoziladi")
+        for message in pending:
+            await self._dead_letter(message, SendQueueStopped("navbat to'xtatilganda yuborilmagan"))
+
+    async def put(self, message: OutboundMessage):
+        """Xabarni navbatga qo'yish; navbat to'lsa bo'shaguncha kutadi"""
+        await self._queue.put(message)
+
+    async def join(self):
+        """Navbatdagi va kechiktirilgan barcha xabarlar ketguncha kutish"""
+        while True:
+            await self._queue.join()
+            if not self._deferred:
+                return
+            await asyncio.sleep(0.05)
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_CHAT_BUCKETS:
+                self._chats = {cid: b for cid, b in self._chats.items() if not b.is_full()}
+            bucket = TokenBucket.for_window(self.chat_rate, 60.0, self.burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _defer(self, message: OutboundMessage, delay: float):
+        """Xabarni ``delay`` sekunddan keyin navbatga qaytarish"""
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._deferred.pop(handle, None)
+            try:
+                self._queue.put_nowait(message)
+            except asyncio.QueueFull:
+                task = loop.create_task(self._queue.put(message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+        handle = loop.call_later(delay, requeue)
+        self._deferred[handle] = message
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                bucket = self._chat_bucket(message.chat_id)
+                wait = bucket.delay()
+                if wait > 0:
+                    self._defer(message, wait)
+                    continue
+                bucket.consume()
+                await self._global.acquire()
+                self._in_flight += 1
+                message.attempts += 1
+                try:
+                    await self._send(message)
+                finally:
+                    self._in_flight -= 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._handle_failure(message, e)
+            finally:
+                self._queue.task_done()
+
+    def _retry_delay(self, message: OutboundMessage, error: Exception) -> float:
+        if isinstance(error, RetryAfter):
+            return retry_after_seconds(error)
+        delay = SEND_RETRY_BASE_DELAY * (2 ** (message.attempts - 1))
+        return min(delay, SEND_RETRY_MAX_DELAY) * random.uniform(0.8, 1.2)
+
+    async def _handle_failure(self, message: OutboundMessage, error: Exception):
+        if is_retryable(error) and message.attempts < self.max_attempts:
+            delay = self._retry_delay(message, error)
+            self.retried += 1
+            logger.warning(
+                "Xabar qayta yuboriladi (%d/%d, %.1fs dan keyin): %s - %s: %s",
+                message.attempts, self.max_attempts, delay, message.chat_id, message.schedule_id, error,
+                extra={'schedule_id': message.schedule_id, 'channel_id': message.chat_id, 'attempts': message.attempts}
+            )
+            self._defer(message, delay)
+            return
+        await self._dead_letter(message, error)
+
+    async def _dead_letter(self, message: OutboundMessage, error: Exception):
+        self.failed += 1
+        DEAD_LETTERS.inc()
+        logger.error(
+            "Xabar yuborilmadi: %s - %s: %s", message.chat_id, message.schedule_id, error,
+            extra={'schedule_id': message.schedule_id, 'channel_id': message.chat_id, 'attempts': message.attempts}
+        )
+        if self.dead_letter is not None:
+            try:
+                await self.dead_letter(message, error)
+            except Exception as e:
+                logger.error(f"Dead letter'ga yozishda xatolik: {e}")
+
+    async def _send(self, message: OutboundMessage):
+        started = time.perf_counter()
+        try:
+            if message.media_type:
+                await self.media_cache.send(
+                    self.bot, message.chat_id, message.media_type, message.media, message.text, **message.kwargs
+                )
+            else:
+                await self.bot.send_message(chat_id=message.chat_id, text=message.text, **message.kwargs)
+        except Exception as e:
+            SEND_LATENCY.labels("error").observe(time.perf_counter() - started)
+            SEND_ERRORS.labels(type(e).__name__).inc()
+            raise
+        SEND_LATENCY.labels("ok").observe(time.perf_counter() - started)
+        SENDS.inc()
+        lag = None
+        if message.due_at is not None:
+            lag = time.time() - message.due_at
+            DISPATCH_LAG.observe(lag)
+            LAST_DISPATCH_LAG.set(lag)
+        self.sent += 1
+        now = time.monotonic()
+        self._sent_times.append(now)
+        self._trim_sent_times(now)
+        # Eng ko'p takrorlanadigan yozuv: formatlash listener thread'ida, soni cheklangan
+        logger.info(
+            "Xabar yuborildi: %s - %s", message.chat_id, message.schedule_id,
+            extra={'schedule_id': message.schedule_id, 'channel_id': message.chat_id, 'user_id': message.user_id,
+                   'lag': None if lag is None else round(lag, 3), 'sample': True}
+        )
+
+    def _trim_sent_times(self, now: float):
+        cutoff = now - DRAIN_WINDOW
+        while self._sent_times and self._sent_times[0] < cutoff:
+            self._sent_times.popleft()
+
+    @property
+    def depth(self) -> int:
+        """Navbatdagi va kechiktirilgan xabarlar soni"""
+        return self._queue.qsize() + len(self._deferred)
+
+    @property
+    def drain_rate(self) -> float:
+        """Oxirgi daqiqadagi o'rtacha yuborish tezligi (xabar/sekund)"""
+        self._trim_sent_times(time.monotonic())
+        return len(self._sent_times) / DRAIN_WINDOW
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'depth': self.depth,
+            'queued': self._queue.qsize(),
+            'deferred': len(self._deferred),
+            'in_flight': self._in_flight,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'drain_rate': round(self.drain_rate, 3),
+        }
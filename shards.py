@@ -0,0 +1,59 @@
+import logging
+import os
+import socket
+import time
+import zlib
+from typing import FrozenSet, Set, Tuple
+
+from config import SCHEDULER_SHARDS, SHARD_LEASE_TTL, WORKER_ID
+from db import Database
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(channel_id: str, shards: int) -> int:
+    """Kanal qaysi shard'ga tegishli (barcha jarayonlarda bir xil natija beradi)"""
+    if shards <= 1:
+        return 0
+    return zlib.crc32(str(channel_id).encode()) % shards
+
+
+class ShardCoordinator:
+    """Jarayon egallagan shard'lar.
+
+    Rejalar ``channel_id`` bo'yicha bo'linadi, shuning uchun bitta kanalning
+    barcha xabarlari (va uning rate limit bucket'i) bitta jarayonda bo'ladi.
+    Egalik ``shard_leases`` jadvalidagi muddatli lease'lar orqali; worker
+    o'lsa, uning shard'larini ``ttl`` dan keyin boshqalar egallaydi.
+    """
+
+    def __init__(self, db: Database, shards: int = SCHEDULER_SHARDS,
+                 worker_id: str = WORKER_ID, ttl: float = SHARD_LEASE_TTL):
+        self.db = db
+        self.shards = max(1, shards)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self.owned: FrozenSet[int] = frozenset()
+
+    def shard_of(self, channel_id: str) -> int:
+        return shard_of(channel_id, self.shards)
+
+    def owns(self, channel_id: str) -> bool:
+        return self.shard_of(channel_id) in self.owned
+
+    def heartbeat(self) -> Tuple[Set[int], Set[int]]:
+        """Lease'larni yangilash; (yangi olingan, yo'qotilgan) shard'lar (bloklaydi)"""
+        owned = self.db.sync_leases(self.worker_id, self.shards, self.ttl, time.time())
+        acquired, lost = owned - self.owned, set(self.owned) - owned
+        self.owned = frozenset(owned)
+        if acquired or lost:
+            logger.info(
+                f"Worker {self.worker_id}: shard'lar {sorted(owned)} / {self.shards} "
+                f"(+{sorted(acquired)}, -{sorted(lost)})"
+            )
+        return acquired, lost
+
+    def release(self):
+        """Barcha lease'larni bo'shatish (bloklaydi)"""
+        self.db.release_leases(self.worker_id)
+        self.owned = frozenset()
@@ -0,0 +1,159 @@
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+import pytz
+
+OYLAR = ['yanvar', 'fevral', 'mart', 'aprel', 'may', 'iyun', 'iyul', 'avgust', 'sentyabr', 'oktyabr', 'noyabr', 'dekabr']
+KUNLAR = ['dushanba', 'seshanba', 'chorshanba', 'payshanba', 'juma', 'shanba', 'yakshanba']
+
+# Telegram xabari uzunligi chegarasi
+MAX_MESSAGE_LENGTH = 4096
+
+# Foydalanuvchi xabarida ishlatishi mumkin bo'lgan o'zgaruvchilar
+PLACEHOLDERS = ('kun', 'qoldi', 'sana', 'hafta_kuni')
+_PLACEHOLDER_RE = re.compile(r'\{(' + '|'.join(PLACEHOLDERS) + r')\}')
+
+
+class DayContext(NamedTuple):
+    """Bir kun va bir vaqt zonasi uchun umumiy qiymatlar"""
+    ordinal: int
+    sana: str
+    hafta_kuni: str
+    header: str
+
+
+class _Placeholder(NamedTuple):
+    name: str
+
+
+Part = Union[str, _Placeholder]
+
+_day_cache: Dict[str, Tuple[float, DayContext]] = {}
+_timezones: Dict[str, pytz.BaseTzInfo] = {}
+
+
+def _timezone(tz_name: str) -> pytz.BaseTzInfo:
+    tz = _timezones.get(tz_name)
+    if tz is None:
+        tz = _timezones[tz_name] = pytz.timezone(tz_name)
+    return tz
+
+
+def _sana(day: int, oy: str, hafta_kuni: str, dmy: str) -> str:
+    return f"{day}-{oy}, {hafta_kuni}  [ {dmy} ]"
+
+
+def build_day_context(today: date) -> DayContext:
+    hafta_kuni = KUNLAR[today.weekday()]
+    sana = _sana(today.day, OYLAR[today.month - 1], hafta_kuni, today.strftime('%d.%m.%Y'))
+    return DayContext(today.toordinal(), sana, hafta_kuni, f"Bugun: {sana}\n")
+
+
+def _widest_day_context(ordinal: int) -> DayContext:
+    """Sana va hafta kuni eng uzun bo'lgan kun (uzunlikni yuqoridan baholash uchun)"""
+    hafta_kuni = max(KUNLAR, key=len)
+    sana = _sana(28, max(OYLAR, key=len), hafta_kuni, "28.09.2000")
+    return DayContext(ordinal, sana, hafta_kuni, f"Bugun: {sana}\n")
+
+
+def day_context(tz_name: str) -> DayContext:
+    """Bugungi sana sarlavhasi; har bir vaqt zonasi uchun kuniga bir marta hisoblanadi"""
+    cached = _day_cache.get(tz_name)
+    if cached is not None and time.time() < cached[0]:
+        return cached[1]
+    now = datetime.now(_timezone(tz_name))
+    context = build_day_context(now.date())
+    midnight = _timezone(tz_name).localize(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+    _day_cache[tz_name] = (midnight.timestamp(), context)
+    return context
+
+
+def _parse_date(value: Optional[str]) -> Optional[int]:
+    if not value or not value.strip():
+        return None
+    value = value.strip()
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        # YYYY-MM-DD uchun tez yo'l (strptime'dan ~20 marta tez)
+        try:
+            return date.fromisoformat(value).toordinal()
+        except ValueError:
+            pass
+    return datetime.strptime(value, '%Y-%m-%d').date().toordinal()
+
+
+class CompiledTemplate:
+    """Reja yaratilganda bir marta tahlil qilingan xabar shabloni.
+
+    Xabar matni ``{kun}``, ``{qoldi}``, ``{sana}``, ``{hafta_kuni}``
+    o'zgaruvchilari bo'yicha bo'laklarga ajratiladi; boshqa qavslar oddiy
+    matn sifatida qoladi. Yuborishda faqat bo'laklar birlashtiriladi.
+    """
+    __slots__ = ('parts', 'static', 'with_date', 'start_ordinal', 'end_ordinal', 'needs_day')
+
+    def __init__(self, message: str, with_date: bool, start_date: Optional[str], end_date: Optional[str] = ""):
+        self.parts = compile_parts(message or "")
+        # O'zgaruvchisiz matn har kuni bir xil
+        self.static = self.parts[0] if len(self.parts) == 1 and isinstance(self.parts[0], str) else None
+        self.with_date = with_date
+        self.start_ordinal = _parse_date(start_date) or date(1970, 1, 1).toordinal()
+        self.end_ordinal = _parse_date(end_date)
+        # False bo'lsa render() ga DayContext kerak emas (None berish mumkin)
+        self.needs_day = with_date or self.static is None
+
+    def render(self, day: Optional[DayContext]) -> str:
+        if self.static is not None and not self.with_date:
+            # needs_day False: kun ma'lumoti kerak emas
+            return self.static
+        if day is None:
+            raise ValueError("Bu shablon uchun DayContext kerak")
+        kun = day.ordinal - self.start_ordinal + 1
+        remaining = self.end_ordinal - day.ordinal if self.end_ordinal is not None else None
+        body = self._render_body(day, kun, remaining)
+        if not self.with_date:
+            return body
+        msg = f"{day.header}kun: {kun}\n"
+        if remaining is not None:
+            if remaining > 0:
+                msg += f"Maqsadingizga erishish uchun {remaining} kun qoldi\n"
+            else:
+                msg += "✅ Challenge tugagan!\n"
+        return f"{msg}\n{body}"
+
+    def max_length(self) -> int:
+        """Har qanday kunda ko'rsatilishi mumkin bo'lgan eng uzun matn uzunligi.
+
+        ``end_date`` bo'lmasa kun raqami 5 xonali deb olinadi.
+        """
+        last = self.end_ordinal if self.end_ordinal is not None else self.start_ordinal + 99_998
+        last = max(last, self.start_ordinal)
+        # Kun raqami bir xona uzaygan birinchi kunda qolgan kunlar hali eng ko'p
+        ordinals = {self.start_ordinal + 10 ** digits - 1 for digits in range(len(str(last - self.start_ordinal + 1)))}
+        ordinals.add(last)
+        return max(len(self.render(_widest_day_context(ordinal))) for ordinal in ordinals)
+
+    def _render_body(self, day: DayContext, kun: int, remaining: Optional[int]) -> str:
+        if self.static is not None:
+            return self.static
+        values = {
+            'kun': str(kun),
+            'qoldi': str(max(remaining, 0)) if remaining is not None else "",
+            'sana': day.sana,
+            'hafta_kuni': day.hafta_kuni,
+        }
+        return "".join(part if isinstance(part, str) else values[part.name] for part in self.parts)
+
+
+def compile_parts(message: str) -> Tuple[Part, ...]:
+    """Matnni oddiy bo'laklar va o'zgaruvchilarga ajratish"""
+    parts = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(message):
+        if match.start() > position:
+            parts.append(message[position:match.start()])
+        parts.append(_Placeholder(match.group(1)))
+        position = match.end()
+    if position < len(message) or not parts:
+        parts.append(message[position:])
+    return tuple(parts)
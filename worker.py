@@ -0,0 +1,53 @@
+"""Faqat rejalashtirilgan xabarlarni yuboradigan jarayon.
+
+Update'larni ``bot.py`` qabul qiladi; ``worker.py`` nusxalari esa
+``SCHEDULER_SHARDS`` ta shard'ni o'zaro bo'lishib oladi. Bir nechta nusxa
+ishga tushirish mumkin: shard egaligi bazadagi lease'lar orqali, bitta slot
+esa ``schedules.last_run_at`` orqali faqat bir marta yuboriladi.
+
+Barcha nusxalar ``bot.py`` bilan bitta SQLite faylini ishlatadi, shuning
+uchun ular bitta fayl tizimida (bitta serverda) ishga tushirilishi kerak.
+"""
+import asyncio
+import logging
+import signal
+
+from telegram import Bot
+
+from config import BOT_TOKEN, SHUTDOWN_DRAIN_TIMEOUT
+from db import Database
+from logs import setup_logging
+from metrics import start_metrics_server
+from scheduler import MessageScheduler
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    metrics_server = await start_metrics_server()
+    db = Database()
+    async with Bot(BOT_TOKEN) as bot:
+        scheduler = MessageScheduler(bot, db)
+        scheduler.start()
+        logger.info(f"Scheduler worker {scheduler.shards.worker_id} ishga tushdi")
+        try:
+            await stop_event.wait()
+        finally:
+            await scheduler.stop(drain_timeout=SHUTDOWN_DRAIN_TIMEOUT)
+    db.close()
+    if metrics_server:
+        metrics_server.close()
+    logger.info("Scheduler worker to'xtatildi")
+
+
+if __name__ == '__main__':
+    setup_logging()
+    asyncio.run(main())